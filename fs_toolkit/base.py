@@ -7,43 +7,130 @@
 Common base class for line parser output data classes
 """
 import re
+import threading
 
-from typing import Iterator, List, Optional
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
 
 from sys_toolkit.collection import CachedMutableSequence
 from sys_toolkit.platform import detect_platform_family, detect_toolchain_family
 
+from .exceptions import FilesystemError
+
+# Toolchain families for known platform families
+PLATFORM_TOOLCHAINS = {
+    'bsd': 'bsd',
+    'darwin': 'bsd',
+    'linux': 'gnu',
+    'openbsd': 'openbsd',
+}
+
+
+# pylint: disable=too-few-public-methods
+class UpdateFlight:
+    """
+    Update of a LineLoader in progress in a thread
+
+    Threads calling update() while the update is in progress wait for the event and
+    share the result of the update, including the error raised in the update
+    """
+    thread: int
+    initial: bool
+    event: threading.Event
+    error: Optional[Exception]
+
+    def __init__(self, initial: bool) -> None:
+        self.thread = threading.get_ident()
+        self.initial = initial
+        self.event = threading.Event()
+        self.error = None
+
 
 class LineLoader(CachedMutableSequence):
     """
     Loader for line based data to cached mutable sequence
+
+    Platform and toolchain are detected unless given as arguments. If only platform is
+    given, toolchain is the default toolchain for the platform.
+
+    Loaded items are stored as an immutable tuple snapshot. The update() method loads
+    items with __load_items__() and replaces the snapshot when loading is complete, keeping
+    the previous snapshot if loading fails, and editing methods replace the snapshot with
+    a modified copy. Iterators always iterate over the snapshot they were created from, so
+    the object can be iterated from multiple threads and in nested loops without locking.
+
+    Only one update is run at a time. Threads calling update() while another thread is
+    updating the items wait for the update in progress instead of loading the data again,
+    and the number of such calls is counted in __coalesced_updates__. Readers use the
+    previous snapshot while the items are updated, or wait for the first update if the
+    items have not been loaded yet. Waiting readers are not counted as coalesced updates.
     """
+    __items__: Tuple[Any, ...]
     __platform__: str
     __toolchain__: str
-    __iter_items__: Optional[Iterator[str]]
+    __iter_state__: threading.local
+    __update_lock__: threading.Lock
+    __update_flight__: Optional[UpdateFlight]
+    __coalesced_updates__: int
 
-    def __init__(self) -> None:
+    def __init__(self, platform: Optional[str] = None, toolchain: Optional[str] = None) -> None:
         super().__init__()
-        self.__platform__ = detect_platform_family()
-        self.__toolchain__ = detect_toolchain_family()
-        self.__iter_items__ = None
+        self.__platform__ = platform if platform is not None else detect_platform_family()
+        if toolchain is None and platform is not None:
+            toolchain = PLATFORM_TOOLCHAINS.get(platform, None)
+        self.__toolchain__ = toolchain if toolchain is not None else detect_toolchain_family()
+        self.__items__ = ()
+        self.__iter_state__ = threading.local()
+        self.__update_lock__ = threading.Lock()
+        self.__update_flight__ = None
+        self.__coalesced_updates__ = 0
+
+    @property
+    def __requires_reload__(self) -> bool:
+        """
+        Check if items must be loaded. Waits for the first update in progress in another thread
+        """
+        flight = self.__update_flight__
+        if flight is not None and flight.initial and flight.thread != threading.get_ident():
+            self.__join_update__(flight)
+        return super().__requires_reload__
 
-    def __iter__(self) -> Iterator[str]:
-        if not self.__loaded__:
+    def __iter__(self) -> Iterator[Any]:
+        if self.__requires_reload__:
             self.update()
         return iter(self.__items__)
 
-    def __next__(self) -> str:
-        if self.__iter_items__ is None:
-            if not self.__loaded__:
+    def __next__(self) -> Any:
+        state = self.__iter_state__
+        iterator = getattr(state, 'iterator', None)
+        if iterator is None:
+            if self.__requires_reload__:
                 self.update()
-            self.__iter_items__ = iter(self.__items__)
+            iterator = state.iterator = iter(self.__items__)
         try:
-            return next(self.__iter_items__)
+            return next(iterator)
         except StopIteration as error:
-            self.__iter_items__ = None
+            state.iterator = None
             raise StopIteration from error
 
+    def __setitem__(self, index: int, value: Any) -> None:
+        items = list(self.__items__)
+        items[index] = value
+        self.__items__ = tuple(items)
+
+    def __delitem__(self, index: int) -> None:
+        items = list(self.__items__)
+        del items[index]
+        self.__items__ = tuple(items)
+
+    def insert(self, index: int, value: Any) -> None:
+        items = list(self.__items__)
+        items.insert(index, value)
+        self.__items__ = tuple(items)
+
+    def clear(self) -> None:
+        self.__items__ = ()
+        self.__reset__()
+
     def __match_pattern_list__(self,
                                lines: List[str],
                                patterns: List[re.Pattern]) -> List[dict]:
@@ -66,8 +153,66 @@ class LineLoader(CachedMutableSequence):
                     break
         return matches
 
-    def update(self) -> None:
+    def __load_items__(self) -> Iterable[Any]:
         """
-        Require update to be implemented in child class
+        Require loading of items to be implemented in child class
         """
         raise NotImplementedError
+
+    def __join_update__(self, flight: UpdateFlight) -> None:
+        """
+        Wait for an update in progress in another thread and raise the error from the update
+        """
+        flight.event.wait()
+        if flight.error is not None:
+            raise flight.error
+
+    def __update_items__(self, flight: UpdateFlight) -> None:
+        """
+        Load items and replace the loaded snapshot with the new items
+
+        The new snapshot is published only when loading succeeds. If loading fails the
+        previous snapshot and its load state are kept, or the state is reset if items
+        were never loaded
+        """
+        loaded = self.__loaded__
+        load_duration = self.__load_duration__
+        self.__start_update__()
+        try:
+            items = tuple(self.__load_items__())
+        except Exception as error:
+            flight.error = error
+            self.__reset__()
+            if loaded:
+                self.__loaded__ = loaded
+                self.__load_duration__ = load_duration
+            raise
+        self.__items__ = items
+        self.__finish_update__()
+
+    def update(self) -> None:
+        """
+        Load items and replace the loaded snapshot with the new items
+
+        If another thread is already updating the items, wait for the update to finish
+        instead of loading the items again
+        """
+        with self.__update_lock__:
+            flight = self.__update_flight__
+            if flight is None:
+                flight = self.__update_flight__ = UpdateFlight(initial=self.__loaded__ is None)
+                leader = True
+            elif flight.thread == threading.get_ident():
+                raise FilesystemError(f'Recursive update of {self.__class__.__name__}')
+            else:
+                leader = False
+                self.__coalesced_updates__ += 1
+        if not leader:
+            self.__join_update__(flight)
+            return
+        try:
+            self.__update_items__(flight)
+        finally:
+            with self.__update_lock__:
+                self.__update_flight__ = None
+            flight.event.set()
@@ -0,0 +1,275 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Linux block device inventory from sysfs and /dev/disk/by-* symbolic links
+"""
+import os
+import re
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from sys_toolkit.collection import CachedMutableMapping
+
+DEV_PATH = Path('/dev')
+SYS_PATH = Path('/sys')
+SECTOR_SIZE = 512
+
+# /dev/disk/by-* directories and matching BlockDevice attributes
+DEV_DISK_ATTRIBUTES = {
+    'by-uuid': 'uuid',
+    'by-label': 'label',
+    'by-partuuid': 'partition_uuid',
+    'by-partlabel': 'partition_label',
+}
+# fstab fs_spec prefixes and matching BlockDevice attributes
+DEVICE_SPEC_ATTRIBUTES = {
+    'UUID=': 'uuid',
+    'LABEL=': 'label',
+    'PARTUUID=': 'partition_uuid',
+    'PARTLABEL=': 'partition_label',
+}
+RE_UDEV_ESCAPE = re.compile(r'\\x([0-9a-fA-F]{2})')
+# Characters not escaped by udev in /dev/disk/by-* link names
+UDEV_NAME_CHARACTERS = frozenset('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#+-.:=@_')
+
+
+def decode_udev_name(value: str) -> str:
+    """
+    Decode \\xNN escapes used by udev in /dev/disk/by-* link names
+    """
+    if '\\' not in value:
+        return value
+    data = RE_UDEV_ESCAPE.sub(lambda match: chr(int(match.group(1), 16)), value)
+    return data.encode('latin-1', 'surrogateescape').decode('utf-8', 'surrogateescape')
+
+
+def encode_udev_name(value: str) -> str:
+    """
+    Encode a value with \\xNN escapes as done by udev for /dev/disk/by-* link names
+
+    ASCII characters other than letters, digits and #+-.:=@_ are escaped. Other
+    characters are kept as is
+    """
+    return ''.join(
+        character if character in UDEV_NAME_CHARACTERS or ord(character) > 127 else f'\\x{ord(character):02x}'
+        for character in value
+    )
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class BlockDevice:
+    """
+    Block device with device numbers, size and filesystem identifiers
+    """
+    name: str
+    major: Optional[int]
+    minor: Optional[int]
+    size: Optional[int]
+    uuid: Optional[str]
+    label: Optional[str]
+    partition_uuid: Optional[str]
+    partition_label: Optional[str]
+    mapper_name: Optional[str]
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.major = None
+        self.minor = None
+        self.size = None
+        self.uuid = None
+        self.label = None
+        self.partition_uuid = None
+        self.partition_label = None
+        self.mapper_name = None
+
+    def __repr__(self) -> str:
+        return str(self.path)
+
+    @property
+    def path(self) -> Path:
+        """
+        Return device path in /dev
+        """
+        return DEV_PATH.joinpath(self.name)
+
+    @property
+    def devno(self) -> Optional[str]:
+        """
+        Return device number as major:minor string
+        """
+        if self.major is None:
+            return None
+        return f'{self.major}:{self.minor}'
+
+
+class BlockDevices(CachedMutableMapping):
+    """
+    Block devices by device name with indexes by identifiers, device numbers and paths
+
+    Devices are loaded from /sys/class/block and identifiers from /dev/disk/by-uuid,
+    by-label, by-partuuid and by-partlabel symbolic links in a single pass. Device
+    mapper devices are also indexed by /dev/mapper path.
+    """
+    dev_path: Path
+    sys_path: Path
+    __indexes__: Dict[str, Dict[str, BlockDevice]]
+
+    def __init__(self,
+                 dev_path: Union[str, Path] = DEV_PATH,
+                 sys_path: Union[str, Path] = SYS_PATH) -> None:
+        super().__init__()
+        self.dev_path = Path(dev_path)
+        self.sys_path = Path(sys_path)
+        self.__items__ = {}
+        self.__indexes__ = {}
+
+    @staticmethod
+    def __read_value__(path: Path) -> Optional[str]:
+        """
+        Read a sysfs attribute value, returning None if the value can't be read
+        """
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                return handle.read().strip()
+        except OSError:
+            return None
+
+    def __load_sysfs_device__(self, name: str) -> BlockDevice:
+        """
+        Load block device details from sysfs
+        """
+        device = BlockDevice(name)
+        path = self.sys_path.joinpath('class/block', name)
+        devno = self.__read_value__(path.joinpath('dev'))
+        if devno is not None and ':' in devno:
+            major, minor = devno.split(':', 1)
+            device.major = int(major)
+            device.minor = int(minor)
+        size = self.__read_value__(path.joinpath('size'))
+        if size is not None and size.isdigit():
+            device.size = int(size) * SECTOR_SIZE
+        device.mapper_name = self.__read_value__(path.joinpath('dm/name'))
+        return device
+
+    def __load_disk_links__(self, items: Dict[str, BlockDevice]) -> None:
+        """
+        Load identifiers for devices from /dev/disk/by-* symbolic links
+        """
+        for directory, attr in DEV_DISK_ATTRIBUTES.items():
+            try:
+                entries = list(os.scandir(self.dev_path.joinpath('disk', directory)))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    name = os.path.basename(os.readlink(entry.path))
+                except OSError:
+                    continue
+                device = items.get(name, None)
+                if device is not None:
+                    setattr(device, attr, decode_udev_name(entry.name))
+
+    def update(self, **kwargs) -> None:
+        """
+        Load block devices and build lookup indexes
+        """
+        self.__start_update__()
+        items = {}
+        try:
+            names = sorted(entry.name for entry in os.scandir(self.sys_path.joinpath('class/block')))
+        except OSError:
+            names = []
+        for name in names:
+            items[name] = self.__load_sysfs_device__(name)
+        self.__load_disk_links__(items)
+
+        indexes = {attr: {} for attr in ('devno', 'path', *DEV_DISK_ATTRIBUTES.values())}
+        for device in items.values():
+            for attr in DEV_DISK_ATTRIBUTES.values():
+                value = getattr(device, attr)
+                if value is not None:
+                    indexes[attr][value] = device
+            if device.devno is not None:
+                indexes['devno'][device.devno] = device
+            indexes['path'][str(device.path)] = device
+            if device.mapper_name is not None:
+                indexes['path'][str(DEV_PATH.joinpath('mapper', device.mapper_name))] = device
+        self.__items__ = items
+        self.__indexes__ = indexes
+        self.__finish_update__()
+
+    def __get_indexed__(self, index: str, value: str) -> Optional[BlockDevice]:
+        """
+        Get device from specified index
+        """
+        if self.__requires_reload__:
+            self.update()
+        return self.__indexes__[index].get(value, None)
+
+    def get_by_uuid(self, uuid: str) -> Optional[BlockDevice]:
+        """
+        Get block device by filesystem UUID
+        """
+        return self.__get_indexed__('uuid', uuid)
+
+    def get_by_label(self, label: str) -> Optional[BlockDevice]:
+        """
+        Get block device by filesystem label
+        """
+        return self.__get_indexed__('label', label)
+
+    def get_by_partition_uuid(self, uuid: str) -> Optional[BlockDevice]:
+        """
+        Get block device by partition UUID
+        """
+        return self.__get_indexed__('partition_uuid', uuid)
+
+    def get_by_partition_label(self, label: str) -> Optional[BlockDevice]:
+        """
+        Get block device by partition label
+        """
+        return self.__get_indexed__('partition_label', label)
+
+    def get_by_devno(self, devno: Union[str, Tuple[int, int]]) -> Optional[BlockDevice]:
+        """
+        Get block device by device number as major:minor string or (major, minor) tuple
+        """
+        if isinstance(devno, tuple):
+            devno = f'{devno[0]}:{devno[1]}'
+        return self.__get_indexed__('devno', devno)
+
+    def get_by_path(self, path: Union[str, Path]) -> Optional[BlockDevice]:
+        """
+        Get block device by device path. Paths which are not found in the index are
+        resolved as symbolic links under the dev_path directory
+        """
+        path = str(path)
+        device = self.__get_indexed__('path', path)
+        if device is None and path.startswith(f'{DEV_PATH}/'):
+            realpath = os.path.realpath(self.dev_path.joinpath(path[len(str(DEV_PATH)) + 1:]))
+            device = self.get(os.path.basename(realpath), None)
+        return device
+
+    def resolve(self, spec: str) -> Optional[str]:
+        """
+        Resolve a fstab fs_spec value or device path to a device path
+        """
+        device = None
+        for prefix, attr in DEVICE_SPEC_ATTRIBUTES.items():
+            if spec[:len(prefix)].upper() == prefix:
+                device = self.__get_indexed__(attr, spec[len(prefix):])
+                break
+        else:
+            if spec.startswith('/'):
+                device = self.get_by_path(spec)
+        return str(device.path) if device is not None else None
+
+    def normalize(self, device: str) -> str:
+        """
+        Normalize a device name or path for comparison
+        """
+        return (self.resolve(device) or device) if device.startswith('/') else device
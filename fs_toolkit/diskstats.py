@@ -0,0 +1,247 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Linux block device I/O rates from /proc/diskstats
+
+Counters are read with a single read of /proc/diskstats and parsed as bytes. Rates are
+calculated from the counter differences between two samples, using monotonic timestamps.
+Rates are joined to mountpoints by the major:minor device number of the mounted device.
+"""
+import os
+import stat
+import time
+
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .devices import BlockDevices
+from .exceptions import FilesystemError
+from .mounts.snapshot import MountpointSnapshot
+
+DISKSTATS_PATH = Path('/proc/diskstats')
+# Sectors in /proc/diskstats are always 512 bytes regardless of device sector size
+DISKSTATS_SECTOR_SIZE = 512
+DISKSTATS_MIN_FIELDS = 14
+
+# Counters in /proc/diskstats after major, minor and device name fields
+DISKSTATS_COUNTERS = (
+    'reads',
+    'reads_merged',
+    'sectors_read',
+    'read_time',
+    'writes',
+    'writes_merged',
+    'sectors_written',
+    'write_time',
+    'in_flight',
+    'io_time',
+    'weighted_io_time',
+)
+
+
+# pylint: disable=too-few-public-methods
+class DiskCounters:
+    """
+    I/O counters for a block device from one line of /proc/diskstats
+    """
+    __slots__ = ('major', 'minor', 'name', *DISKSTATS_COUNTERS)
+
+    major: int
+    minor: int
+    name: str
+    reads: int
+    reads_merged: int
+    sectors_read: int
+    read_time: int
+    writes: int
+    writes_merged: int
+    sectors_written: int
+    write_time: int
+    in_flight: int
+    io_time: int
+    weighted_io_time: int
+
+    def __init__(self, fields: List[bytes]) -> None:
+        self.major = int(fields[0])
+        self.minor = int(fields[1])
+        self.name = fields[2].decode('utf-8', 'surrogateescape')
+        for index, attr in enumerate(DISKSTATS_COUNTERS, start=3):
+            setattr(self, attr, int(fields[index]))
+
+    def __repr__(self) -> str:
+        return f'{self.devno} {self.name}'
+
+    @property
+    def devno(self) -> str:
+        """
+        Return device number as major:minor string
+        """
+        return f'{self.major}:{self.minor}'
+
+
+def parse_diskstats(data: bytes) -> Dict[str, DiskCounters]:
+    """
+    Parse /proc/diskstats data to device counters by major:minor device number
+
+    Lines with fewer fields than the oldest supported format are skipped. Discard and
+    flush counters of newer kernels are ignored
+    """
+    counters = {}
+    for line in data.splitlines():
+        fields = line.split()
+        if len(fields) < DISKSTATS_MIN_FIELDS:
+            continue
+        try:
+            item = DiskCounters(fields)
+        except ValueError:
+            continue
+        counters[item.devno] = item
+    return counters
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class DiskIORates:
+    """
+    I/O rates for a block device between two samples
+
+    Rates are per second. Utilization is the percent of time the device was busy
+    """
+    devno: str
+    name: str
+    interval: float
+    read_iops: float
+    write_iops: float
+    read_bytes: float
+    write_bytes: float
+    utilization: float
+
+    def __init__(self, previous: DiskCounters, current: DiskCounters, interval: float) -> None:
+        self.devno = current.devno
+        self.name = current.name
+        self.interval = interval
+        self.read_iops = (current.reads - previous.reads) / interval
+        self.write_iops = (current.writes - previous.writes) / interval
+        self.read_bytes = (current.sectors_read - previous.sectors_read) * DISKSTATS_SECTOR_SIZE / interval
+        self.write_bytes = (current.sectors_written - previous.sectors_written) * DISKSTATS_SECTOR_SIZE / interval
+        # io_time is in milliseconds
+        self.utilization = min(100.0, (current.io_time - previous.io_time) / 10 / interval)
+
+    def __repr__(self) -> str:
+        return f'{self.name} read {self.read_iops:.1f} IOPS write {self.write_iops:.1f} IOPS'
+
+    @staticmethod
+    def is_valid(previous: DiskCounters, current: DiskCounters) -> bool:
+        """
+        Check counters did not go backwards, which happens when the device was replaced or
+        32 bit counters wrapped around between samples
+        """
+        return all(
+            getattr(current, attr) >= getattr(previous, attr)
+            for attr in ('reads', 'writes', 'sectors_read', 'sectors_written', 'io_time')
+        )
+
+
+class DiskStats:
+    """
+    Sampler for block device I/O rates from /proc/diskstats
+
+    Each call to update() reads the counters and calculates rates from the previous
+    sample. Rates are not available until two samples have been read
+    """
+    path: Path
+    clock: Callable[[], float]
+    rates: Dict[str, DiskIORates]
+    __previous__: Optional[Tuple[float, Dict[str, DiskCounters]]]
+
+    def __init__(self,
+                 path: Union[str, Path] = DISKSTATS_PATH,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.path = Path(path)
+        self.clock = clock
+        self.rates = {}
+        self.__previous__ = None
+
+    def __repr__(self) -> str:
+        return f'I/O rates for {len(self.rates)} devices'
+
+    def read(self) -> Dict[str, DiskCounters]:
+        """
+        Read current counters for all devices
+        """
+        try:
+            with open(self.path, 'rb') as handle:
+                data = handle.read()
+        except OSError as error:
+            raise FilesystemError(f'Error reading {self.path}: {error}') from error
+        return parse_diskstats(data)
+
+    def update(self) -> Dict[str, DiskIORates]:
+        """
+        Read counters and calculate rates since the previous sample
+        """
+        timestamp = self.clock()
+        counters = self.read()
+        previous = self.__previous__
+        self.__previous__ = (timestamp, counters)
+        rates = {}
+        if previous is not None and timestamp > previous[0]:
+            interval = timestamp - previous[0]
+            for devno, current in counters.items():
+                item = previous[1].get(devno, None)
+                if item is not None and DiskIORates.is_valid(item, current):
+                    rates[devno] = DiskIORates(item, current, interval)
+        self.rates = rates
+        return rates
+
+    def get_rates(self, devno: Union[str, Tuple[int, int]]) -> Optional[DiskIORates]:
+        """
+        Return rates for a device by major:minor string or (major, minor) tuple
+        """
+        if isinstance(devno, tuple):
+            devno = f'{devno[0]}:{devno[1]}'
+        return self.rates.get(devno, None)
+
+    @staticmethod
+    def get_device_number(device: str, block_devices: Optional[BlockDevices] = None) -> Optional[str]:
+        """
+        Return major:minor device number for a mounted device path
+
+        With block_devices the device is looked up from the block device inventory,
+        otherwise the device path is checked with stat
+        """
+        if not device.startswith('/'):
+            return None
+        if block_devices is not None:
+            item = block_devices.get_by_path(device)
+            return item.devno if item is not None else None
+        try:
+            details = os.stat(device)
+        except OSError:
+            return None
+        if not stat.S_ISBLK(details.st_mode):
+            return None
+        return f'{os.major(details.st_rdev)}:{os.minor(details.st_rdev)}'
+
+    def join(self, mountpoints: Iterable[Any], block_devices: Optional[BlockDevices] = None) -> List[Any]:
+        """
+        Set I/O rates for the devices of mountpoints to the io attribute of the mountpoints
+
+        Returns mountpoints with I/O rates. Virtual filesystems are skipped. Snapshots are
+        immutable and are returned as new snapshots with the I/O rates
+        """
+        joined = []
+        for item in mountpoints:
+            rates = None
+            if not item.is_virtual:
+                devno = self.get_device_number(item.device, block_devices)
+                rates = self.rates.get(devno, None) if devno is not None else None
+            if isinstance(item, MountpointSnapshot):
+                item = item.replace(io=rates)
+            else:
+                item.io = rates
+            if rates is not None:
+                joined.append(item)
+        return joined
@@ -0,0 +1,83 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Encoding and decoding of escaped paths in fstab files and mount command output
+
+Paths are decoded with strunvis(3) compatible rules, which include the \\NNN octal escapes
+used on Linux. Paths are encoded with octal escapes, which are understood on all platforms.
+"""
+import re
+
+# Characters decoded from C style single character escapes
+VIS_CHARACTER_ESCAPES = {
+    b'\\': b'\\',
+    b'a': b'\a',
+    b'b': b'\b',
+    b'f': b'\f',
+    b'n': b'\n',
+    b'r': b'\r',
+    b's': b' ',
+    b't': b'\t',
+    b'v': b'\v',
+    b'E': b'\x1b',
+    b'$': b'',
+    b'\n': b'',
+}
+
+RE_VIS_ESCAPE = re.compile(
+    rb'\\(?:(?P<octal>[0-3][0-7]{2}|[0-7]{1,2})|M\^(?P<meta_control>.)|M-(?P<meta>.)|'
+    rb'\^(?P<control>.)|(?P<character>.))',
+    re.DOTALL
+)
+
+# Table for str.translate to encode control characters, space and backslash as octal
+PATH_ENCODE_TABLE = {
+    char: f'\\{char:03o}'
+    for char in (*range(0, 0x21), ord('\\'), 0x7f)
+}
+
+
+def __control_character__(value: bytes) -> int:
+    """
+    Return control character value for a ^X style escape character
+    """
+    return 0x7f if value == b'?' else ord(value) & 0x1f
+
+
+def __decode_escape__(match: re.Match) -> bytes:
+    """
+    Decode a single escape sequence matched by RE_VIS_ESCAPE
+    """
+    groups = match.groupdict()
+    if groups['octal'] is not None:
+        return bytes((int(groups['octal'], 8),))
+    if groups['meta_control'] is not None:
+        return bytes((__control_character__(groups['meta_control']) | 0x80,))
+    if groups['meta'] is not None:
+        return bytes((ord(groups['meta']) | 0x80,))
+    if groups['control'] is not None:
+        return bytes((__control_character__(groups['control']),))
+    return VIS_CHARACTER_ESCAPES.get(groups['character'], match.group(0))
+
+
+def decode_path(value: str) -> str:
+    """
+    Decode a path encoded with octal or strvis(3) escapes
+
+    Unknown escape sequences are returned as is. Decoded bytes which are not valid UTF-8
+    are returned as surrogate escapes, as done by os.fsdecode()
+    """
+    if '\\' not in value:
+        return value
+    data = RE_VIS_ESCAPE.sub(__decode_escape__, value.encode('utf-8', 'surrogateescape'))
+    return data.decode('utf-8', 'surrogateescape')
+
+
+def encode_path(value: str) -> str:
+    """
+    Encode a path for fstab with octal escapes for whitespace, control characters and backslash
+    """
+    return str(value).translate(PATH_ENCODE_TABLE)
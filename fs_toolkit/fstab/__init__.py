@@ -8,3 +8,4 @@ FS toolkit module for fstab parsing
 """
 # flake8: noqa: F401
 from .loader import Fstab
+from .sources import FstabSources
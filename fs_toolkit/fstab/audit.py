@@ -0,0 +1,172 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Batch auditing of fstab files in a process pool
+"""
+import os
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from sys_toolkit.platform import detect_platform_family
+
+from ..exceptions import FilesystemError
+from .loader import Fstab, FSTAB_PLATFORM_CLASSES
+
+AUDIT_TREE_PATTERN = '**/fstab'
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class FstabFileAudit:
+    """
+    Audit results for a single fstab file
+
+    Filesystem types and options are counted by name, options without any values
+    """
+    path: Path
+    entries: int
+    comments: int
+    filesystems: Dict[str, int]
+    options: Dict[str, int]
+    duplicate_mountpoints: List[str]
+    invalid_lines: List[Tuple[int, str]]
+    error: Optional[str]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries = 0
+        self.comments = 0
+        self.filesystems = {}
+        self.options = {}
+        self.duplicate_mountpoints = []
+        self.invalid_lines = []
+        self.error = None
+
+    def __repr__(self) -> str:
+        return str(self.path)
+
+    def load(self, fstab: Fstab) -> None:
+        """
+        Load audit details from a loaded Fstab object
+        """
+        filesystems = Counter()
+        options = Counter()
+        mountpoints = Counter()
+        for entry in fstab:
+            filesystems.update(entry.vfstypes)
+            options.update(option.split('=', 1)[0] for option in entry.options)
+            if entry.mountpoint is not None:
+                mountpoints[str(entry.mountpoint)] += 1
+        self.entries = len(fstab)
+        self.comments = len(fstab.__lines__) - self.entries - len(fstab.invalid_lines)
+        self.filesystems = dict(filesystems)
+        self.options = dict(options)
+        self.duplicate_mountpoints = sorted(path for path, count in mountpoints.items() if count > 1)
+        self.invalid_lines = list(fstab.invalid_lines)
+
+
+class FstabAuditReport:
+    """
+    Aggregated audit results for fstab files
+    """
+    platform: str
+    files: List[FstabFileAudit]
+    filesystems: Counter
+    options: Counter
+
+    def __init__(self, platform: str, files: Iterable[FstabFileAudit]) -> None:
+        self.platform = platform
+        self.files = list(files)
+        self.filesystems = Counter()
+        self.options = Counter()
+        for item in self.files:
+            self.filesystems.update(item.filesystems)
+            self.options.update(item.options)
+
+    def __repr__(self) -> str:
+        return f'{self.platform} fstab audit of {len(self.files)} files'
+
+    @property
+    def entries(self) -> int:
+        """
+        Return total number of fstab entries in audited files
+        """
+        return sum(item.entries for item in self.files)
+
+    @property
+    def duplicate_mountpoints(self) -> Dict[Path, List[str]]:
+        """
+        Return duplicate mountpoints by file for files with duplicate mountpoints
+        """
+        return {item.path: item.duplicate_mountpoints for item in self.files if item.duplicate_mountpoints}
+
+    @property
+    def invalid_lines(self) -> Dict[Path, List[Tuple[int, str]]]:
+        """
+        Return invalid lines by file for files with invalid lines
+        """
+        return {item.path: item.invalid_lines for item in self.files if item.invalid_lines}
+
+    @property
+    def errors(self) -> Dict[Path, str]:
+        """
+        Return errors for files which could not be read
+        """
+        return {item.path: item.error for item in self.files if item.error is not None}
+
+
+def audit_fstab_file(path: Union[str, Path], platform: str) -> FstabFileAudit:
+    """
+    Audit a single fstab file with platform specific fstab entry classes
+
+    Invalid lines are collected to the results and read errors are stored in error
+    """
+    path = Path(path)
+    audit = FstabFileAudit(path)
+    try:
+        fstab = Fstab(path, platform=platform, strict=False)
+        fstab.update()
+        audit.load(fstab)
+    except (FilesystemError, OSError, UnicodeDecodeError) as error:
+        audit.error = str(error)
+    return audit
+
+
+def audit_fstab_files(paths: Iterable[Union[str, Path]],
+                      platform: Optional[str] = None,
+                      max_workers: Optional[int] = None) -> FstabAuditReport:
+    """
+    Audit fstab files in a process pool
+
+    Platform is detected once if not given and the same platform specific fstab parser
+    is used for all files
+    """
+    platform = platform if platform is not None else detect_platform_family()
+    if platform not in FSTAB_PLATFORM_CLASSES:
+        raise FilesystemError(f'Unsupported OS platform: {platform}')
+    paths = [Path(path) for path in paths]
+    if not paths:
+        return FstabAuditReport(platform, [])
+
+    workers = max_workers if max_workers is not None else os.cpu_count() or 1
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        files = executor.map(partial(audit_fstab_file, platform=platform), paths, chunksize=chunksize)
+        return FstabAuditReport(platform, files)
+
+
+def audit_fstab_tree(directory: Union[str, Path],
+                     pattern: str = AUDIT_TREE_PATTERN,
+                     platform: Optional[str] = None,
+                     max_workers: Optional[int] = None) -> FstabAuditReport:
+    """
+    Audit fstab files matching pattern in a directory tree in a process pool
+    """
+    paths = sorted(path for path in Path(directory).glob(pattern) if path.is_file())
+    return audit_fstab_files(paths, platform=platform, max_workers=max_workers)
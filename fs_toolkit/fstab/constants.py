@@ -9,6 +9,8 @@ Constants for fstab loading
 from pathlib import Path
 
 FSTAB_PATH = Path('/etc/fstab')
+FSTAB_DIRECTORY_PATH = Path('/etc/fstab.d')
+FSTAB_DIRECTORY_PATTERN = '*.fstab'
 
 FSTAB_FILE_NONE_VALUES = (
     'none',
@@ -0,0 +1,221 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Mount ordering dependencies between fstab entries
+"""
+import re
+
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, List, Optional
+
+from ..exceptions import FilesystemError
+from .platform.base import FstabEntry
+
+# Mount options with paths or systemd units the mount depends on
+SYSTEMD_DEPENDENCY_OPTIONS = (
+    'x-systemd.after',
+    'x-systemd.requires',
+    'x-systemd.requires-mounts-for',
+)
+RE_SYSTEMD_UNIT_ESCAPE = re.compile(r'\\x([0-9a-fA-F]{2})')
+
+
+def systemd_mount_unit_path(unit: str) -> Optional[str]:
+    """
+    Return path for a systemd .mount unit name, or None if unit is not a mount unit
+    """
+    if not unit.endswith('.mount'):
+        return None
+    name = unit[:-6]
+    if name == '-':
+        return '/'
+    path = '/' + '/'.join(
+        RE_SYSTEMD_UNIT_ESCAPE.sub(lambda match: chr(int(match.group(1), 16)), part)
+        for part in name.split('-')
+    )
+    return path
+
+
+class MountDependencyGraph:
+    """
+    Dependency graph for mounting fstab entries
+
+    An entry depends on the entry mounted on the nearest parent directory of the
+    mountpoint, the entry containing a device or bind mount source path and any entries
+    referred by x-systemd.requires, x-systemd.requires-mounts-for and x-systemd.after
+    options. Entries without a mountpoint, for example swap, are not included.
+    """
+    entries: List[FstabEntry]
+    __mountpoints__: Dict[PurePosixPath, int]
+    __dependencies__: List[List[int]]
+    __dependents__: List[List[int]]
+    __indexes__: Dict[int, int]
+    __levels__: Optional[List[List[int]]]
+
+    def __init__(self, fstab: Iterable[FstabEntry]) -> None:
+        self.entries = [entry for entry in fstab if entry.mountpoint is not None]
+        self.__indexes__ = {id(entry): index for index, entry in enumerate(self.entries)}
+        self.__mountpoints__ = {}
+        self.__dependencies__ = [[] for _entry in self.entries]
+        self.__dependents__ = [[] for _entry in self.entries]
+        self.__levels__ = None
+
+        for index, entry in enumerate(self.entries):
+            path = PurePosixPath(entry.mountpoint)
+            previous = self.__mountpoints__.get(path, None)
+            if previous is not None:
+                self.__add_dependency__(index, previous)
+            self.__mountpoints__[path] = index
+        for index, entry in enumerate(self.entries):
+            self.__add_entry_dependencies__(index, entry)
+
+    def __repr__(self) -> str:
+        return f'mount dependencies for {len(self.entries)} entries'
+
+    def __add_dependency__(self, index: int, dependency: Optional[int]) -> None:
+        """
+        Add dependency to entry by entry indexes
+        """
+        if dependency is None or dependency == index or dependency in self.__dependencies__[index]:
+            return
+        self.__dependencies__[index].append(dependency)
+        self.__dependents__[dependency].append(index)
+
+    def __get_containing_mount__(self, path: str, index: Optional[int] = None) -> Optional[int]:
+        """
+        Return index of the entry with the nearest mountpoint containing the path
+
+        Entry with specified index is skipped when looking up the mountpoint
+        """
+        path = PurePosixPath(path)
+        for parent in (path, *path.parents):
+            match = self.__mountpoints__.get(parent, None)
+            if match is not None and match != index:
+                return match
+        return None
+
+    def __get_option_dependencies__(self, entry: FstabEntry) -> List[str]:
+        """
+        Return paths from systemd dependency options of an entry
+        """
+        paths = []
+        for option in entry.options:
+            name, _separator, value = option.partition('=')
+            if name not in SYSTEMD_DEPENDENCY_OPTIONS or not value:
+                continue
+            if value.startswith('/'):
+                paths.append(value)
+            else:
+                path = systemd_mount_unit_path(value)
+                if path is not None:
+                    paths.append(path)
+        return paths
+
+    def __add_entry_dependencies__(self, index: int, entry: FstabEntry) -> None:
+        """
+        Add dependencies for an entry
+        """
+        path = PurePosixPath(entry.mountpoint)
+        for parent in path.parents:
+            match = self.__mountpoints__.get(parent, None)
+            if match is not None:
+                self.__add_dependency__(index, match)
+                break
+
+        # Device paths and bind mount source paths are both in device
+        if entry.device is not None:
+            self.__add_dependency__(index, self.__get_containing_mount__(str(entry.device), index))
+
+        for option_path in self.__get_option_dependencies__(entry):
+            self.__add_dependency__(index, self.__get_containing_mount__(option_path))
+
+    def __get_index__(self, entry: FstabEntry) -> int:
+        """
+        Return index of entry in the graph
+        """
+        try:
+            return self.__indexes__[id(entry)]
+        except KeyError as error:
+            raise FilesystemError(f'Entry is not in dependency graph: {entry}') from error
+
+    def __get_levels__(self) -> List[List[int]]:
+        """
+        Sort entries to levels with topological sort. Raises FilesystemError if the
+        dependencies contain cycles
+        """
+        if self.__levels__ is not None:
+            return self.__levels__
+        pending = [len(dependencies) for dependencies in self.__dependencies__]
+        level = [index for index, count in enumerate(pending) if count == 0]
+        levels = []
+        sorted_count = 0
+        while level:
+            levels.append(level)
+            sorted_count += len(level)
+            next_level = []
+            for index in level:
+                for dependent in self.__dependents__[index]:
+                    pending[dependent] -= 1
+                    if pending[dependent] == 0:
+                        next_level.append(dependent)
+            level = sorted(next_level)
+        if sorted_count != len(self.entries):
+            cycle = ', '.join(
+                str(self.entries[index].mountpoint) for index, count in enumerate(pending) if count > 0
+            )
+            raise FilesystemError(f'Dependency cycle between fstab entries: {cycle}')
+        self.__levels__ = levels
+        return levels
+
+    @property
+    def has_cycles(self) -> bool:
+        """
+        Check if dependencies contain cycles
+        """
+        try:
+            self.__get_levels__()
+        except FilesystemError:
+            return True
+        return False
+
+    def dependencies(self, entry: FstabEntry) -> List[FstabEntry]:
+        """
+        Return entries the specified entry depends on
+        """
+        return [self.entries[index] for index in self.__dependencies__[self.__get_index__(entry)]]
+
+    def dependents(self, entry: FstabEntry) -> List[FstabEntry]:
+        """
+        Return entries depending on the specified entry
+        """
+        return [self.entries[index] for index in self.__dependents__[self.__get_index__(entry)]]
+
+    def levels(self) -> List[List[FstabEntry]]:
+        """
+        Return entries grouped to levels. Entries in each level only depend on entries
+        in previous levels and can be mounted in parallel
+        """
+        return [[self.entries[index] for index in level] for level in self.__get_levels__()]
+
+    def order(self) -> List[FstabEntry]:
+        """
+        Return entries in mount order
+        """
+        return [self.entries[index] for level in self.__get_levels__() for index in level]
+
+    def fsck_levels(self) -> List[List[FstabEntry]]:
+        """
+        Return entries with fs_passno set grouped to levels which can be checked in parallel
+
+        Entries are grouped by fs_passno and split further by mount dependency levels
+        """
+        passes = {}
+        for level_index, level in enumerate(self.__get_levels__()):
+            for index in level:
+                passno = self.entries[index].fs_passno
+                if passno:
+                    passes.setdefault((passno, level_index), []).append(self.entries[index])
+        return [passes[key] for key in sorted(passes)]
@@ -6,14 +6,18 @@
 """
 Loader for fstab file details with OS specific
 """
+import os
+import tempfile
+
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from ..base import LineLoader
 from ..exceptions import FilesystemError
 from .constants import FSTAB_PATH
 
-from .platform.base import FstabComment, FstabEntry
+from .platform.base import FstabComment, FstabEntry, FstabItem
 from .platform.bsd import BSDFstabComment, BSDFstabEntry
 from .platform.darwin import DarwinFstabComment, DarwinFstabEntry
 from .platform.linux import LinuxFstabComment, LinuxFstabEntry
@@ -26,40 +30,93 @@ FILTER_ARGS = (
     'uuid'
 )
 
+FSTAB_PLATFORM_CLASSES = {
+    'bsd': (BSDFstabEntry, BSDFstabComment),
+    'darwin': (DarwinFstabEntry, DarwinFstabComment),
+    'linux': (LinuxFstabEntry, LinuxFstabComment),
+    'openbsd': (OpenBSDFstabEntry, OpenBSDFstabComment),
+}
+
 
 class Fstab(LineLoader):
     """
     Lines in /etc/fstab
+
+    With auto_refresh enabled every access checks the fstab file with os.stat() and
+    reloads the file if the modification time, inode or size of the file changed.
+
+    Entries can be edited with add_entry(), remove_entry() and replace_entry() and written
+    back to the file with save(). Comments and unchanged lines are written as loaded.
+
+    Platform detection is skipped if platform is given. With strict set to False invalid
+    lines don't raise errors but are collected to invalid_lines as line number and line.
     """
     path: Path
+    auto_refresh: bool
+    strict: bool
+    invalid_lines: List[Tuple[int, str]]
     __fstab_entry_class__: FstabEntry
     __fstab_comment_class__: FstabComment
     __lines__: list[str]
+    __file_signature__: Optional[Tuple[int, int, int]]
+    __changed__: bool
+    __batch_depth__: int
+    __indexes__: Tuple[Tuple[FstabEntry, ...], Dict[str, Dict[Any, FstabEntry]]]
 
-    def __init__(self, path: Optional[str] = None) -> None:
-        super().__init__()
+    def __init__(self,
+                 path: Optional[str] = None,
+                 auto_refresh: bool = False,
+                 *,
+                 platform: Optional[str] = None,
+                 strict: bool = True) -> None:
+        super().__init__(platform=platform)
         self.__detect_fstab_class__()
         self.path = Path(path) if path is not None else FSTAB_PATH
+        self.auto_refresh = auto_refresh
+        self.strict = strict
+        self.invalid_lines = []
         self.__lines__ = []
+        self.__file_signature__ = None
+        self.__changed__ = False
+        self.__batch_depth__ = 0
+        self.__indexes__ = ((), {})
+
+    @property
+    def __requires_reload__(self) -> bool:
+        """
+        Check if fstab must be loaded, or with auto_refresh if fstab file has been changed
+        """
+        if super().__requires_reload__:
+            return True
+        if self.auto_refresh and not self.__loading__ and not self.__changed__:
+            return self.__source_changed__()
+        return False
+
+    def __source_changed__(self) -> bool:
+        """
+        Check if the fstab file has been changed after loading
+        """
+        return self.__get_file_signature__() != self.__file_signature__
 
     def __detect_fstab_class__(self) -> None:
         """
         Detect platform specific class for fstab items
         """
-        if self.__platform__ == 'bsd':
-            self.__fstab_entry_class__ = BSDFstabEntry
-            self.__fstab_comment_class__ = BSDFstabComment
-        elif self.__platform__ == 'darwin':
-            self.__fstab_entry_class__ = DarwinFstabEntry
-            self.__fstab_comment_class__ = DarwinFstabComment
-        elif self.__platform__ == 'linux':
-            self.__fstab_entry_class__ = LinuxFstabEntry
-            self.__fstab_comment_class__ = LinuxFstabComment
-        elif self.__platform__ == 'openbsd':
-            self.__fstab_entry_class__ = OpenBSDFstabEntry
-            self.__fstab_comment_class__ = OpenBSDFstabComment
-        else:
-            raise FilesystemError(f'Unsupported OS platform: {self.__platform__}')
+        try:
+            self.__fstab_entry_class__, self.__fstab_comment_class__ = FSTAB_PLATFORM_CLASSES[self.__platform__]
+        except KeyError as error:
+            raise FilesystemError(f'Unsupported OS platform: {self.__platform__}') from error
+
+    def __get_file_signature__(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Return tuple of mtime in nanoseconds, inode and size of the fstab file or
+        None if the file can't be accessed
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
 
     def __get_fstab_lines__(self) -> List[str]:
         """
@@ -68,38 +125,210 @@ class Fstab(LineLoader):
         with self.path.open('r', encoding='utf-8') as handle:
             return handle.readlines()
 
-    def __load_fstab__(self) -> None:
+    def __load_fstab__(self) -> List[FstabItem]:
         """
-        Load fstab lines. This is called from update() method only
+        Load and return fstab lines. This is called from update() method only
+
+        Lines which are not changed since previous load reuse the existing comment and
+        entry objects. Reused comment objects for lines which are not comments are invalid
+        lines loaded earlier, and are collected to invalid_lines again
         """
-        self.__lines__ = []
-        for line in self.__get_fstab_lines__():
+        previous = {}
+        for item in self.__lines__:
+            previous.setdefault(item.__line__, []).append(item)
+        for items in previous.values():
+            items.reverse()
+
+        lines = []
+        invalid_lines = []
+        for index, line in enumerate(self.__get_fstab_lines__()):
             line = line.rstrip()
-            if line == '' or line.startswith('#'):
-                self.__lines__.append(self.__fstab_comment_class__(line))
+            is_comment = line == '' or line.startswith('#')
+            existing = previous.get(line, None)
+            if existing and (is_comment or isinstance(existing[-1], FstabEntry) or not self.strict):
+                item = existing.pop()
+                if not is_comment and not isinstance(item, FstabEntry):
+                    invalid_lines.append((index + 1, line))
+                lines.append(item)
+                continue
+
+            if is_comment:
+                lines.append(self.__fstab_comment_class__(line))
+                continue
+
+            try:
+                entry = self.__fstab_entry_class__(line)
+            except FilesystemError:
+                if self.strict:
+                    raise
+                invalid_lines.append((index + 1, line))
+                lines.append(self.__fstab_comment_class__(line))
                 continue
+            entry.source = self.path
+            lines.append(entry)
+        self.invalid_lines = invalid_lines
+        return lines
+
+    def __get_entry_item__(self, entry: Union[str, FstabEntry]) -> FstabEntry:
+        """
+        Return fstab entry object for a fstab line string or entry
+        """
+        if isinstance(entry, str):
+            entry = self.__fstab_entry_class__(entry)
+        if not isinstance(entry, FstabEntry):
+            raise FilesystemError(f'Unexpected fstab entry: {entry}')
+        entry.source = self.path
+        return entry
+
+    def __get_line_index__(self, entry: Union[str, FstabEntry]) -> int:
+        """
+        Return index of an existing fstab entry in fstab lines
+        """
+        if self.__requires_reload__:
+            self.update()
+        for index, item in enumerate(self.__lines__):
+            if item is entry:
+                return index
+        for index, item in enumerate(self.__lines__):
+            if isinstance(item, FstabEntry) and item == entry:
+                return index
+        raise FilesystemError(f'Entry not found in {self.path}: {entry}')
+
+    def __set_lines__(self, lines: List[FstabItem]) -> None:
+        """
+        Set fstab lines after editing and mark the fstab changed
+        """
+        self.__lines__ = lines
+        self.__items__ = tuple(item for item in lines if isinstance(item, FstabEntry))
+        self.__changed__ = True
+
+    def add_entry(self, entry: Union[str, FstabEntry]) -> FstabEntry:
+        """
+        Add a new entry to the end of fstab. Changes are written to disk with save()
+        """
+        if self.__requires_reload__:
+            self.update()
+        entry = self.__get_entry_item__(entry)
+        self.__set_lines__(self.__lines__ + [entry])
+        return entry
 
-            entry = self.__fstab_entry_class__(line)
-            self.__lines__.append(entry)
-            self.append(entry)
+    def remove_entry(self, entry: Union[str, FstabEntry]) -> None:
+        """
+        Remove an existing entry from fstab. Changes are written to disk with save()
+        """
+        index = self.__get_line_index__(entry)
+        self.__set_lines__(self.__lines__[:index] + self.__lines__[index + 1:])
+
+    def replace_entry(self, entry: Union[str, FstabEntry], value: Union[str, FstabEntry]) -> FstabEntry:
+        """
+        Replace an existing entry in fstab in place. Changes are written to disk with save()
+        """
+        index = self.__get_line_index__(entry)
+        value = self.__get_entry_item__(value)
+        self.__set_lines__(self.__lines__[:index] + [value] + self.__lines__[index + 1:])
+        return value
+
+    @contextmanager
+    def batch(self) -> Iterator['Fstab']:
+        """
+        Context manager to group fstab edits to a single save() call
+
+        The file is written when the outermost batch exits. If an exception is raised
+        inside the batch, the edits made in the batch are discarded.
+        """
+        if self.__requires_reload__:
+            self.update()
+        lines = self.__lines__
+        changed = self.__changed__
+        self.__batch_depth__ += 1
+        try:
+            yield self
+        except Exception:
+            self.__set_lines__(lines)
+            self.__changed__ = changed
+            raise
+        finally:
+            self.__batch_depth__ -= 1
+        if self.__batch_depth__ == 0:
+            self.save()
+
+    def __write_file__(self, data: str) -> None:
+        """
+        Write data to the fstab file atomically with a temporary file in the same directory
+
+        Mode of the existing file is kept, and owner and group are kept when permitted
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            stat = None
+        fd, tmpfile = tempfile.mkstemp(dir=self.path.parent, prefix=f'.{self.path.name}.')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.chmod(tmpfile, stat.st_mode & 0o7777 if stat is not None else 0o644)
+            if stat is not None:
+                try:
+                    os.chown(tmpfile, stat.st_uid, stat.st_gid)
+                except PermissionError:
+                    pass
+            os.replace(tmpfile, self.path)
+        except OSError as error:
+            if os.path.exists(tmpfile):
+                os.unlink(tmpfile)
+            raise FilesystemError(f'Error writing {self.path}: {error}') from error
+        fd = os.open(self.path.parent, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def save(self) -> bool:
+        """
+        Write edited fstab lines back to the fstab file
+
+        Returns False if there were no changes to save. Raises FilesystemError if the
+        file has been modified on disk after it was loaded.
+        """
+        if not self.__changed__:
+            return False
+        if self.__get_file_signature__() != self.__file_signature__:
+            raise FilesystemError(f'File {self.path} was modified after loading')
+        self.__write_file__(''.join(f'{item}\n' for item in self.__lines__))
+        self.__file_signature__ = self.__get_file_signature__()
+        self.__changed__ = False
+        return True
 
-    def __encode_mountpoint_path__(self, path: str) -> Path:
+    def __get_index__(self, attr: str) -> Dict[Any, FstabEntry]:
         """
-        Encode mountpoint path string. Replaces space and tab in string with
-        escape sequences ’\040' and '\011' respectively as is done on Linux
+        Return index of fstab entries by attribute value. Index is built on first use
+        and maps each value to the first entry with the value
 
-        For full BSD compatibility this should implement full strunvis(3) encoding support
+        Indexes are stored with the snapshot of items they were built from, and are built
+        again when the items have been changed
         """
-        return Path(str(path).replace(' ', '\\040').replace('\t', '\\011')).expanduser()
+        if self.__requires_reload__:
+            self.update()
+        items = self.__items__
+        indexed_items, indexes = self.__indexes__
+        if indexed_items is not items:
+            indexes = {}
+            self.__indexes__ = (items, indexes)
+        index = indexes.get(attr, None)
+        if index is None:
+            index = {}
+            for item in items:
+                index.setdefault(getattr(item, attr, None), item)
+            indexes[attr] = index
+        return index
 
     def __get_by_attr__(self, attr: str, value: str) -> Optional[FstabEntry]:
         """
         Get an entry by property or attribute value. Returns None if no match is found
         """
-        for item in self:
-            if getattr(item, attr, None) == value:
-                return item
-        return None
+        return self.__get_index__(attr).get(value, None)
 
     def get_by_uuid(self, uuid: str) -> Optional[FstabEntry]:
         """
@@ -123,7 +352,7 @@ class Fstab(LineLoader):
         """
         Get a fstab item by label
         """
-        return self.__get_by_attr__('mountpoint', self.__encode_mountpoint_path__(path))
+        return self.__get_by_attr__('mountpoint', Path(path).expanduser())
 
     def __validate_filter_kwargs__(self, **kwargs: Dict[str, str]) -> Dict[str, str]:
         """
@@ -165,15 +394,16 @@ class Fstab(LineLoader):
                 matches.append(match)
         return matches
 
-    def update(self) -> None:
+    def __load_items__(self) -> List[FstabEntry]:
         """
-        Update fstab information
+        Load fstab lines and return fstab entries
         """
-        self.clear()
-        self.__start_update__()
         try:
-            self.__load_fstab__()
+            file_signature = self.__get_file_signature__()
+            lines = self.__load_fstab__()
         except FilesystemError as error:
-            self.__reset__()
             raise FilesystemError(error) from error
-        self.__finish_update__()
+        self.__file_signature__ = file_signature
+        self.__lines__ = lines
+        self.__changed__ = False
+        return [item for item in self.__lines__ if isinstance(item, FstabEntry)]
@@ -10,6 +10,7 @@ from pathlib import Path
 from operator import eq, ne, ge, gt, le, lt
 from typing import Callable, List, Optional, Union
 
+from ...encoding import decode_path
 from ...exceptions import FilesystemError
 from ..constants import FSTAB_FIELDS, FSTAB_INT_FIELDS, FSTAB_FILE_NONE_VALUES
 
@@ -19,6 +20,7 @@ class FstabItem:
     Generic fstab item text line
     """
     __line__: str
+    source: Optional[Path] = None
 
     def __init__(self, line: str) -> None:
         self.__line__ = line
@@ -71,7 +73,9 @@ class FstabEntry(FstabItem):
     fs_vfstype: str
     fs_mntops: str
     fs_freq: Optional[int]
-    fs_freq: Optional[int]
+    fs_passno: Optional[int]
+    __decoded_fs_spec__: str
+    __decoded_fs_file__: str
 
     def __init__(self, line: str) -> None:
         super().__init__(line)
@@ -86,6 +90,9 @@ class FstabEntry(FstabItem):
     def __parse_line__(self, line: str) -> None:
         """
         Parse fstab line to entry attributes with FSTAB_FIELDS
+
+        Escaped fs_spec and fs_file fields are decoded once here for the path and
+        identifier properties
         """
         fields = line.split()
         if len(fields) < 4 or len(fields) > 6:
@@ -96,29 +103,34 @@ class FstabEntry(FstabItem):
             except IndexError:
                 value = None
             if field in FSTAB_INT_FIELDS and value is not None:
-                value = int(value)
+                try:
+                    value = int(value)
+                except ValueError as error:
+                    raise FilesystemError(f'Invalid {field} value in fstab line: {line}') from error
             setattr(self, field, value)
+        self.__decoded_fs_spec__ = decode_path(self.fs_spec)
+        self.__decoded_fs_file__ = decode_path(self.fs_file)
 
     @property
     def device(self) -> Optional[Path]:
         """
         Return path of device if fs_spec contains a path
         """
-        return Path(self.fs_spec) if self.fs_spec[0] == '/' else None
+        return Path(self.__decoded_fs_spec__) if self.fs_spec[0] == '/' else None
 
     @property
     def label(self) -> Optional[str]:
         """
         Return label of device if fs_spec is in LABEL format
         """
-        return self.fs_spec[5:] if self.fs_spec[:5].upper() == 'LABEL=' else None
+        return self.__decoded_fs_spec__[6:] if self.fs_spec[:6].upper() == 'LABEL=' else None
 
     @property
     def mountpoint(self) -> Optional[Path]:
         """
-        Return path of device if fs_spec contains a path
+        Return decoded mountpoint path unless fs_file is a none value
         """
-        return Path(self.fs_file) if self.fs_file not in FSTAB_FILE_NONE_VALUES else None
+        return Path(self.__decoded_fs_file__) if self.fs_file not in FSTAB_FILE_NONE_VALUES else None
 
     @property
     def options(self) -> List[str]:
@@ -132,7 +144,7 @@ class FstabEntry(FstabItem):
         """
         Return partition LABEL of device if fs_spec is in PARTLABEL format
         """
-        return self.fs_spec[10:] if self.fs_spec[:10].upper() == 'PARTLABEL=' else None
+        return self.__decoded_fs_spec__[10:] if self.fs_spec[:10].upper() == 'PARTLABEL=' else None
 
     @property
     def partition_uuid(self) -> Optional[str]:
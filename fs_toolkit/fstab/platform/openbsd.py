@@ -4,16 +4,24 @@
 # SPDX-License-Identifier: BSD-3-Clause
 #
 """
-Platform specific code to handle fstab devices on OpenOpenBSD
+Platform specific code to handle fstab devices on OpenBSD
 """
+import re
+
 from pathlib import Path
-from typing import Optional
+from threading import Lock
+from typing import Dict, Optional
 
 from sys_toolkit.collection import CachedMutableMapping
 from sys_toolkit.subprocess import run_command
 
 from .base import FstabComment, FstabEntry
 
+RE_DUID_FS_SPEC = re.compile(r'^(?P<duid>[0-9a-fA-F]{16})\.(?P<partition>[a-p])$')
+
+DUID_MAP: Optional['DuidMap'] = None
+DUID_MAP_LOCK = Lock()
+
 
 # pylint: disable=too-few-public-methods
 class OpenBSDFstabComment(FstabComment):
@@ -25,13 +33,66 @@ class OpenBSDFstabComment(FstabComment):
 class OpenBSDFstabEntry(FstabEntry):
     """
     OpenBSD specific class for fstab entries
+
+    The device of entries with DUID format fs_spec is looked up from the shared DUID map
+    on every access, so devices follow refreshes of the map
     """
 
+    @property
+    def duid(self) -> Optional[str]:
+        """
+        Return disklabel DUID if fs_spec is in DUID format
+        """
+        match = RE_DUID_FS_SPEC.match(self.fs_spec)
+        return match.groupdict()['duid'] if match else None
+
+    @property
+    def device(self) -> Optional[Path]:
+        """
+        Return path of device from fs_spec path or by resolving the DUID in fs_spec
+        """
+        if self.fs_spec[0] == '/':
+            return super().device
+        match = RE_DUID_FS_SPEC.match(self.fs_spec)
+        if not match:
+            return None
+        device = get_duid_map().get_device(match.groupdict()['duid'])
+        return Path(f'{device}{match.groupdict()["partition"]}') if device is not None else None
+
 
 class DuidMap(CachedMutableMapping):
     """
-    OpenOpenBSD Disklabel Unique Identifiers (DUIDs) mapping to device names
+    OpenBSD Disklabel Unique Identifiers (DUIDs) mapping to device names
+
+    The map contains device names as keys and DUIDs as values, with a reverse index
+    from DUIDs to device names
     """
+    __duids__: Dict[str, str]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.__items__ = {}
+        self.__duids__ = {}
+
+    def __setitem__(self, index: str, value: Optional[str]) -> None:
+        """
+        Set DUID for device, updating the reverse index
+        """
+        if index in self.__items__:
+            self.__delitem__(index)
+        super().__setitem__(index, value)
+        if value is not None:
+            self.__duids__[value.upper()] = index
+
+    def __delitem__(self, index: str) -> None:
+        """
+        Remove device, updating the reverse index
+        """
+        duid = self.__items__[index]
+        super().__delitem__(index)
+        if duid is not None and self.__duids__.get(duid.upper(), None) == index:
+            del self.__duids__[duid.upper()]
+
     def __get_sysctl_output__(self) -> str:
         """
         Get the sysctl output lines
@@ -43,20 +104,48 @@ class DuidMap(CachedMutableMapping):
         """
         Update DUID map values
         """
-        self.__items__ = {}
         self.__start_update__()
-        for item in self.__get_sysctl_output__()[0].split(','):
-            device, duid = item.split(':', 1)
+        items = {}
+        duids = {}
+        lines = self.__get_sysctl_output__()
+        for item in lines[0].split(',') if lines else []:
+            device, duid = item.strip().split(':', 1)
             if not duid:
                 duid = None
-            self[device] = duid
+            else:
+                duids[duid.upper()] = device
+            items[device] = duid
+        self.__items__ = items
+        self.__duids__ = duids
         self.__finish_update__()
 
     def get_device(self, value: str) -> Optional[Path]:
         """
         Get device with full path by DUID. Return None if DUID is not found
         """
-        for device, duid in self.items():
-            if duid == value:
-                return Path(f'/dev/{device}')
-        return None
+        if self.__requires_reload__:
+            self.update()
+        device = self.__duids__.get(value.upper(), None)
+        return Path(f'/dev/{device}') if device is not None else None
+
+    def get_duid(self, device: str) -> Optional[str]:
+        """
+        Get DUID for device name or device path. Return None if device has no DUID
+        """
+        if self.__requires_reload__:
+            self.update()
+        return self.__items__.get(Path(device).name, None)
+
+
+def get_duid_map(refresh: bool = False) -> DuidMap:
+    """
+    Return DUID map shared in the process. The map is loaded on first use and
+    reloaded only when refresh is requested
+    """
+    global DUID_MAP  # pylint: disable=global-statement
+    with DUID_MAP_LOCK:
+        if DUID_MAP is None:
+            DUID_MAP = DuidMap()
+        if refresh or DUID_MAP.__requires_reload__:
+            DUID_MAP.update()
+        return DUID_MAP
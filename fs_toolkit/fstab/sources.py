@@ -0,0 +1,160 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Merged fstab entries from multiple fstab files and fstab fragment directories
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from ..exceptions import FilesystemError
+from .constants import FSTAB_DIRECTORY_PATH, FSTAB_DIRECTORY_PATTERN, FSTAB_PATH
+from .loader import Fstab
+from .platform.base import FstabItem
+
+
+class FstabSources(Fstab):
+    """
+    Fstab entries merged from fstab files and *.fstab fragments in fstab directories
+
+    Paths are resolved relative to the root directory when root is given, for example to
+    read fstab files from chroot or image directories. Each source file is loaded with a
+    separate Fstab object, which is only loaded again when the file has been changed.
+    The source file of each entry is available in the entry source attribute.
+
+    Entries in the merged view can't be edited. Use get_source() to edit source files.
+    """
+    root: Optional[Path]
+    paths: Tuple[Path]
+    directories: Tuple[Path]
+    pattern: str
+    max_workers: Optional[int]
+    __sources__: Dict[Path, Fstab]
+    __directory_signatures__: Dict[Path, Optional[Tuple[int, int, int]]]
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 paths: Optional[Iterable[Union[str, Path]]] = None,
+                 directories: Optional[Iterable[Union[str, Path]]] = None,
+                 root: Optional[Union[str, Path]] = None,
+                 *,
+                 pattern: str = FSTAB_DIRECTORY_PATTERN,
+                 auto_refresh: bool = False,
+                 max_workers: Optional[int] = None) -> None:
+        self.root = Path(root) if root is not None else None
+        paths = paths if paths is not None else (FSTAB_PATH,)
+        directories = directories if directories is not None else (FSTAB_DIRECTORY_PATH,)
+        self.paths = tuple(self.__get_root_path__(path) for path in paths)
+        self.directories = tuple(self.__get_root_path__(path) for path in directories)
+        super().__init__(path=self.paths[0] if self.paths else None, auto_refresh=auto_refresh)
+        self.pattern = pattern
+        self.max_workers = max_workers
+        self.__sources__ = {}
+        self.__directory_signatures__ = {}
+
+    def __get_root_path__(self, path: Union[str, Path]) -> Path:
+        """
+        Return path resolved relative to the root directory
+        """
+        path = Path(path)
+        if self.root is None:
+            return path
+        return self.root.joinpath(path.relative_to(path.anchor)) if path.is_absolute() else self.root.joinpath(path)
+
+    def __get_directory_signatures__(self) -> Dict[Path, Optional[Tuple[int, int, int]]]:
+        """
+        Return signatures for fstab fragment directories
+        """
+        signatures = {}
+        for directory in self.directories:
+            try:
+                stat = directory.stat()
+                signatures[directory] = (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+            except OSError:
+                signatures[directory] = None
+        return signatures
+
+    def __get_source_paths__(self) -> List[Path]:
+        """
+        Return list of fstab source files in load order
+
+        Fragment files in each directory are sorted by name. Missing directories are ignored.
+        """
+        paths = list(self.paths)
+        for directory in self.directories:
+            if directory.is_dir():
+                paths.extend(sorted(path for path in directory.glob(self.pattern) if path.is_file()))
+        return paths
+
+    def __source_changed__(self) -> bool:
+        """
+        Check if fstab directories or any of the loaded source files have been changed
+        """
+        if self.__get_directory_signatures__() != self.__directory_signatures__:
+            return True
+        return any(source.__source_changed__() for source in self.__sources__.values())
+
+    @staticmethod
+    def __load_source__(source: Fstab) -> List[FstabItem]:
+        """
+        Load lines from a fstab source. The source is loaded only if it has been changed
+        """
+        try:
+            if source.__requires_reload__:
+                source.update()
+        except OSError as error:
+            raise FilesystemError(f'Error loading {source.path}: {error}') from error
+        return source.__lines__
+
+    def __load_fstab__(self) -> List[FstabItem]:
+        """
+        Load and return lines from all fstab sources in parallel
+        """
+        self.__directory_signatures__ = self.__get_directory_signatures__()
+        sources = {}
+        for path in self.__get_source_paths__():
+            source = self.__sources__.get(path, None)
+            if source is None:
+                source = Fstab(path, auto_refresh=True, platform=self.__platform__)
+            sources[path] = source
+        self.__sources__ = sources
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(self.__load_source__, sources.values()))
+
+        return [line for lines in results for line in lines]
+
+    @property
+    def sources(self) -> List[Path]:
+        """
+        Return paths of loaded fstab source files
+        """
+        if self.__requires_reload__:
+            self.update()
+        return list(self.__sources__)
+
+    def get_source(self, path: Union[str, Path]) -> Fstab:
+        """
+        Return Fstab object for a loaded source file
+        """
+        if self.__requires_reload__:
+            self.update()
+        try:
+            return self.__sources__[Path(path)]
+        except KeyError as error:
+            raise FilesystemError(f'Unknown fstab source: {path}') from error
+
+    def __set_lines__(self, lines: List[FstabItem]) -> None:
+        """
+        Merged fstab sources can't be edited
+        """
+        raise FilesystemError('Merged fstab sources can not be edited, edit source with get_source()')
+
+    def save(self) -> bool:
+        """
+        Merged fstab sources can't be saved
+        """
+        raise FilesystemError('Merged fstab sources can not be saved, save source with get_source()')
@@ -0,0 +1,231 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Capacity of mountpoints with each underlying filesystem counted once
+
+The same filesystem is often mounted more than once, for example with bind mounts, btrfs
+subvolumes or datasets in a shared ZFS pool. Mountpoints are grouped by filesystem identity
+in one pass, and capacity is summed over the groups instead of the mountpoints.
+
+Filesystem identity is detected from the mountpoint data:
+
+- datasets of pooled filesystems (ZFS) are grouped by pool name. Used space of datasets is
+  summed and the pool available space is counted once
+- network mounts are grouped by server and export path, since usage counters of different
+  exports can be identical and usage of the same export changes between samples
+- virtual filesystems are grouped by mountpoint, since the device is only a name
+- other mounts are grouped by device, which matches bind mounts and btrfs subvolumes
+"""
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+POOL_FILESYSTEMS = ('zfs',)
+
+
+def __get_filesystem_name__(item: Any) -> str:
+    """
+    Return filesystem type name of a mountpoint or mountpoint snapshot
+    """
+    filesystem = item.filesystem
+    if filesystem is not None and not isinstance(filesystem, str):
+        filesystem = filesystem.name
+    return filesystem or ''
+
+
+def __get_usage__(item: Any, attr: str) -> Optional[int]:
+    """
+    Return usage counter of a mountpoint or mountpoint snapshot
+    """
+    return getattr(getattr(item, 'usage', item), attr, None)
+
+
+def __get_network_export__(device: str) -> Optional[Tuple[str, str]]:
+    """
+    Return server name and export path for network mount devices like server:/path and
+    //server/share
+    """
+    if device.startswith('//'):
+        server, _separator, path = device[2:].partition('/')
+    elif ':' in device and not device.startswith('/'):
+        server, path = device.split(':', 1)
+    else:
+        return None
+    return server, f'/{path.strip("/")}'
+
+
+def get_filesystem_identity(item: Any) -> Hashable:
+    """
+    Return key identifying the filesystem of a mountpoint or mountpoint snapshot
+    """
+    filesystem = __get_filesystem_name__(item)
+    if filesystem in POOL_FILESYSTEMS:
+        return ('pool', filesystem, item.device.split('/', 1)[0])
+    if item.is_virtual:
+        return ('virtual', item.mountpoint)
+    export = __get_network_export__(item.device)
+    if export is not None:
+        return ('network', *export)
+    return ('device', item.device)
+
+
+class FilesystemCapacity:
+    """
+    Capacity of a filesystem mounted on one or more mountpoints
+    """
+    identity: Hashable
+    device: str
+    filesystem: str
+    pooled: bool
+    mountpoints: List[Any]
+    size: int
+    used: int
+    available: int
+
+    def __init__(self, identity: Hashable, item: Any) -> None:
+        self.identity = identity
+        self.filesystem = __get_filesystem_name__(item)
+        self.pooled = identity[0] == 'pool'
+        self.device = identity[2] if self.pooled else item.device
+        self.mountpoints = []
+        self.size = 0
+        self.used = 0
+        self.available = 0
+
+    def __repr__(self) -> str:
+        return f'{self.device} {self.filesystem} mounted on {len(self.mountpoints)} mountpoints'
+
+    def add(self, item: Any) -> None:
+        """
+        Add a mountpoint of the filesystem
+
+        Datasets of a pool add their used space to the pool. Other mountpoints of the same
+        filesystem report the same usage, which is counted once
+        """
+        self.mountpoints.append(item)
+        used = __get_usage__(item, 'used') or 0
+        available = __get_usage__(item, 'available') or 0
+        if self.pooled:
+            self.used += used
+            self.available = max(self.available, available)
+            self.size = self.used + self.available
+        elif len(self.mountpoints) == 1:
+            self.size = __get_usage__(item, 'size') or 0
+            self.used = used
+            self.available = available
+
+
+class CapacityTotal:
+    """
+    Total capacity of filesystems
+    """
+    filesystems: List[FilesystemCapacity]
+    size: int
+    used: int
+    available: int
+
+    def __init__(self, filesystems: Iterable[FilesystemCapacity] = ()) -> None:
+        self.filesystems = []
+        self.size = 0
+        self.used = 0
+        self.available = 0
+        for filesystem in filesystems:
+            self.add(filesystem)
+
+    def __repr__(self) -> str:
+        return f'{len(self.filesystems)} filesystems size {self.size} used {self.used}'
+
+    def __len__(self) -> int:
+        return len(self.filesystems)
+
+    @property
+    def percent(self) -> Optional[int]:
+        """
+        Return used space as rounded up percent of used and available space, like df
+        """
+        total = self.used + self.available
+        if not total:
+            return None
+        return -(-self.used * 100 // total)
+
+    def add(self, filesystem: FilesystemCapacity) -> None:
+        """
+        Add filesystem to the total
+        """
+        self.filesystems.append(filesystem)
+        self.size += filesystem.size
+        self.used += filesystem.used
+        self.available += filesystem.available
+
+
+class MountpointsCapacity:
+    """
+    Capacity of mountpoints deduplicated by filesystem identity
+
+    Virtual filesystems and mountpoints without usage data are not included unless
+    include_virtual is set
+    """
+    filesystems: Dict[Hashable, FilesystemCapacity]
+
+    def __init__(self, mountpoints: Iterable[Any], include_virtual: bool = False) -> None:
+        self.filesystems = {}
+        for item in mountpoints:
+            if item.is_virtual and not include_virtual:
+                continue
+            if __get_usage__(item, 'size') is None:
+                continue
+            identity = get_filesystem_identity(item)
+            filesystem = self.filesystems.get(identity, None)
+            if filesystem is None:
+                filesystem = self.filesystems[identity] = FilesystemCapacity(identity, item)
+            filesystem.add(item)
+
+    def __repr__(self) -> str:
+        return f'capacity of {len(self.filesystems)} filesystems'
+
+    def __len__(self) -> int:
+        return len(self.filesystems)
+
+    @property
+    def total(self) -> CapacityTotal:
+        """
+        Return total capacity of all filesystems
+        """
+        return CapacityTotal(self.filesystems.values())
+
+    def __group__(self, attr: str) -> Dict[str, CapacityTotal]:
+        """
+        Return capacity totals grouped by filesystem attribute
+        """
+        totals = {}
+        for filesystem in self.filesystems.values():
+            key = getattr(filesystem, attr)
+            total = totals.get(key, None)
+            if total is None:
+                total = totals[key] = CapacityTotal()
+            total.add(filesystem)
+        return totals
+
+    def by_filesystem(self) -> Dict[str, CapacityTotal]:
+        """
+        Return capacity totals by filesystem type
+        """
+        return self.__group__('filesystem')
+
+    def by_device(self) -> Dict[str, CapacityTotal]:
+        """
+        Return capacity totals by device, with pools as the device for pooled filesystems
+        """
+        return self.__group__('device')
+
+
+def get_host_capacity(hosts: Dict[str, Iterable[Any]],
+                      include_virtual: bool = False) -> Dict[str, CapacityTotal]:
+    """
+    Return total deduplicated capacity for mountpoints of hosts
+    """
+    return {
+        host: MountpointsCapacity(mountpoints, include_virtual=include_virtual).total
+        for host, mountpoints in hosts.items()
+    }
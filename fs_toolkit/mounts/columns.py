@@ -0,0 +1,147 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Columnar view of mountpoint usage
+
+Columns are contiguous array.array objects supporting the buffer protocol, which can be
+used with numpy without copying the data. numpy is not required by this module.
+"""
+from array import array
+from typing import Any, Dict, Iterable, List, Tuple
+
+from ..exceptions import FilesystemError
+
+MISSING_VALUE = -1
+
+USAGE_COLUMNS = (
+    'size',
+    'used',
+    'available',
+    'percent',
+    'inodes_used',
+    'inodes_available',
+    'inodes_percent',
+)
+CATEGORY_COLUMNS = (
+    'device',
+    'filesystem',
+    'mountpoint',
+)
+
+
+def __get_usage_value__(item: Any, attr: str) -> int:
+    """
+    Return usage value of a mountpoint or mountpoint snapshot, or MISSING_VALUE
+    """
+    value = getattr(getattr(item, 'usage', item), attr, None)
+    return MISSING_VALUE if value is None else value
+
+
+def __get_category_value__(item: Any, attr: str) -> str:
+    """
+    Return categorical value of a mountpoint or mountpoint snapshot as string
+    """
+    value = getattr(item, attr)
+    if attr == 'filesystem' and value is not None and not isinstance(value, str):
+        value = value.name
+    return '' if value is None else str(value)
+
+
+class MountpointColumns:
+    """
+    Mountpoint usage as columns with one value for each mountpoint
+
+    Usage columns are int64 arrays with MISSING_VALUE for missing values. Categorical
+    columns are uint32 arrays of codes to the list of values in categories. The virtual
+    column is an array of 0 and 1 values.
+    """
+    mountpoints: Tuple[Any, ...]
+    columns: Dict[str, array]
+    codes: Dict[str, array]
+    categories: Dict[str, List[str]]
+    virtual: array
+    __category_codes__: Dict[str, Dict[str, int]]
+
+    def __init__(self, mountpoints: Iterable[Any]) -> None:
+        self.mountpoints = tuple(mountpoints)
+        self.columns = {
+            attr: array('q', [__get_usage_value__(item, attr) for item in self.mountpoints])
+            for attr in USAGE_COLUMNS
+        }
+        self.codes = {}
+        self.categories = {}
+        self.__category_codes__ = {}
+        for attr in CATEGORY_COLUMNS:
+            self.__add_category__(attr)
+        self.virtual = array('B', [1 if item.is_virtual else 0 for item in self.mountpoints])
+
+    def __repr__(self) -> str:
+        return f'{len(self)} mountpoints in columns'
+
+    def __len__(self) -> int:
+        return len(self.mountpoints)
+
+    def __add_category__(self, attr: str) -> None:
+        """
+        Add categorical column with codes for unique values
+        """
+        categories = {}
+        codes = array('I')
+        for item in self.mountpoints:
+            value = __get_category_value__(item, attr)
+            code = categories.get(value, None)
+            if code is None:
+                code = categories[value] = len(categories)
+            codes.append(code)
+        self.codes[attr] = codes
+        self.categories[attr] = list(categories)
+        self.__category_codes__[attr] = categories
+
+    def get_code(self, column: str, value: str) -> int:
+        """
+        Return code for a value in a categorical column, or -1 for unknown values
+        """
+        try:
+            codes = self.__category_codes__[column]
+        except KeyError as error:
+            raise FilesystemError(f'Unknown categorical column: {column}') from error
+        return codes.get(value, -1)
+
+    def column(self, name: str) -> array:
+        """
+        Return usage column, codes of a categorical column or the virtual column by name
+        """
+        if name in self.columns:
+            return self.columns[name]
+        if name in self.codes:
+            return self.codes[name]
+        if name == 'virtual':
+            return self.virtual
+        raise FilesystemError(f'Unknown column: {name}')
+
+    def to_dict(self) -> Dict[str, array]:
+        """
+        Return all columns as dictionary of arrays
+        """
+        data = dict(self.columns)
+        data.update(self.codes)
+        data['virtual'] = self.virtual
+        return data
+
+    def to_numpy(self) -> Dict[str, Any]:
+        """
+        Return all columns as numpy arrays sharing memory with the column arrays
+
+        Raises FilesystemError if numpy is not installed
+        """
+        try:
+            import numpy  # pylint: disable=import-outside-toplevel
+        except ImportError as error:
+            raise FilesystemError('numpy is required for numpy columns') from error
+        return {
+            name: numpy.frombuffer(values, dtype=values.typecode)
+            for name, values in self.to_dict().items()
+        }
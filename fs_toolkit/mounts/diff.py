@@ -0,0 +1,158 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Differences between two sets of mountpoints
+"""
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_REMOUNTED = 'remounted'
+CHANGE_MOVED = 'moved'
+
+
+def __get_mount_keys__(mountpoints: Iterable[Any]) -> Dict[Hashable, Any]:
+    """
+    Return mountpoints by key
+
+    Mountpoints are keyed by mount ID when available, and otherwise by mountpoint path,
+    device and the number of earlier mounts with the same path and device
+    """
+    items = {}
+    counts = {}
+    for item in mountpoints:
+        mount_id = getattr(item, 'mount_id', None)
+        if mount_id is not None:
+            items[mount_id] = item
+            continue
+        key = (item.mountpoint, item.device)
+        count = counts.get(key, 0)
+        counts[key] = count + 1
+        items[(*key, count)] = item
+    return items
+
+
+def __get_filesystem_name__(item: Any) -> str:
+    """
+    Return filesystem name of a mountpoint with filesystem object or name
+    """
+    return str(getattr(item.filesystem, 'name', item.filesystem))
+
+
+# pylint: disable=too-few-public-methods
+class MountChange:
+    """
+    Change of a single mount between two sets of mountpoints
+
+    Old value is None for added mounts and new value is None for removed mounts
+    """
+    kind: str
+    old: Optional[Any]
+    new: Optional[Any]
+
+    def __init__(self, kind: str, old: Optional[Any], new: Optional[Any]) -> None:
+        self.kind = kind
+        self.old = old
+        self.new = new
+
+    def __repr__(self) -> str:
+        if self.kind == CHANGE_MOVED:
+            return f'{self.kind} {self.old.device} {self.old.mountpoint} -> {self.new.mountpoint}'
+        item = self.new if self.new is not None else self.old
+        return f'{self.kind} {item.device} {item.mountpoint}'
+
+
+class MountpointsDiff:
+    """
+    Differences from old to new set of mountpoints
+
+    Mounts are matched by mount ID, or by mountpoint and device if mount IDs are not
+    available. Matched mounts with different options are remounted, and mounts matched by
+    mount ID with a different mountpoint are moved. Mounts with the same mount ID but a
+    different device or filesystem are removed and added, since the mount ID was reused.
+    Unmatched non-virtual mounts of a device which was mounted once in old and once in new
+    mountpoints are moved.
+    """
+    added: List[Any]
+    removed: List[Any]
+    remounted: List[Tuple[Any, Any]]
+    moved: List[Tuple[Any, Any]]
+
+    def __init__(self, old: Iterable[Any], new: Iterable[Any]) -> None:
+        self.added = []
+        self.removed = []
+        self.remounted = []
+        self.moved = []
+        self.__compare__(__get_mount_keys__(old), __get_mount_keys__(new))
+
+    def __repr__(self) -> str:
+        return (
+            f'{len(self.added)} added, {len(self.removed)} removed, '
+            f'{len(self.remounted)} remounted, {len(self.moved)} moved'
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.remounted or self.moved)
+
+    def __iter__(self) -> Iterator[MountChange]:
+        return self.changes()
+
+    @staticmethod
+    def __get_unique_devices__(items: Iterable[Any]) -> Dict[str, Any]:
+        """
+        Return non-virtual mounts by device for devices with a single mount
+        """
+        devices = {}
+        for item in items:
+            if item.is_virtual:
+                continue
+            devices[item.device] = item if item.device not in devices else None
+        return {device: item for device, item in devices.items() if item is not None}
+
+    def __compare__(self, old: Dict[Hashable, Any], new: Dict[Hashable, Any]) -> None:
+        """
+        Compare mountpoints by keys
+        """
+        removed = []
+        replaced = set()
+        for key, item in old.items():
+            match = new.get(key, None)
+            if match is None:
+                removed.append(item)
+                continue
+            if item.device != match.device or __get_filesystem_name__(item) != __get_filesystem_name__(match):
+                removed.append(item)
+                replaced.add(id(match))
+                continue
+            if item.mountpoint != match.mountpoint:
+                self.moved.append((item, match))
+            if tuple(item.options) != tuple(match.options):
+                self.remounted.append((item, match))
+        added = [item for key, item in new.items() if key not in old or id(item) in replaced]
+
+        removed_devices = self.__get_unique_devices__(removed)
+        added_devices = self.__get_unique_devices__(added)
+        moved = set()
+        for device, item in removed_devices.items():
+            match = added_devices.get(device, None)
+            if match is not None:
+                self.moved.append((item, match))
+                moved.update((id(item), id(match)))
+        self.removed = [item for item in removed if id(item) not in moved]
+        self.added = [item for item in added if id(item) not in moved]
+
+    def changes(self) -> Iterator[MountChange]:
+        """
+        Generate change events for removed, moved, remounted and added mounts
+        """
+        for item in self.removed:
+            yield MountChange(CHANGE_REMOVED, item, None)
+        for old, new in self.moved:
+            yield MountChange(CHANGE_MOVED, old, new)
+        for old, new in self.remounted:
+            yield MountChange(CHANGE_REMOUNTED, old, new)
+        for item in self.added:
+            yield MountChange(CHANGE_ADDED, None, item)
@@ -0,0 +1,300 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Bounded history of mountpoint usage with growth rate and time to full estimates
+"""
+import math
+import time
+
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from ..exceptions import FilesystemError
+
+DEFAULT_HISTORY_CAPACITY = 1440
+
+
+class LinearRegression:
+    """
+    Least squares linear regression with O(1) addition and removal of samples
+
+    Sample x values are stored relative to a base value to keep the sums accurate with
+    large timestamp values
+    """
+    base: float
+    count: int
+    sum_x: float
+    sum_y: float
+    sum_xx: float
+    sum_xy: float
+
+    def __init__(self, base: float = 0.0) -> None:
+        self.reset(base)
+
+    def reset(self, base: float = 0.0) -> None:
+        """
+        Remove all samples and set base value for x values
+        """
+        self.base = base
+        self.count = 0
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+
+    def add(self, x: float, y: float, weight: int = 1) -> None:
+        """
+        Add a sample. Samples are removed with weight -1
+        """
+        x -= self.base
+        self.count += weight
+        self.sum_x += weight * x
+        self.sum_y += weight * y
+        self.sum_xx += weight * x * x
+        self.sum_xy += weight * x * y
+
+    def remove(self, x: float, y: float) -> None:
+        """
+        Remove a previously added sample
+        """
+        self.add(x, y, -1)
+
+    @property
+    def slope(self) -> Optional[float]:
+        """
+        Return slope of the regression line or None if it can't be calculated
+        """
+        if self.count < 2:
+            return None
+        denominator = self.count * self.sum_xx - self.sum_x * self.sum_x
+        if denominator <= 0:
+            return None
+        return (self.count * self.sum_xy - self.sum_x * self.sum_y) / denominator
+
+
+class UsageRingBuffer:
+    """
+    Usage samples of a mountpoint in preallocated ring buffers
+
+    Samples contain timestamp, used and available space in KiB and used inodes. When the
+    buffer is full, each new sample replaces the oldest sample. Regression of used space and
+    used inodes over time is updated incrementally as samples are added and replaced. Missing
+    values are stored as NaN and are not included in the regressions.
+    """
+    capacity: int
+    timestamps: array
+    used: array
+    available: array
+    inodes: array
+    __start__: int
+    __count__: int
+    __appended__: int
+    __used_regression__: LinearRegression
+    __inodes_regression__: LinearRegression
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY) -> None:
+        if capacity < 2:
+            raise FilesystemError(f'Invalid usage history capacity: {capacity}')
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.used = array('d', bytes(8 * capacity))
+        self.available = array('d', bytes(8 * capacity))
+        self.inodes = array('d', bytes(8 * capacity))
+        self.__start__ = 0
+        self.__count__ = 0
+        self.__appended__ = 0
+        self.__used_regression__ = LinearRegression()
+        self.__inodes_regression__ = LinearRegression()
+
+    def __repr__(self) -> str:
+        return f'usage history with {len(self)} of {self.capacity} samples'
+
+    def __len__(self) -> int:
+        return self.__count__
+
+    def __iter__(self) -> Iterator[Tuple[float, Optional[int], Optional[int], Optional[int]]]:
+        for offset in range(self.__count__):
+            yield self.__get_sample__((self.__start__ + offset) % self.capacity)
+
+    @staticmethod
+    def __get_value__(value: float) -> Optional[int]:
+        """
+        Return stored value as integer or None for missing values
+        """
+        return None if math.isnan(value) else int(value)
+
+    def __get_sample__(self, index: int) -> Tuple[float, Optional[int], Optional[int], Optional[int]]:
+        """
+        Return sample in the buffers by buffer index
+        """
+        return (
+            self.timestamps[index],
+            self.__get_value__(self.used[index]),
+            self.__get_value__(self.available[index]),
+            self.__get_value__(self.inodes[index]),
+        )
+
+    def __update_regressions__(self, index: int, weight: int) -> None:
+        """
+        Add or remove the sample in buffer index to regressions
+        """
+        timestamp = self.timestamps[index]
+        if not math.isnan(self.used[index]):
+            self.__used_regression__.add(timestamp, self.used[index], weight)
+        if not math.isnan(self.inodes[index]):
+            self.__inodes_regression__.add(timestamp, self.inodes[index], weight)
+
+    def __rebuild_regressions__(self) -> None:
+        """
+        Calculate regressions again from samples in the buffer to prevent accumulation of
+        rounding errors. The oldest timestamp is used as base for the regressions
+        """
+        base = self.timestamps[self.__start__]
+        self.__used_regression__.reset(base)
+        self.__inodes_regression__.reset(base)
+        for offset in range(self.__count__):
+            self.__update_regressions__((self.__start__ + offset) % self.capacity, 1)
+
+    @property
+    def latest(self) -> Optional[Tuple[float, Optional[int], Optional[int], Optional[int]]]:
+        """
+        Return latest sample or None if there are no samples
+        """
+        if not self.__count__:
+            return None
+        return self.__get_sample__((self.__start__ + self.__count__ - 1) % self.capacity)
+
+    # pylint: disable=too-many-arguments
+    def append(self,
+               timestamp: float,
+               used: Optional[int],
+               available: Optional[int],
+               inodes: Optional[int] = None) -> None:
+        """
+        Append a usage sample, replacing the oldest sample if the buffer is full
+        """
+        latest = self.latest
+        if latest is not None and timestamp < latest[0]:
+            raise FilesystemError(f'Usage sample timestamp {timestamp} is older than latest sample')
+        if self.__count__ == self.capacity:
+            self.__update_regressions__(self.__start__, -1)
+            index = self.__start__
+            self.__start__ = (self.__start__ + 1) % self.capacity
+        else:
+            index = (self.__start__ + self.__count__) % self.capacity
+            self.__count__ += 1
+            if self.__count__ == 1:
+                self.__used_regression__.reset(timestamp)
+                self.__inodes_regression__.reset(timestamp)
+
+        self.timestamps[index] = timestamp
+        self.used[index] = math.nan if used is None else used
+        self.available[index] = math.nan if available is None else available
+        self.inodes[index] = math.nan if inodes is None else inodes
+        self.__update_regressions__(index, 1)
+
+        self.__appended__ += 1
+        if self.__appended__ % self.capacity == 0:
+            self.__rebuild_regressions__()
+
+    def clear(self) -> None:
+        """
+        Remove all samples
+        """
+        self.__start__ = 0
+        self.__count__ = 0
+        self.__used_regression__.reset()
+        self.__inodes_regression__.reset()
+
+    @property
+    def growth_rate(self) -> Optional[float]:
+        """
+        Return growth rate of used KiB per second or None without enough samples
+        """
+        return self.__used_regression__.slope
+
+    @property
+    def inodes_growth_rate(self) -> Optional[float]:
+        """
+        Return growth rate of used inodes per second or None without enough samples
+        """
+        return self.__inodes_regression__.slope
+
+    def time_to_full(self) -> Optional[float]:
+        """
+        Return estimated seconds until the filesystem is full from the latest sample, or
+        None if usage is not growing
+        """
+        rate = self.growth_rate
+        latest = self.latest
+        if rate is None or rate <= 0 or latest is None or latest[2] is None:
+            return None
+        return latest[2] / rate
+
+
+class UsageHistory:
+    """
+    Usage history of mountpoints by mountpoint path
+
+    Each mountpoint has a ring buffer with fixed capacity. History of mountpoints which
+    are not included in an update is removed, so memory use is bounded by the number of
+    mounted filesystems and the buffer capacity.
+    """
+    capacity: int
+    __buffers__: Dict[str, UsageRingBuffer]
+
+    def __init__(self, capacity: int = DEFAULT_HISTORY_CAPACITY) -> None:
+        self.capacity = capacity
+        self.__buffers__ = {}
+
+    def __repr__(self) -> str:
+        return f'usage history of {len(self.__buffers__)} mountpoints'
+
+    def __len__(self) -> int:
+        return len(self.__buffers__)
+
+    def __contains__(self, mountpoint: str) -> bool:
+        return str(mountpoint) in self.__buffers__
+
+    def __getitem__(self, mountpoint: str) -> UsageRingBuffer:
+        try:
+            return self.__buffers__[str(mountpoint)]
+        except KeyError as error:
+            raise FilesystemError(f'No usage history for {mountpoint}') from error
+
+    def update(self, mountpoints: Iterable[Any], timestamp: Optional[float] = None) -> None:
+        """
+        Append usage samples of mountpoints or mountpoint snapshots with usage data
+
+        Mountpoints without usage data in this update keep their previous samples. History
+        of mountpoints which are no longer mounted is removed.
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        seen = set()
+        for item in mountpoints:
+            path = str(item.mountpoint)
+            seen.add(path)
+            usage = getattr(item, 'usage', item)
+            if usage.used is None and usage.available is None:
+                continue
+            buffer = self.__buffers__.get(path, None)
+            if buffer is None:
+                buffer = self.__buffers__[path] = UsageRingBuffer(self.capacity)
+            buffer.append(timestamp, usage.used, usage.available, getattr(usage, 'inodes_used', None))
+        for path in set(self.__buffers__) - seen:
+            del self.__buffers__[path]
+
+    def growth_rate(self, mountpoint: str) -> Optional[float]:
+        """
+        Return growth rate of used KiB per second for a mountpoint
+        """
+        return self[mountpoint].growth_rate
+
+    def time_to_full(self, mountpoint: str) -> Optional[float]:
+        """
+        Return estimated seconds until the mountpoint filesystem is full
+        """
+        return self[mountpoint].time_to_full()
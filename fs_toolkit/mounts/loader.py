@@ -6,18 +6,26 @@
 """
 Mountpoints loader main class MountPoints()
 """
+from pathlib import Path
 from re import Pattern
-from typing import List, Optional, Tuple
+from typing import Iterable, List, Optional, Tuple, Union
 
 from sys_toolkit.subprocess import run_command
 
-from ..base import LineLoader
+from ..base import LineLoader, UpdateFlight
+from ..encoding import decode_path
 from ..exceptions import FilesystemError
+from .capacity import MountpointsCapacity
+from .columns import MountpointColumns
+from .diff import MountpointsDiff
+from .mountinfo import PROC_PATH, MountInfo
 from .platform.base import Mountpoint
 from .platform.bsd import BSDMountpoint
 from .platform.darwin import DarwinMountPoint
-from .platform.linux import LinuxMountPoint
+from .platform.linux import LinuxMountPoint, get_statvfs_usage
 from .platform.openbsd import OpenBSDMountPoint
+from .snapshot import MountpointsSnapshot
+from .store import UsageStore
 
 
 from .constants import (
@@ -35,18 +43,41 @@ from .constants import (
 class Mountpoints(LineLoader):
     """
     Filesystem mount points with usage
+
+    If usage_store is given, usage of the mountpoints is appended to the store every
+    time the mountpoints are loaded, after the loaded mountpoints have been published.
+    Errors from the store don't fail the update and are stored to usage_store_error
+
+    If pid is given, mountpoints are loaded on Linux for the mount namespace of the process
+    from mountinfo of the process in proc_path, with usage from statvfs through the root
+    directory of the process
     """
+    usage_store: Optional[UsageStore]
+    usage_store_error: Optional[FilesystemError]
+    pid: Optional[int]
+    proc_path: Path
+    __capacity__: Tuple[Tuple[Mountpoint, ...], Optional[MountpointsCapacity]]
     __mountpoint_class__: Mountpoint
     __mount_command__: Tuple[str] = None
     __df_command__: Tuple[str] = None
     __re_mount_patterns__: Optional[List[Pattern]] = None
     __re_df_patterns__: Optional[List[Pattern]] = None
 
-    def __init__(self):
+    def __init__(self,
+                 usage_store: Optional[UsageStore] = None,
+                 *,
+                 pid: Optional[int] = None,
+                 proc_path: Union[str, Path] = PROC_PATH) -> None:
         super().__init__()
+        self.usage_store = usage_store
+        self.usage_store_error = None
+        self.pid = pid
+        self.proc_path = Path(proc_path)
+        if pid is not None and self.__platform__ != 'linux':
+            raise FilesystemError(f'Mountpoints for a process are not supported on {self.__platform__}')
+        self.__capacity__ = ((), None)
         self.__detect_mountpoint_class__()
         self.__initialize_toolchain_based_data__()
-        self.__iter_items__ = None
 
     def __detect_mountpoint_class__(self) -> None:
         """
@@ -96,17 +127,28 @@ class Mountpoints(LineLoader):
         stdout, _stderr = run_command(*self.__df_command__)
         return [str(line, 'utf-8') for line in stdout.splitlines()]
 
+    @staticmethod
+    def __decode_paths__(matches: List[dict]) -> List[dict]:
+        """
+        Decode escaped device and mountpoint paths in matched command output lines
+        """
+        for match in matches:
+            for attr in ('device', 'mountpoint'):
+                if match.get(attr, None) is not None:
+                    match[attr] = decode_path(match[attr])
+        return matches
+
     def __get_mountpoint_data__(self, lines: List[str]) -> List[dict]:
         """
-        Return lines from mount command
+        Return lines from mount command with decoded paths
         """
-        return self.__match_pattern_list__(lines, self.__re_mount_patterns__)
+        return self.__decode_paths__(self.__match_pattern_list__(lines, self.__re_mount_patterns__))
 
     def __get_df_data__(self, lines: List[str]) -> List[dict]:
         """
-        Return lines from df command
+        Return lines from df command with decoded paths
         """
-        return self.__match_pattern_list__(lines, self.__re_df_patterns__)
+        return self.__decode_paths__(self.__match_pattern_list__(lines, self.__re_df_patterns__))
 
     def append(self, value: Mountpoint) -> Mountpoint:
         assert isinstance(value, Mountpoint)
@@ -116,20 +158,102 @@ class Mountpoints(LineLoader):
         assert isinstance(value, Mountpoint)
         return super().insert(index, value)
 
-    def update(self) -> None:
+    def __load_process_items__(self) -> List[Mountpoint]:
         """
-        Get data for mountpoints
+        Get data for mountpoints in the mount namespace of the process
         """
-        self.clear()
-        self.__start_update__()
+        process_path = self.proc_path.joinpath(str(self.pid))
+        mountinfo = MountInfo(process_path.joinpath('mountinfo'))
+        mountinfo.update()
+        items = []
+        for entry in mountinfo:
+            item = self.__mountpoint_class__(
+                self,
+                device=entry.device,
+                mountpoint=entry.mountpoint,
+                filesystem=entry.filesystem,
+                options=entry.options,
+            )
+            if not item.is_virtual:
+                data = get_statvfs_usage(process_path.joinpath('root', entry.mountpoint.lstrip('/')))
+                if data is not None:
+                    item.load_usage_data(data)
+            items.append(item)
+        return items
+
+    def __load_command_items__(self) -> List[Mountpoint]:
+        """
+        Get data for mountpoints from mount and df commands
+        """
+        items = []
         mountpoints = {}
         for match in self.__get_mountpoint_data__(self.__get_mount_lines__()):
             item = self.__mountpoint_class__(self, **match)
             mountpoints[item.mountpoint] = item
-            self.append(item)
+            items.append(item)
 
         for match in self.__get_df_data__(self.__get_df_lines__()):
             item = mountpoints.get(match['mountpoint'], None)
             if item is not None:
                 item.load_usage_data(match)
-        self.__finish_update__()
+        return items
+
+    def __load_items__(self) -> List[Mountpoint]:
+        """
+        Get data for mountpoints
+        """
+        if self.pid is not None:
+            return self.__load_process_items__()
+        return self.__load_command_items__()
+
+    def __update_items__(self, flight: UpdateFlight) -> None:
+        """
+        Load items and append usage of the published items to the usage store
+        """
+        super().__update_items__(flight)
+        if self.usage_store is not None:
+            try:
+                self.usage_store.append(self.__items__)
+                self.usage_store_error = None
+            except FilesystemError as error:
+                self.usage_store_error = error
+
+    def snapshot(self) -> MountpointsSnapshot:
+        """
+        Return immutable snapshot of mountpoints, which can be pickled and shared with
+        other processes without references to this object
+        """
+        return MountpointsSnapshot(
+            self.__platform__,
+            (item.snapshot() for item in self)
+        )
+
+    @property
+    def capacity(self) -> MountpointsCapacity:
+        """
+        Return capacity of mountpoints with each filesystem counted once
+
+        Capacity is cached with the snapshot of mountpoints it was built from, and is built
+        again when mountpoints have been loaded again
+        """
+        if self.__requires_reload__:
+            self.update()
+        items = self.__items__
+        capacity_items, capacity = self.__capacity__
+        if capacity is None or capacity_items is not items:
+            capacity = MountpointsCapacity(items)
+            self.__capacity__ = (items, capacity)
+        return capacity
+
+    def to_columns(self) -> MountpointColumns:
+        """
+        Return usage of mountpoints as columns of arrays, with categorical codes for device,
+        filesystem and mountpoint
+        """
+        return MountpointColumns(self)
+
+    def diff(self, other: Iterable[Mountpoint]) -> MountpointsDiff:
+        """
+        Return differences from these mountpoints to other mountpoints or mountpoint snapshots
+        """
+        return MountpointsDiff(self, other)
@@ -0,0 +1,144 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Linux mount details from /proc/self/mountinfo
+
+Unlike mount command output, mountinfo has mount IDs and parent mount IDs, device
+numbers, the root of the mount within the filesystem and the propagation peer groups
+of the mounts
+"""
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple, Union
+
+from ..base import LineLoader
+from ..encoding import decode_path
+from ..exceptions import FilesystemError
+from .platform.linux import LINUX_VIRTUAL_FILESYSTEMS
+from .tree import MountTree
+
+PROC_PATH = Path('/proc')
+MOUNTINFO_PATH = PROC_PATH.joinpath('self/mountinfo')
+MOUNTINFO_SEPARATOR = '-'
+
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+class MountInfoEntry:
+    """
+    Mount details from a line in mountinfo
+
+    Propagation is described by shared (peer group ID of a shared mount), master (peer group
+    ID the mount receives propagation from), propagate_from (closest dominant peer group of
+    the master) and unbindable
+    """
+    mount_id: int
+    parent_id: int
+    major: int
+    minor: int
+    root: str
+    mountpoint: str
+    options: List[str]
+    shared: Optional[int]
+    master: Optional[int]
+    propagate_from: Optional[int]
+    unbindable: bool
+    filesystem: str
+    device: str
+    super_options: List[str]
+
+    def __init__(self, line: str) -> None:
+        fields = line.split()
+        try:
+            separator = fields.index(MOUNTINFO_SEPARATOR, 6)
+            self.mount_id = int(fields[0])
+            self.parent_id = int(fields[1])
+            major, minor = fields[2].split(':', 1)
+            self.major = int(major)
+            self.minor = int(minor)
+            self.filesystem = fields[separator + 1]
+            self.device = decode_path(fields[separator + 2])
+            self.super_options = fields[separator + 3].split(',') if len(fields) > separator + 3 else []
+        except (IndexError, ValueError) as error:
+            raise FilesystemError(f'Invalid mountinfo line: {line}') from error
+        self.root = decode_path(fields[3])
+        self.mountpoint = decode_path(fields[4])
+        self.options = fields[5].split(',')
+        self.shared = None
+        self.master = None
+        self.propagate_from = None
+        self.unbindable = False
+        for field in fields[6:separator]:
+            tag, _separator, value = field.partition(':')
+            if tag == 'unbindable':
+                self.unbindable = True
+            elif tag in ('shared', 'master', 'propagate_from') and value.isdigit():
+                setattr(self, tag, int(value))
+
+    def __repr__(self) -> str:
+        return f'{self.mount_id} {self.device} mounted on {self.mountpoint}'
+
+    @property
+    def devno(self) -> str:
+        """
+        Return device number as major:minor string
+        """
+        return f'{self.major}:{self.minor}'
+
+    @property
+    def is_virtual(self) -> bool:
+        """
+        Check if filesystem is virtual
+        """
+        return self.filesystem in LINUX_VIRTUAL_FILESYSTEMS
+
+
+def parse_mountinfo(lines: Iterable[str]) -> List[MountInfoEntry]:
+    """
+    Parse mountinfo lines, skipping empty lines
+    """
+    return [MountInfoEntry(line) for line in lines if line.strip()]
+
+
+class MountInfo(LineLoader):
+    """
+    Mounts loaded from Linux mountinfo file
+
+    The mount tree is built on first use and cached with the snapshot of entries it was
+    built from
+    """
+    path: Path
+    __tree__: Tuple[Tuple[MountInfoEntry, ...], Optional[MountTree]]
+
+    def __init__(self, path: Union[str, Path] = MOUNTINFO_PATH) -> None:
+        super().__init__(platform='linux')
+        self.path = Path(path)
+        self.__tree__ = ((), None)
+
+    def __repr__(self) -> str:
+        return f'mountinfo {self.path}'
+
+    def __load_items__(self) -> List[MountInfoEntry]:
+        """
+        Load entries from mountinfo file
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='surrogateescape') as handle:
+                return parse_mountinfo(handle)
+        except OSError as error:
+            raise FilesystemError(f'Error reading {self.path}: {error}') from error
+
+    @property
+    def tree(self) -> MountTree:
+        """
+        Return tree of mounts by parent mount IDs
+        """
+        if self.__requires_reload__:
+            self.update()
+        items = self.__items__
+        tree_items, tree = self.__tree__
+        if tree is None or tree_items is not items:
+            tree = MountTree(items)
+            self.__tree__ = (items, tree)
+        return tree
@@ -0,0 +1,102 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Mountpoints of Linux mount namespaces for many processes
+
+Processes are grouped by the inode of their /proc/<pid>/ns/mnt mount namespace link, and
+mountpoints are loaded once for each namespace from one of its processes. Namespaces are
+loaded in parallel threads.
+"""
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from ..exceptions import FilesystemError
+from .loader import Mountpoints
+from .mountinfo import PROC_PATH
+from .snapshot import MountpointsSnapshot
+
+RE_NAMESPACE_LINK = re.compile(r'^mnt:\[(?P<inode>\d+)\]$')
+
+
+class MountNamespaces:
+    """
+    Collector for mountpoints of the mount namespaces of processes
+    """
+    proc_path: Path
+    max_workers: Optional[int]
+
+    def __init__(self, proc_path: Union[str, Path] = PROC_PATH, max_workers: Optional[int] = None) -> None:
+        self.proc_path = Path(proc_path)
+        self.max_workers = max_workers
+
+    def __repr__(self) -> str:
+        return f'mount namespaces in {self.proc_path}'
+
+    def get_pids(self) -> List[int]:
+        """
+        Return IDs of running processes
+        """
+        try:
+            return sorted(int(entry.name) for entry in os.scandir(self.proc_path) if entry.name.isdigit())
+        except OSError as error:
+            raise FilesystemError(f'Error reading {self.proc_path}: {error}') from error
+
+    def get_namespace(self, pid: int) -> Optional[int]:
+        """
+        Return mount namespace inode of a process, or None if the process has exited or
+        can't be accessed
+        """
+        path = self.proc_path.joinpath(str(pid), 'ns/mnt')
+        try:
+            match = RE_NAMESPACE_LINK.match(os.readlink(path))
+            if match:
+                return int(match.group('inode'))
+            return os.stat(path).st_ino
+        except OSError:
+            return None
+
+    def group(self, pids: Optional[Iterable[int]] = None) -> Dict[int, List[int]]:
+        """
+        Return process IDs grouped by mount namespace inode
+        """
+        namespaces = {}
+        for pid in (pids if pids is not None else self.get_pids()):
+            namespace = self.get_namespace(pid)
+            if namespace is not None:
+                namespaces.setdefault(namespace, []).append(pid)
+        return namespaces
+
+    def load_namespace(self, pids: List[int]) -> Optional[MountpointsSnapshot]:
+        """
+        Load mountpoints for a namespace from the first process of the namespace which
+        can be read. Returns None if all processes have exited
+        """
+        for pid in pids:
+            mountpoints = Mountpoints(pid=pid, proc_path=self.proc_path)
+            try:
+                mountpoints.update()
+            except FilesystemError:
+                continue
+            return mountpoints.snapshot()
+        return None
+
+    def collect(self, pids: Optional[Iterable[int]] = None) -> Dict[int, MountpointsSnapshot]:
+        """
+        Return snapshots of mountpoints by mount namespace inode for processes, or for all
+        processes if pids is not given
+        """
+        namespaces = self.group(pids)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            snapshots = executor.map(self.load_namespace, namespaces.values())
+            return {
+                namespace: snapshot
+                for namespace, snapshot in zip(namespaces, snapshots)
+                if snapshot is not None
+            }
@@ -0,0 +1,222 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Notifications for material changes in mountpoint usage
+"""
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..exceptions import FilesystemError
+
+REASON_INITIAL = 'initial'
+REASON_BAND = 'band'
+REASON_PERCENT = 'percent'
+REASON_AVAILABLE = 'available'
+REASON_RELATIVE = 'relative'
+
+
+def __get_usage__(item: Any) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Return usage percent and available KiB for a mountpoint or mountpoint snapshot
+    """
+    usage = getattr(item, 'usage', item)
+    return usage.percent, usage.available
+
+
+# pylint: disable=too-few-public-methods
+class UsageThreshold:
+    """
+    Thresholds for reporting usage changes of a mountpoint
+
+    Bands are usage percent levels. A mountpoint enters a band when usage percent reaches
+    the level and leaves it when usage percent drops below the level minus hysteresis,
+    so values fluctuating around a level are reported only once.
+
+    Changes are also reported when usage percent changes at least percent points,
+    available space changes at least available KiB, or available space changes at least
+    relative fraction from the values in the previous notification.
+    """
+    bands: Tuple[float, ...]
+    hysteresis: float
+    percent: Optional[float]
+    available: Optional[int]
+    relative: Optional[float]
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 bands: Iterable[float] = (),
+                 *,
+                 hysteresis: float = 0,
+                 percent: Optional[float] = None,
+                 available: Optional[int] = None,
+                 relative: Optional[float] = None) -> None:
+        self.bands = tuple(sorted(bands))
+        if hysteresis < 0:
+            raise FilesystemError(f'Invalid usage threshold hysteresis: {hysteresis}')
+        self.hysteresis = hysteresis
+        self.percent = percent
+        self.available = available
+        self.relative = relative
+
+    def __repr__(self) -> str:
+        return f'usage bands {self.bands} hysteresis {self.hysteresis}'
+
+    def get_band(self, percent: Optional[float], previous: int = 0) -> int:
+        """
+        Return band index for usage percent, applying hysteresis to the previous band
+        """
+        if percent is None:
+            return previous
+        band = bisect_right(self.bands, percent)
+        if band < previous and percent >= self.bands[previous - 1] - self.hysteresis:
+            band = previous
+        return band
+
+    def get_reason(self,
+                   previous: Tuple[Optional[int], Optional[int]],
+                   current: Tuple[Optional[int], Optional[int]]) -> Optional[str]:
+        """
+        Return reason for notification from delta thresholds or None if usage change
+        does not exceed any threshold
+        """
+        previous_percent, previous_available = previous
+        percent, available = current
+        if self.percent is not None and None not in (percent, previous_percent):
+            if abs(percent - previous_percent) >= self.percent:
+                return REASON_PERCENT
+        if None in (available, previous_available):
+            return None
+        change = abs(available - previous_available)
+        if self.available is not None and change >= self.available:
+            return REASON_AVAILABLE
+        if self.relative is not None and change > 0 and change >= self.relative * previous_available:
+            return REASON_RELATIVE
+        return None
+
+
+# pylint: disable=too-few-public-methods
+class UsageNotification:
+    """
+    Notification of a mountpoint usage change
+    """
+    mountpoint: Any
+    reason: str
+    band: int
+    previous_band: Optional[int]
+    previous_percent: Optional[int]
+    previous_available: Optional[int]
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 mountpoint: Any,
+                 reason: str,
+                 band: int,
+                 *,
+                 previous_band: Optional[int] = None,
+                 previous: Tuple[Optional[int], Optional[int]] = (None, None)) -> None:
+        self.mountpoint = mountpoint
+        self.reason = reason
+        self.band = band
+        self.previous_band = previous_band
+        self.previous_percent, self.previous_available = previous
+
+    def __repr__(self) -> str:
+        return f'{self.mountpoint.mountpoint} {self.reason}'
+
+    @property
+    def percent(self) -> Optional[int]:
+        """
+        Return usage percent in the notification
+        """
+        return __get_usage__(self.mountpoint)[0]
+
+    @property
+    def available(self) -> Optional[int]:
+        """
+        Return available KiB in the notification
+        """
+        return __get_usage__(self.mountpoint)[1]
+
+
+class UsageNotifier:
+    """
+    Detect material usage changes in repeated mountpoint usage refreshes
+
+    Each call to update() compares usage of mountpoints to the usage in the previous
+    notification for the mountpoint and returns notifications only for mountpoints with
+    usage crossing a band or a change threshold. Thresholds are looked up by mountpoint
+    path, with the default threshold used for other mountpoints.
+    """
+    default: UsageThreshold
+    thresholds: Dict[str, UsageThreshold]
+    notify_initial: bool
+    __state__: Dict[str, Tuple[int, Tuple[Optional[int], Optional[int]]]]
+
+    def __init__(self,
+                 default: Optional[UsageThreshold] = None,
+                 thresholds: Optional[Dict[str, UsageThreshold]] = None,
+                 *,
+                 notify_initial: bool = True) -> None:
+        self.default = default if default is not None else UsageThreshold()
+        self.thresholds = {str(path): threshold for path, threshold in (thresholds or {}).items()}
+        self.notify_initial = notify_initial
+        self.__state__ = {}
+
+    def __repr__(self) -> str:
+        return f'usage notifications for {len(self.__state__)} mountpoints'
+
+    def get_threshold(self, mountpoint: str) -> UsageThreshold:
+        """
+        Return usage threshold for a mountpoint path
+        """
+        return self.thresholds.get(str(mountpoint), self.default)
+
+    def __check__(self, item: Any) -> Optional[UsageNotification]:
+        """
+        Check usage of a mountpoint and update the notification state
+        """
+        path = item.mountpoint
+        threshold = self.get_threshold(path)
+        current = __get_usage__(item)
+        state = self.__state__.get(path, None)
+        if state is None:
+            band = threshold.get_band(current[0])
+            self.__state__[path] = (band, current)
+            return UsageNotification(item, REASON_INITIAL, band) if self.notify_initial else None
+
+        previous_band, previous = state
+        band = threshold.get_band(current[0], previous_band)
+        reason = REASON_BAND if band != previous_band else threshold.get_reason(previous, current)
+        if reason is None:
+            return None
+        self.__state__[path] = (band, current)
+        return UsageNotification(item, reason, band, previous_band=previous_band, previous=previous)
+
+    def update(self, mountpoints: Iterable[Any]) -> List[UsageNotification]:
+        """
+        Return notifications for mountpoints with material usage changes
+
+        Mountpoints without usage data are skipped and keep their previous state. State of
+        mountpoints which are no longer mounted is removed.
+        """
+        notifications = []
+        seen = set()
+        for item in mountpoints:
+            seen.add(item.mountpoint)
+            if __get_usage__(item) == (None, None):
+                continue
+            notification = self.__check__(item)
+            if notification is not None:
+                notifications.append(notification)
+        for path in set(self.__state__) - seen:
+            del self.__state__[path]
+        return notifications
+
+    def reset(self) -> None:
+        """
+        Clear notification state for all mountpoints
+        """
+        self.__state__ = {}
@@ -7,24 +7,52 @@
 Common base classes for platform specific mounts classes
 """
 from pathlib import Path
-from typing import List, Optional, Tuple, Union, TYPE_CHECKING
+from typing import Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
+
+from ..snapshot import MountpointSnapshot
 
 if TYPE_CHECKING:
+    from ...diskstats import DiskIORates
+    from ...mountstats import NFSMountStats
     from ..loader import Mountpoints
 
 
-# pylint: disable=too-few-public-methods
 class MountpointOptions:
     """
     Options for filesystem mount point
+
+    Options are available as list of strings by iterating the object. Flag options are
+    also set as attributes with value True and name=value options as attributes with the
+    option value
     """
+    __options__: List[str]
+
     def __init__(self,
                  mountpoint: 'Mountpoint',
                  options: Optional[Union[str, List[str]]]) -> None:
         self.mountpoint = mountpoint
         options = self.__parse_options__(options)
-        for flag in options:
-            setattr(self, flag, True)
+        self.__options__ = list(options) if options is not None else []
+        for flag in self.__options__:
+            name, separator, value = flag.partition('=')
+            if name == 'mountpoint' or hasattr(self.__class__, name):
+                continue
+            if separator:
+                setattr(self, name, value)
+            else:
+                setattr(self, flag, True)
+
+    def __repr__(self) -> str:
+        return ','.join(self.__options__)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__options__)
+
+    def __len__(self) -> int:
+        return len(self.__options__)
+
+    def __contains__(self, option: str) -> bool:
+        return option in self.__options__
 
     @staticmethod
     def __parse_options__(options: Union[str, List[str]]) -> List[str]:
@@ -46,6 +74,9 @@ class MountpointUsage:
     available: Optional[int]
     used: Optional[int]
     percent: Optional[int]
+    inodes_used: Optional[int]
+    inodes_available: Optional[int]
+    inodes_percent: Optional[int]
 
     def __init__(self, mountpoint: 'Mountpoint') -> None:
         self.mountpoint = mountpoint
@@ -53,6 +84,9 @@ class MountpointUsage:
         self.available = None
         self.used = None
         self.percent = None
+        self.inodes_used = None
+        self.inodes_available = None
+        self.inodes_percent = None
 
     def __set_value__(self, attr: str, value: int) -> None:
         """
@@ -68,6 +102,9 @@ class MountpointUsage:
         for attr in ('size', 'available', 'used', 'percent'):
             assert attr in data
             self.__set_value__(attr, data[attr])
+        for attr in ('inodes_used', 'inodes_available', 'inodes_percent'):
+            if data.get(attr, None) is not None:
+                self.__set_value__(attr, data[attr])
 
 
 # pylint: disable=too-few-public-methods
@@ -102,6 +139,8 @@ class Mountpoint:
     filesystem_class: Filesystem
     options_class: MountpointOptions
     usage_class: MountpointUsage
+    io: Optional['DiskIORates']
+    nfs: Optional['NFSMountStats']
 
     def __init__(self,
                  mountpoints: 'Mountpoints',
@@ -115,6 +154,8 @@ class Mountpoint:
         self.filesystem = self.filesystem_class(self, filesystem)
         self.options = self.options_class(self, options)
         self.usage = self.usage_class(self)
+        self.io = None
+        self.nfs = None
 
     def __repr__(self) -> str:
         return f'{self.device} mounted on {self.mountpoint}'
@@ -138,3 +179,9 @@ class Mountpoint:
         Load filesystem usage data for mountpoint
         """
         self.usage.load_data(data)
+
+    def snapshot(self) -> MountpointSnapshot:
+        """
+        Return immutable snapshot of the mountpoint without links to other objects
+        """
+        return MountpointSnapshot.from_mountpoint(self)
@@ -19,25 +19,9 @@ BSD_VIRTUAL_FILESYSTEMS = (
 class BSDMountpointUsage(MountpointUsage):
     """
     BSD specific mountpoint usage data
-    """
-    inodes_used: Optional[int]
-    inodes_available: Optional[int]
-    inodes_percent: Optional[int]
-
-    def __init__(self, mountpoint: 'BSDMountpoint') -> None:
-        super().__init__(mountpoint)
-        self.inodes_used = None
-        self.inodes_available = None
-        self.inodes_percent = None
 
-    def load_data(self, data: dict) -> None:
-        """
-        Load BSD specific filesystem usage data
-        """
-        super().load_data(data)
-        for attr in ('inodes_used', 'inodes_available', 'inodes_percent'):
-            if attr in data:
-                self.__set_value__(attr, data[attr])
+    Inode counters are loaded from df output
+    """
 
 
 # pylint: disable=too-few-public-methods
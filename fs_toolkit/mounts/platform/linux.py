@@ -6,6 +6,11 @@
 """
 Linux mountpoints
 """
+import os
+
+from pathlib import Path
+from typing import List, Optional, Union
+
 from .base import Mountpoint, Filesystem, MountpointOptions, MountpointUsage
 
 LINUX_VIRTUAL_FILESYSTEMS = (
@@ -37,18 +42,91 @@ LINUX_VIRTUAL_FILESYSTEMS = (
 )
 
 
+def __get_inode_usage__(stats: os.statvfs_result) -> dict:
+    """
+    Return inode counters from statvfs results, or None values if the filesystem has no
+    fixed number of inodes (statvfs reports 0 files, for example vfat and btrfs)
+    """
+    if not stats.f_files:
+        return {'inodes_used': None, 'inodes_available': None, 'inodes_percent': None}
+    used = stats.f_files - stats.f_ffree
+    total = used + stats.f_favail
+    return {
+        'inodes_used': used,
+        'inodes_available': stats.f_favail,
+        # Rounded up like the df IUse% column
+        'inodes_percent': -(-used * 100 // total) if total else 0,
+    }
+
+
+def get_statvfs_usage(path: Union[str, Path]) -> Optional[dict]:
+    """
+    Return usage data for a path from a single statvfs call, in the same format as parsed
+    df -Pk output with sizes in 1024 byte blocks and inode counters
+
+    Returns None if the path can't be accessed
+    """
+    try:
+        stats = os.statvfs(path)
+    except OSError:
+        return None
+    size = stats.f_blocks * stats.f_frsize // 1024
+    used = (stats.f_blocks - stats.f_bfree) * stats.f_frsize // 1024
+    available = stats.f_bavail * stats.f_frsize // 1024
+    total = used + available
+    data = {
+        'size': size,
+        'used': used,
+        'available': available,
+        'percent': -(-used * 100 // total) if total else 0,
+    }
+    data.update(__get_inode_usage__(stats))
+    return data
+
+
 # pylint: disable=too-few-public-methods
 class LinuxMountpointUsage(MountpointUsage):
     """
     Linux specific mountpoint usage data
+
+    GNU df does not report inodes with block usage, so inode counters are loaded with
+    statvfs for the mountpoint when block usage is loaded
     """
+    def load_data(self, data: dict) -> None:
+        """
+        Load Linux specific filesystem usage data
+        """
+        super().load_data(data)
+        if 'inodes_used' not in data:
+            self.load_inode_data()
+
+    def load_inode_data(self) -> None:
+        """
+        Load inode counters with statvfs
+
+        Counters are not set if the mountpoint can't be accessed or if the filesystem has
+        no fixed number of inodes
+        """
+        try:
+            stats = os.statvfs(self.mountpoint.mountpoint)
+        except OSError:
+            return
+        for attr, value in __get_inode_usage__(stats).items():
+            setattr(self, attr, value)
 
 
-# pylint: disable=too-few-public-methods
 class LinuxMountPointOptions(MountpointOptions):
     """
     Linux specific mountpoint options
     """
+    @staticmethod
+    def __parse_options__(options: Union[str, List[str]]) -> List[str]:
+        """
+        Parse comma separated Linux mount options from string to a list
+        """
+        if isinstance(options, str):
+            options = options.split(',')
+        return options
 
 
 # pylint: disable=too-few-public-methods
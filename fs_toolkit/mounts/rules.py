@@ -0,0 +1,306 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Rules for matching mountpoints by usage, evaluated over columns of all mountpoints
+
+Rules are expressions like "percent > 90 and not virtual and fs in (xfs, ext4)". Rule
+expressions are compiled once, and each comparison is evaluated for all mountpoints in
+a single pass over a column, producing a bitmask with a bit for each mountpoint. Boolean
+operators combine the bitmasks, and comparisons shared by multiple rules are evaluated
+only once. Comparisons with missing values never match.
+"""
+import ast
+import operator
+
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple, Union
+
+from ..exceptions import FilesystemError
+from .columns import CATEGORY_COLUMNS, MISSING_VALUE, USAGE_COLUMNS, MountpointColumns
+
+BOOLEAN_COLUMNS = ('virtual',)
+COLUMN_ALIASES = {
+    'fs': 'filesystem',
+    'fstype': 'filesystem',
+    'is_virtual': 'virtual',
+}
+COMPARISON_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+}
+REVERSED_OPERATORS = {
+    ast.Eq: ast.Eq,
+    ast.NotEq: ast.NotEq,
+    ast.Lt: ast.Gt,
+    ast.LtE: ast.GtE,
+    ast.Gt: ast.Lt,
+    ast.GtE: ast.LtE,
+}
+
+# Compiled rule nodes are tuples of node type and arguments
+NODE_AND = 'and'
+NODE_OR = 'or'
+NODE_NOT = 'not'
+NODE_LEAF = 'leaf'
+
+
+def __pack_mask__(values: Iterable[bool], count: int) -> int:
+    """
+    Pack boolean values to integer bitmask, with first value in the lowest bit
+    """
+    data = bytearray((count + 7) // 8)
+    for index, value in enumerate(values):
+        if value:
+            data[index >> 3] |= 1 << (index & 7)
+    return int.from_bytes(data, 'little')
+
+
+def __get_column_name__(node: ast.AST) -> Union[str, None]:
+    """
+    Return column name for an ast.Name node or None if node is not a column
+    """
+    if not isinstance(node, ast.Name):
+        return None
+    name = COLUMN_ALIASES.get(node.id, node.id)
+    if name in USAGE_COLUMNS or name in CATEGORY_COLUMNS or name in BOOLEAN_COLUMNS:
+        return name
+    return None
+
+
+def __get_constant__(node: ast.AST, column: str) -> Any:
+    """
+    Return constant value for a comparison with a column. Bare names are string values
+    for categorical columns
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, (bool, int, float, str)):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+        return -node.operand.value
+    if isinstance(node, ast.Name) and column in CATEGORY_COLUMNS and __get_column_name__(node) is None:
+        return node.id
+    raise FilesystemError(f'Unexpected value in rule: {ast.unparse(node)}')
+
+
+class Rule:
+    """
+    Compiled mountpoint rule expression
+    """
+    name: str
+    expression: str
+    __node__: Tuple
+
+    def __init__(self, name: str, expression: str) -> None:
+        self.name = name
+        self.expression = expression
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except SyntaxError as error:
+            raise FilesystemError(f'Invalid rule {name}: {error}') from error
+        self.__node__ = self.__compile__(tree.body)
+
+    def __repr__(self) -> str:
+        return f'{self.name}: {self.expression}'
+
+    def __compile__(self, node: ast.AST) -> Tuple:
+        """
+        Compile an expression node to rule nodes
+        """
+        if isinstance(node, ast.BoolOp):
+            node_type = NODE_AND if isinstance(node.op, ast.And) else NODE_OR
+            return (node_type, tuple(self.__compile__(value) for value in node.values))
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            return (NODE_NOT, self.__compile__(node.operand))
+        if isinstance(node, ast.Compare):
+            return self.__compile_compare__(node)
+        column = __get_column_name__(node)
+        if column in BOOLEAN_COLUMNS:
+            return (NODE_LEAF, (column, ast.Eq, True))
+        raise FilesystemError(f'Unexpected expression in rule {self.name}: {ast.unparse(node)}')
+
+    def __compile_compare__(self, node: ast.Compare) -> Tuple:
+        """
+        Compile comparisons to rule leaf nodes. Chained comparisons are combined with and
+        """
+        leaves = []
+        left = node.left
+        for op, right in zip(node.ops, node.comparators):
+            leaves.append((NODE_LEAF, self.__compile_comparison__(left, op, right)))
+            left = right
+        return leaves[0] if len(leaves) == 1 else (NODE_AND, tuple(leaves))
+
+    def __compile_comparison__(self, left: ast.AST, op: ast.cmpop, right: ast.AST) -> Tuple[str, type, Any]:
+        """
+        Compile a single comparison to column, operator and value
+        """
+        column = __get_column_name__(left)
+        if column is None:
+            column = __get_column_name__(right)
+            if column is None or type(op) not in REVERSED_OPERATORS:
+                raise FilesystemError(f'Comparison without column in rule {self.name}')
+            left, right = right, left
+            op = REVERSED_OPERATORS[type(op)]()
+
+        if isinstance(op, (ast.In, ast.NotIn)):
+            if column not in CATEGORY_COLUMNS or not isinstance(right, (ast.Tuple, ast.List, ast.Set)):
+                raise FilesystemError(f'Invalid membership test for {column} in rule {self.name}')
+            values = frozenset(__get_constant__(item, column) for item in right.elts)
+            return (column, type(op), values)
+
+        if type(op) not in COMPARISON_OPERATORS:
+            raise FilesystemError(f'Unexpected comparison operator in rule {self.name}')
+        value = __get_constant__(right, column)
+        if column in USAGE_COLUMNS and (isinstance(value, (bool, str))):
+            raise FilesystemError(f'Invalid value for numeric column {column} in rule {self.name}')
+        if column in CATEGORY_COLUMNS and (not isinstance(value, str) or type(op) not in (ast.Eq, ast.NotEq)):
+            raise FilesystemError(f'Invalid comparison for categorical column {column} in rule {self.name}')
+        if column in BOOLEAN_COLUMNS:
+            if not isinstance(value, bool) or type(op) not in (ast.Eq, ast.NotEq):
+                raise FilesystemError(f'Invalid comparison for boolean column {column} in rule {self.name}')
+            return (column, ast.Eq, value if isinstance(op, ast.Eq) else not value)
+        return (column, type(op), value)
+
+    @property
+    def leaves(self) -> List[Hashable]:
+        """
+        Return comparisons used in the rule
+        """
+        leaves = []
+        stack = [self.__node__]
+        while stack:
+            node_type, args = stack.pop()
+            if node_type == NODE_LEAF:
+                leaves.append(args)
+            elif node_type == NODE_NOT:
+                stack.append(args)
+            else:
+                stack.extend(args)
+        return leaves
+
+
+class RuleEvaluation:
+    """
+    Evaluation of rules over mountpoint columns, caching results of comparisons
+    """
+    columns: MountpointColumns
+    all: int
+    __leaves__: Dict[Hashable, int]
+
+    def __init__(self, columns: MountpointColumns) -> None:
+        self.columns = columns
+        self.all = (1 << len(columns)) - 1
+        self.__leaves__ = {}
+
+    def __evaluate_leaf__(self, column: str, op: type, value: Any) -> int:
+        """
+        Evaluate a comparison for all mountpoints
+        """
+        count = len(self.columns)
+        if column in BOOLEAN_COLUMNS:
+            expected = 1 if value else 0
+            return __pack_mask__((item == expected for item in self.columns.virtual), count)
+        if column in CATEGORY_COLUMNS:
+            values = value if isinstance(value, frozenset) else frozenset((value,))
+            codes = {self.columns.get_code(column, item) for item in values} - {-1}
+            missing = self.columns.get_code(column, '')
+            codes_column = self.columns.codes[column]
+            if op in (ast.Eq, ast.In):
+                return __pack_mask__((code in codes for code in codes_column), count)
+            return __pack_mask__((code not in codes and code != missing for code in codes_column), count)
+        compare: Callable = COMPARISON_OPERATORS[op]
+        return __pack_mask__(
+            (item != MISSING_VALUE and compare(item, value) for item in self.columns.columns[column]),
+            count
+        )
+
+    def __evaluate__(self, node: Tuple) -> int:
+        """
+        Evaluate a compiled rule node to a bitmask of matching mountpoints
+        """
+        node_type, args = node
+        if node_type == NODE_LEAF:
+            mask = self.__leaves__.get(args, None)
+            if mask is None:
+                mask = self.__leaves__[args] = self.__evaluate_leaf__(*args)
+            return mask
+        if node_type == NODE_NOT:
+            return self.all & ~self.__evaluate__(args)
+        if node_type == NODE_AND:
+            mask = self.all
+            for item in args:
+                mask &= self.__evaluate__(item)
+                if not mask:
+                    break
+            return mask
+        mask = 0
+        for item in args:
+            mask |= self.__evaluate__(item)
+        return mask
+
+    def evaluate(self, rule: Rule) -> int:
+        """
+        Return bitmask of mountpoints matching the rule
+        """
+        return self.__evaluate__(rule.__node__)
+
+    def get_matches(self, mask: int) -> List[Any]:
+        """
+        Return mountpoints for bits set in a bitmask
+        """
+        mountpoints = self.columns.mountpoints
+        matches = []
+        while mask:
+            low = mask & -mask
+            matches.append(mountpoints[low.bit_length() - 1])
+            mask ^= low
+        return matches
+
+
+class RuleSet:
+    """
+    Set of named mountpoint rules
+
+    Rules are compiled when added. Rules are evaluated with evaluate(), which returns the
+    matching mountpoints for each rule.
+    """
+    rules: Dict[str, Rule]
+
+    def __init__(self, rules: Dict[str, str] = None) -> None:
+        self.rules = {}
+        for name, expression in (rules or {}).items():
+            self.add(name, expression)
+
+    def __repr__(self) -> str:
+        return f'{len(self.rules)} mountpoint rules'
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def add(self, name: str, expression: str) -> Rule:
+        """
+        Compile and add a rule
+        """
+        rule = self.rules[name] = Rule(name, expression)
+        return rule
+
+    def masks(self, mountpoints: Union[MountpointColumns, Iterable[Any]]) -> Dict[str, int]:
+        """
+        Return bitmasks of matching mountpoints for rules, with a bit for each mountpoint
+        in the order of the mountpoints
+        """
+        columns = mountpoints if isinstance(mountpoints, MountpointColumns) else MountpointColumns(mountpoints)
+        evaluation = RuleEvaluation(columns)
+        return {name: evaluation.evaluate(rule) for name, rule in self.rules.items()}
+
+    def evaluate(self, mountpoints: Union[MountpointColumns, Iterable[Any]]) -> Dict[str, List[Any]]:
+        """
+        Return matching mountpoints for each rule
+        """
+        columns = mountpoints if isinstance(mountpoints, MountpointColumns) else MountpointColumns(mountpoints)
+        evaluation = RuleEvaluation(columns)
+        return {name: evaluation.get_matches(evaluation.evaluate(rule)) for name, rule in self.rules.items()}
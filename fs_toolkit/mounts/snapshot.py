@@ -0,0 +1,264 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Immutable snapshots of mountpoints
+
+Snapshots are value objects without references to the Mountpoints loader or other
+mountpoints, and are pickled as tuples of values for sending to other processes.
+"""
+import sys
+import time
+
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional, Tuple, Union, TYPE_CHECKING
+
+from .diff import MountpointsDiff
+
+if TYPE_CHECKING:
+    from ..diskstats import DiskIORates
+    from ..mountstats import NFSMountStats
+    from .platform.base import Mountpoint
+
+USAGE_ATTRIBUTES = (
+    'size',
+    'available',
+    'used',
+    'percent',
+    'inodes_used',
+    'inodes_available',
+    'inodes_percent',
+)
+
+
+def __intern__(value: Optional[str]) -> Optional[str]:
+    """
+    Intern a string value shared between snapshots
+    """
+    return sys.intern(value) if value is not None else None
+
+
+def __restore_mountpoint__(values: Tuple[Any, ...],
+                           io: Optional['DiskIORates'] = None,
+                           nfs: Optional['NFSMountStats'] = None) -> 'MountpointSnapshot':
+    """
+    Restore a pickled mountpoint snapshot from values and joined statistics
+    """
+    device, mountpoint, filesystem, options, is_virtual, usage = values
+    return MountpointSnapshot(
+        device, mountpoint, filesystem, options,
+        is_virtual=is_virtual,
+        io=io,
+        nfs=nfs,
+        **dict(zip(USAGE_ATTRIBUTES, usage))
+    )
+
+
+def __restore_mountpoints__(platform: str,
+                            created: float,
+                            values: Tuple[Tuple[Any, ...], ...]) -> 'MountpointsSnapshot':
+    """
+    Restore a pickled mountpoints snapshot from values
+    """
+    return MountpointsSnapshot(platform, (__restore_mountpoint__(*item) for item in values), created=created)
+
+
+class MountpointSnapshot:
+    """
+    Immutable snapshot of a mounted filesystem with usage
+
+    Options are stored as a tuple of option strings. Usage values are None for filesystems
+    without usage data, and inode values are None for filesystems without inode counters.
+
+    I/O rates and NFS statistics joined to the snapshot are in io and nfs, and are not
+    compared in equality checks. Use replace() to create a copy with changed values.
+    """
+    __slots__ = ('device', 'mountpoint', 'filesystem', 'options', 'is_virtual', *USAGE_ATTRIBUTES, 'io', 'nfs')
+
+    device: str
+    mountpoint: str
+    filesystem: Optional[str]
+    options: Tuple[str, ...]
+    is_virtual: bool
+    size: Optional[int]
+    available: Optional[int]
+    used: Optional[int]
+    percent: Optional[int]
+    inodes_used: Optional[int]
+    inodes_available: Optional[int]
+    inodes_percent: Optional[int]
+    io: Optional['DiskIORates']
+    nfs: Optional['NFSMountStats']
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 device: str,
+                 mountpoint: str,
+                 filesystem: Optional[str] = None,
+                 options: Iterable[str] = (),
+                 *,
+                 is_virtual: bool = False,
+                 size: Optional[int] = None,
+                 available: Optional[int] = None,
+                 used: Optional[int] = None,
+                 percent: Optional[int] = None,
+                 inodes_used: Optional[int] = None,
+                 inodes_available: Optional[int] = None,
+                 inodes_percent: Optional[int] = None,
+                 io: Optional['DiskIORates'] = None,
+                 nfs: Optional['NFSMountStats'] = None) -> None:
+        values = {
+            'device': device,
+            'mountpoint': mountpoint,
+            'filesystem': __intern__(filesystem),
+            'options': tuple(__intern__(option) for option in options),
+            'is_virtual': bool(is_virtual),
+            'size': size,
+            'available': available,
+            'used': used,
+            'percent': percent,
+            'inodes_used': inodes_used,
+            'inodes_available': inodes_available,
+            'inodes_percent': inodes_percent,
+            'io': io,
+            'nfs': nfs,
+        }
+        for attr, value in values.items():
+            object.__setattr__(self, attr, value)
+
+    @classmethod
+    def from_mountpoint(cls, mountpoint: 'Mountpoint') -> 'MountpointSnapshot':
+        """
+        Create snapshot from a loaded mountpoint
+        """
+        return cls(
+            mountpoint.device,
+            mountpoint.mountpoint,
+            mountpoint.filesystem.name,
+            mountpoint.options,
+            is_virtual=mountpoint.is_virtual,
+            io=mountpoint.io,
+            nfs=mountpoint.nfs,
+            **{attr: getattr(mountpoint.usage, attr) for attr in USAGE_ATTRIBUTES}
+        )
+
+    def replace(self, **values: Any) -> 'MountpointSnapshot':
+        """
+        Return a copy of the snapshot with values replaced by keyword arguments
+        """
+        values = {attr: getattr(self, attr) for attr in self.__slots__} | values
+        return self.__class__(
+            values.pop('device'),
+            values.pop('mountpoint'),
+            values.pop('filesystem'),
+            values.pop('options'),
+            **values
+        )
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, attr: str) -> None:
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __values__(self) -> Tuple[Any, ...]:
+        """
+        Return snapshot values as tuple
+        """
+        return (
+            self.device,
+            self.mountpoint,
+            self.filesystem,
+            self.options,
+            self.is_virtual,
+            tuple(getattr(self, attr) for attr in USAGE_ATTRIBUTES),
+        )
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (__restore_mountpoint__, (self.__values__(), self.io, self.nfs))
+
+    def __repr__(self) -> str:
+        return f'{self.device} mounted on {self.mountpoint}'
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, MountpointSnapshot):
+            return NotImplemented
+        return self.__values__() == other.__values__()
+
+    def __hash__(self) -> int:
+        return hash(self.__values__())
+
+    @property
+    def name(self) -> str:
+        """
+        Return basename of mountpoint as string
+        """
+        return Path(self.mountpoint).name
+
+
+class MountpointsSnapshot(Sequence):
+    """
+    Immutable snapshot of mountpoints loaded on a platform
+    """
+    __slots__ = ('platform', 'created', '__mountpoints__')
+
+    platform: str
+    created: float
+    __mountpoints__: Tuple[MountpointSnapshot, ...]
+
+    def __init__(self,
+                 platform: str,
+                 mountpoints: Iterable[MountpointSnapshot],
+                 created: Optional[float] = None) -> None:
+        object.__setattr__(self, 'platform', platform)
+        object.__setattr__(self, 'created', created if created is not None else time.time())
+        object.__setattr__(self, '__mountpoints__', tuple(mountpoints))
+
+    def __setattr__(self, attr: str, value: Any) -> None:
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __delattr__(self, attr: str) -> None:
+        raise AttributeError(f'{self.__class__.__name__} is immutable')
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        values = tuple((item.__values__(), item.io, item.nfs) for item in self.__mountpoints__)
+        return (__restore_mountpoints__, (self.platform, self.created, values))
+
+    def __repr__(self) -> str:
+        return f'{self.platform} mountpoints snapshot with {len(self)} mountpoints'
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, MountpointsSnapshot):
+            return NotImplemented
+        return self.platform == other.platform and self.__mountpoints__ == other.__mountpoints__
+
+    def __hash__(self) -> int:
+        return hash((self.platform, self.__mountpoints__))
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[MountpointSnapshot, Tuple[MountpointSnapshot, ...]]:
+        return self.__mountpoints__[index]
+
+    def __len__(self) -> int:
+        return len(self.__mountpoints__)
+
+    def __iter__(self) -> Iterator[MountpointSnapshot]:
+        return iter(self.__mountpoints__)
+
+    def get_by_mountpoint(self, path: Union[str, Path]) -> Optional[MountpointSnapshot]:
+        """
+        Get the last mounted snapshot by mountpoint path
+        """
+        path = str(path)
+        for item in reversed(self.__mountpoints__):
+            if item.mountpoint == path:
+                return item
+        return None
+
+    def diff(self, other: Iterable[Any]) -> MountpointsDiff:
+        """
+        Return differences from this snapshot to other mountpoints or snapshot
+        """
+        return MountpointsDiff(self, other)
@@ -0,0 +1,571 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Append-only usage time series file for mountpoints
+
+The file contains a header followed by fixed size records. Each record has record type,
+key ID and timestamp, followed by a type specific payload:
+
+- sample records contain used, available and size values in KiB and used inodes, with
+  -1 for missing values
+- key records define the mountpoint path for a key ID. Paths longer than the key record
+  payload continue in key continuation records following the key record
+
+Records are written in timestamp order, so time ranges can be found with binary search
+from the memory mapped file. Key IDs are never reused or renumbered, so key IDs stay valid
+for all open instances of the store.
+
+Writers hold an exclusive flock() on the store file while appending or compacting. Readers
+don't lock the file and ignore a partially written record at the end of the file.
+"""
+import fcntl
+import mmap
+import os
+import socket
+import struct
+import tempfile
+import time
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ..exceptions import FilesystemError
+
+STORE_MAGIC = b'FSTS'
+STORE_VERSION = 1
+STORE_HEADER = struct.Struct('<4sHHd16x')
+
+RECORD_SAMPLE = 1
+RECORD_KEY = 2
+RECORD_KEY_CONTINUATION = 3
+
+SAMPLE_RECORD = struct.Struct('<BxxxIdqqqq')
+KEY_RECORD = struct.Struct('<BxxxIdH30s')
+KEY_CONTINUATION_RECORD = struct.Struct('<BxxxId32s')
+RECORD_HEADER = struct.Struct('<BxxxId')
+RECORD_SIZE = SAMPLE_RECORD.size
+
+SAMPLE_ATTRIBUTES = ('used', 'available', 'size', 'inodes_used')
+NONE_VALUE = -1
+STORE_FILE_SUFFIX = '.usage'
+
+
+# pylint: disable=too-few-public-methods
+class UsageSample:
+    """
+    Usage sample of a mountpoint loaded from usage store
+    """
+    __slots__ = ('mountpoint', 'timestamp', *SAMPLE_ATTRIBUTES)
+
+    mountpoint: str
+    timestamp: float
+    used: Optional[int]
+    available: Optional[int]
+    size: Optional[int]
+    inodes_used: Optional[int]
+
+    def __init__(self, mountpoint: str, timestamp: float, values: Iterable[int]) -> None:
+        self.mountpoint = mountpoint
+        self.timestamp = timestamp
+        for attr, value in zip(SAMPLE_ATTRIBUTES, values):
+            setattr(self, attr, None if value == NONE_VALUE else value)
+
+    def __repr__(self) -> str:
+        return f'{self.mountpoint} {self.timestamp} used {self.used}'
+
+
+# pylint: disable=too-few-public-methods
+class UsageAggregate:
+    """
+    Aggregated usage samples of a mountpoint in a time range
+    """
+    mountpoint: str
+    count: int
+    first: Optional[float]
+    last: Optional[float]
+    minimum: Dict[str, Optional[int]]
+    maximum: Dict[str, Optional[int]]
+    __sums__: Dict[str, int]
+    __counts__: Dict[str, int]
+
+    def __init__(self, mountpoint: str) -> None:
+        self.mountpoint = mountpoint
+        self.count = 0
+        self.first = None
+        self.last = None
+        self.minimum = {attr: None for attr in SAMPLE_ATTRIBUTES}
+        self.maximum = {attr: None for attr in SAMPLE_ATTRIBUTES}
+        self.__sums__ = {attr: 0 for attr in SAMPLE_ATTRIBUTES}
+        self.__counts__ = {attr: 0 for attr in SAMPLE_ATTRIBUTES}
+
+    def __repr__(self) -> str:
+        return f'{self.mountpoint} {self.count} samples'
+
+    def add(self, timestamp: float, values: Iterable[int]) -> None:
+        """
+        Add sample values to the aggregate
+        """
+        self.count += 1
+        self.first = timestamp if self.first is None else self.first
+        self.last = timestamp
+        for attr, value in zip(SAMPLE_ATTRIBUTES, values):
+            if value == NONE_VALUE:
+                continue
+            self.__sums__[attr] += value
+            self.__counts__[attr] += 1
+            if self.minimum[attr] is None or value < self.minimum[attr]:
+                self.minimum[attr] = value
+            if self.maximum[attr] is None or value > self.maximum[attr]:
+                self.maximum[attr] = value
+
+    def mean(self, attr: str) -> Optional[float]:
+        """
+        Return mean of a sample value or None if there are no values
+        """
+        if not self.__counts__[attr]:
+            return None
+        return self.__sums__[attr] / self.__counts__[attr]
+
+
+class RecordTimestamps:
+    """
+    Sequence of record timestamps in a memory mapped usage store for binary search
+    """
+    __buffer__: Union[mmap.mmap, bytes]
+    __count__: int
+
+    def __init__(self, buffer: Union[mmap.mmap, bytes], count: int) -> None:
+        self.__buffer__ = buffer
+        self.__count__ = count
+
+    def __len__(self) -> int:
+        return self.__count__
+
+    def __getitem__(self, index: int) -> float:
+        return RECORD_HEADER.unpack_from(self.__buffer__, STORE_HEADER.size + index * RECORD_SIZE)[2]
+
+
+class MappedUsageStore:
+    """
+    Context manager for memory mapping usage store file for reading
+    """
+    path: Path
+    __handle__: Optional[mmap.mmap]
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.__handle__ = None
+
+    def __enter__(self) -> Tuple[Union[mmap.mmap, bytes], int]:
+        try:
+            with open(self.path, 'rb') as handle:
+                self.__handle__ = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as error:
+            raise FilesystemError(f'Error reading usage store {self.path}: {error}') from error
+        buffer = self.__handle__
+        if len(buffer) < STORE_HEADER.size:
+            self.__exit__()
+            raise FilesystemError(f'Truncated usage store {self.path}')
+        magic, version, record_size, _created = STORE_HEADER.unpack_from(buffer, 0)
+        if magic != STORE_MAGIC or version != STORE_VERSION or record_size != RECORD_SIZE:
+            self.__exit__()
+            raise FilesystemError(f'Invalid usage store {self.path}')
+        return buffer, (len(buffer) - STORE_HEADER.size) // RECORD_SIZE
+
+    def __exit__(self, *args: Any) -> None:
+        if self.__handle__ is not None:
+            self.__handle__.close()
+            self.__handle__ = None
+
+
+class UsageStore:
+    """
+    Append-only usage time series file with fixed size records
+
+    Mountpoint paths are stored once as key records and samples refer to the key ID.
+    Samples are appended with append() and read from a memory mapped file with scan()
+    and aggregate(). Old samples can be removed or downsampled with compact().
+
+    Keys are loaded again from the file when the file has been changed by other instances
+    and a key is not known. With readonly set the file is never created or modified.
+    """
+    path: Path
+    readonly: bool
+    __keys__: Dict[str, int]
+    __names__: Dict[int, str]
+    __last_timestamp__: Optional[float]
+    __file_signature__: Optional[Tuple[int, int]]
+
+    def __init__(self, path: Union[str, Path], readonly: bool = False) -> None:
+        self.path = Path(path)
+        self.readonly = readonly
+        self.__keys__ = {}
+        self.__names__ = {}
+        self.__last_timestamp__ = None
+        self.__file_signature__ = None
+        self.__open__()
+
+    def __repr__(self) -> str:
+        return str(self.path)
+
+    @classmethod
+    def for_host(cls, directory: Union[str, Path], hostname: Optional[str] = None) -> 'UsageStore':
+        """
+        Return usage store for a host in directory
+        """
+        hostname = hostname if hostname is not None else socket.gethostname()
+        return cls(Path(directory).joinpath(f'{hostname}{STORE_FILE_SUFFIX}'))
+
+    def __open__(self) -> None:
+        """
+        Load keys from the store file. Unless the store is read only, the file is created
+        if missing and partially written records at the end of the file are removed
+        """
+        if not self.readonly:
+            with self.__lock__():
+                pass
+        self.__load_keys__()
+
+    @contextmanager
+    def __lock__(self) -> Iterator[int]:
+        """
+        Open the store file for writing with an exclusive lock and return the file descriptor
+
+        The file is created if missing. The lock is taken again if the file was replaced by
+        compact() while waiting for the lock. Partially written records left by interrupted
+        writers are removed while the lock is held.
+        """
+        if self.readonly:
+            raise FilesystemError(f'Usage store {self.path} is read only')
+        try:
+            while True:
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                    stat = os.fstat(fd)
+                    if os.path.exists(self.path) and os.stat(self.path).st_ino == stat.st_ino:
+                        break
+                except OSError:
+                    os.close(fd)
+                    raise
+                os.close(fd)
+            try:
+                if stat.st_size == 0:
+                    os.write(fd, STORE_HEADER.pack(STORE_MAGIC, STORE_VERSION, RECORD_SIZE, time.time()))
+                elif stat.st_size > STORE_HEADER.size:
+                    extra = (stat.st_size - STORE_HEADER.size) % RECORD_SIZE
+                    if extra:
+                        os.ftruncate(fd, stat.st_size - extra)
+            except OSError:
+                os.close(fd)
+                raise
+        except OSError as error:
+            raise FilesystemError(f'Error opening usage store {self.path}: {error}') from error
+        try:
+            yield fd
+        finally:
+            os.close(fd)
+
+    def __get_file_signature__(self) -> Optional[Tuple[int, int]]:
+        """
+        Return tuple of inode and size of the store file or None if the file can't be accessed
+        """
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def __load_keys__(self) -> None:
+        """
+        Load keys and latest timestamp from the store file
+        """
+        keys = {}
+        names = {}
+        last_timestamp = None
+        file_signature = self.__get_file_signature__()
+        with self.__map__() as (buffer, count):
+            for index in range(count):
+                kind, key, timestamp = RECORD_HEADER.unpack_from(buffer, STORE_HEADER.size + index * RECORD_SIZE)
+                if kind == RECORD_KEY:
+                    name = self.__read_key__(buffer, index, count)
+                    keys[name] = key
+                    names[key] = name
+                last_timestamp = timestamp
+        self.__keys__ = keys
+        self.__names__ = names
+        self.__last_timestamp__ = last_timestamp
+        self.__file_signature__ = file_signature
+
+    def __refresh_keys__(self) -> None:
+        """
+        Load keys again if the store file has been changed after keys were loaded
+        """
+        if self.__get_file_signature__() != self.__file_signature__:
+            self.__load_keys__()
+
+    def __get_name__(self, key: int) -> Optional[str]:
+        """
+        Return mountpoint path for a key ID, loading keys again for unknown keys. Returns
+        None if the key is not found
+        """
+        name = self.__names__.get(key, None)
+        if name is None:
+            self.__refresh_keys__()
+            name = self.__names__.get(key, None)
+        return name
+
+    def __get_key__(self, mountpoint: str) -> Optional[int]:
+        """
+        Return key ID for a mountpoint path, loading keys again for unknown paths. Returns
+        None if the path is not found
+        """
+        key = self.__keys__.get(mountpoint, None)
+        if key is None:
+            self.__refresh_keys__()
+            key = self.__keys__.get(mountpoint, None)
+        return key
+
+    def __map__(self) -> MappedUsageStore:
+        """
+        Return context manager for the memory mapped store file
+        """
+        return MappedUsageStore(self.path)
+
+    @staticmethod
+    def __read_key__(buffer: Union[mmap.mmap, bytes], index: int, count: int) -> str:
+        """
+        Read mountpoint path from a key record and following continuation records
+        """
+        _kind, _key, _timestamp, length, data = KEY_RECORD.unpack_from(buffer, STORE_HEADER.size + index * RECORD_SIZE)
+        parts = [data]
+        remaining = length - len(data)
+        while remaining > 0 and index + 1 < count:
+            index += 1
+            data = KEY_CONTINUATION_RECORD.unpack_from(buffer, STORE_HEADER.size + index * RECORD_SIZE)[3]
+            parts.append(data)
+            remaining -= len(data)
+        return b''.join(parts)[:length].decode('utf-8', 'surrogateescape')
+
+    @staticmethod
+    def __encode_key__(key: int, name: str, timestamp: float) -> bytes:
+        """
+        Encode key record and continuation records for a mountpoint path
+        """
+        data = name.encode('utf-8', 'surrogateescape')
+        records = [KEY_RECORD.pack(RECORD_KEY, key, timestamp, len(data), data[:30])]
+        for offset in range(30, len(data), 32):
+            records.append(
+                KEY_CONTINUATION_RECORD.pack(RECORD_KEY_CONTINUATION, key, timestamp, data[offset:offset + 32])
+            )
+        return b''.join(records)
+
+    def __encode_samples__(self, samples: Iterable[Tuple[str, float, Tuple[Optional[int], ...]]]) -> bytes:
+        """
+        Encode sample records, adding key records for new mountpoint paths
+        """
+        data = []
+        for name, timestamp, values in samples:
+            key = self.__keys__.get(name, None)
+            if key is None:
+                key = max(self.__names__, default=-1) + 1
+                self.__keys__[name] = key
+                self.__names__[key] = name
+                data.append(self.__encode_key__(key, name, timestamp))
+            values = [NONE_VALUE if value is None else value for value in values]
+            data.append(SAMPLE_RECORD.pack(RECORD_SAMPLE, key, timestamp, *values))
+        return b''.join(data)
+
+    def append(self, mountpoints: Iterable[Any], timestamp: Optional[float] = None) -> int:
+        """
+        Append usage samples of mountpoints with usage data and return number of samples
+
+        Samples of one call are written with a single write to the end of the file while
+        holding the store lock
+        """
+        timestamp = timestamp if timestamp is not None else time.time()
+        samples = []
+        for item in mountpoints:
+            usage = getattr(item, 'usage', item)
+            values = tuple(getattr(usage, attr, None) for attr in SAMPLE_ATTRIBUTES)
+            if values[0] is None and values[1] is None:
+                continue
+            samples.append((str(item.mountpoint), timestamp, values))
+        if not samples:
+            return 0
+        with self.__lock__() as fd:
+            self.__refresh_keys__()
+            if self.__last_timestamp__ is not None and timestamp < self.__last_timestamp__:
+                raise FilesystemError(f'Usage sample timestamp {timestamp} is older than latest sample')
+            data = self.__encode_samples__(samples)
+            try:
+                os.write(fd, data)
+            except OSError as error:
+                self.__file_signature__ = None
+                raise FilesystemError(f'Error writing usage store {self.path}: {error}') from error
+            stat = os.fstat(fd)
+        self.__last_timestamp__ = timestamp
+        self.__file_signature__ = (stat.st_ino, stat.st_size)
+        return len(samples)
+
+    @property
+    def mountpoints(self) -> List[str]:
+        """
+        Return mountpoint paths in the store
+        """
+        self.__refresh_keys__()
+        return list(self.__keys__)
+
+    def __get_range__(self,
+                      buffer: Union[mmap.mmap, bytes],
+                      count: int,
+                      start: Optional[float],
+                      end: Optional[float]) -> range:
+        """
+        Return range of record indexes with timestamps start <= timestamp < end
+        """
+        timestamps = RecordTimestamps(buffer, count)
+        first = bisect_left(timestamps, start) if start is not None else 0
+        last = bisect_left(timestamps, end, lo=first) if end is not None else count
+        return range(first, last)
+
+    def __iter_samples__(self,
+                         start: Optional[float] = None,
+                         end: Optional[float] = None,
+                         mountpoint: Optional[str] = None) -> Iterator[Tuple[int, float, Tuple[int, ...]]]:
+        """
+        Iterate sample records in time range as key ID, timestamp and raw values
+        """
+        key = None
+        if mountpoint is not None:
+            key = self.__get_key__(str(mountpoint))
+            if key is None:
+                return
+        with self.__map__() as (buffer, count):
+            records = self.__get_range__(buffer, count, start, end)
+            if not records:
+                return
+            view = memoryview(buffer)[
+                STORE_HEADER.size + records.start * RECORD_SIZE:STORE_HEADER.size + records.stop * RECORD_SIZE
+            ]
+            records = SAMPLE_RECORD.iter_unpack(view)
+            try:
+                for kind, record_key, timestamp, *values in records:
+                    if kind == RECORD_SAMPLE and (key is None or record_key == key):
+                        yield record_key, timestamp, values
+            finally:
+                del records
+                view.release()
+
+    def scan(self,
+             start: Optional[float] = None,
+             end: Optional[float] = None,
+             mountpoint: Optional[str] = None) -> Iterator[UsageSample]:
+        """
+        Iterate usage samples with start <= timestamp < end, optionally for a single mountpoint
+        """
+        for key, timestamp, values in self.__iter_samples__(start, end, mountpoint):
+            name = self.__get_name__(key)
+            if name is not None:
+                yield UsageSample(name, timestamp, values)
+
+    def aggregate(self,
+                  start: Optional[float] = None,
+                  end: Optional[float] = None,
+                  mountpoint: Optional[str] = None) -> Dict[str, UsageAggregate]:
+        """
+        Return aggregates of usage samples by mountpoint in time range
+        """
+        aggregates = {}
+        for key, timestamp, values in self.__iter_samples__(start, end, mountpoint):
+            aggregate = aggregates.get(key, None)
+            if aggregate is None:
+                name = self.__get_name__(key)
+                if name is None:
+                    continue
+                aggregate = aggregates[key] = UsageAggregate(name)
+            aggregate.add(timestamp, values)
+        return {aggregate.mountpoint: aggregate for aggregate in aggregates.values()}
+
+    def __downsample__(self, before: float, interval: float) -> List[Tuple[str, float, Tuple[Optional[int], ...]]]:
+        """
+        Return samples older than before timestamp downsampled to one sample per mountpoint
+        and interval, in timestamp order
+        """
+        buckets = {}
+        for key, timestamp, values in self.__iter_samples__(end=before):
+            bucket_start = timestamp - timestamp % interval
+            bucket = buckets.get((bucket_start, key), None)
+            if bucket is None:
+                name = self.__get_name__(key)
+                if name is None:
+                    continue
+                bucket = buckets[(bucket_start, key)] = UsageAggregate(name)
+            bucket.add(timestamp, values)
+        samples = []
+        for (bucket_start, _key), bucket in buckets.items():
+            values = tuple(
+                None if bucket.mean(attr) is None else round(bucket.mean(attr)) for attr in SAMPLE_ATTRIBUTES
+            )
+            samples.append((bucket.mountpoint, bucket_start, values))
+        samples.sort(key=lambda sample: sample[1])
+        return samples
+
+    def compact(self, before: float, interval: Optional[float] = None) -> None:
+        """
+        Compact samples older than before timestamp
+
+        Without interval old samples are removed. With interval old samples are downsampled
+        to one sample per mountpoint and interval, with mean values of the samples and the
+        timestamp of the start of the interval. The file is replaced while holding the store
+        lock. Key records of all keys are written to the start of the new file, so key IDs
+        stay valid for other open instances of the store.
+        """
+        with self.__lock__():
+            self.__refresh_keys__()
+            samples = self.__downsample__(before, interval) if interval is not None else []
+            for key, timestamp, values in self.__iter_samples__(start=before):
+                name = self.__get_name__(key)
+                if name is not None:
+                    values = [None if value == NONE_VALUE else value for value in values]
+                    samples.append((name, timestamp, values))
+
+            with self.__map__() as (buffer, _count):
+                header = bytes(buffer[:STORE_HEADER.size])
+            timestamp = samples[0][1] if samples else (self.__last_timestamp__ or 0.0)
+            keys = b''.join(self.__encode_key__(key, name, timestamp) for key, name in sorted(self.__names__.items()))
+            self.__write_file__(header + keys + self.__encode_samples__(samples))
+        self.__load_keys__()
+
+    def __write_file__(self, data: bytes) -> None:
+        """
+        Replace the store file atomically with a temporary file in the same directory
+
+        Mode of the existing file is kept, and owner and group are kept when permitted
+        """
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            stat = None
+        fd, tmpfile = tempfile.mkstemp(dir=self.path.parent, prefix=f'.{self.path.name}.')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+                handle.flush()
+                os.fsync(handle.fileno())
+            os.chmod(tmpfile, stat.st_mode & 0o7777 if stat is not None else 0o644)
+            if stat is not None:
+                try:
+                    os.chown(tmpfile, stat.st_uid, stat.st_gid)
+                except PermissionError:
+                    pass
+            os.replace(tmpfile, self.path)
+        except OSError as error:
+            if os.path.exists(tmpfile):
+                os.unlink(tmpfile)
+            raise FilesystemError(f'Error writing usage store {self.path}: {error}') from error
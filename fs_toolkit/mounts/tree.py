@@ -0,0 +1,222 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Tree of mounts linked by mount IDs and parent mount IDs
+
+The tree and its indexes are built in linear time from the mounts. Subtree queries
+only visit the mounts on the path to the queried directory and the mounts under it.
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def __is_under__(mountpoint: str, path: str) -> bool:
+    """
+    Check if mountpoint is the path or a path under it
+    """
+    if path == '/':
+        return True
+    return mountpoint == path or mountpoint.startswith(f'{path}/')
+
+
+class MountTree:
+    """
+    Mounts as a tree by parent mount IDs
+
+    Mounts whose parent is not in the mounts are roots of the tree. A mount is shadowed
+    when another mount has been mounted on the same mountpoint on top of it, either as a
+    child mount on the same mountpoint or as a later sibling on the same mountpoint. Mounts
+    which are shadowed or mounted under a shadowed mount are hidden.
+
+    Mounts are indexed by mount ID, mountpoint and propagation peer groups.
+    """
+    mounts: Tuple[Any, ...]
+    roots: List[Any]
+    shadowed: Set[int]
+    hidden: Set[int]
+    __by_id__: Dict[int, Any]
+    __children__: Dict[int, List[Any]]
+    __by_mountpoint__: Dict[str, List[Any]]
+    __peer_groups__: Dict[int, List[Any]]
+    __slaves__: Dict[int, List[Any]]
+
+    def __init__(self, mounts: Iterable[Any]) -> None:
+        self.mounts = tuple(mounts)
+        self.__by_id__ = {item.mount_id: item for item in self.mounts}
+        self.__children__ = {}
+        self.__by_mountpoint__ = {}
+        self.__peer_groups__ = {}
+        self.__slaves__ = {}
+        self.roots = []
+        self.shadowed = set()
+
+        # Latest mount on each parent and mountpoint, to detect mounts shadowed by siblings
+        stacked = {}
+        for item in self.mounts:
+            parent = self.__by_id__.get(item.parent_id, None)
+            if parent is None or parent is item:
+                self.roots.append(item)
+            else:
+                self.__children__.setdefault(parent.mount_id, []).append(item)
+                if parent.mountpoint == item.mountpoint:
+                    self.shadowed.add(parent.mount_id)
+                key = (parent.mount_id, item.mountpoint)
+                previous = stacked.get(key, None)
+                if previous is not None:
+                    self.shadowed.add(previous.mount_id)
+                stacked[key] = item
+            self.__by_mountpoint__.setdefault(item.mountpoint, []).append(item)
+            if item.shared is not None:
+                self.__peer_groups__.setdefault(item.shared, []).append(item)
+            if item.master is not None:
+                self.__slaves__.setdefault(item.master, []).append(item)
+        self.hidden = self.__get_hidden_mounts__()
+
+    def __get_hidden_mounts__(self) -> Set[int]:
+        """
+        Return IDs of shadowed mounts and mounts under shadowed mounts. Mounts on top of
+        a shadowed mount on the same mountpoint are hidden only if the shadowed mount is
+        under another shadowed mount
+        """
+        hidden = set()
+        stack = [(item, False) for item in self.roots]
+        while stack:
+            item, parent_hidden = stack.pop()
+            if parent_hidden or item.mount_id in self.shadowed:
+                hidden.add(item.mount_id)
+            for child in self.__children__.get(item.mount_id, ()):
+                child_hidden = parent_hidden or (
+                    item.mount_id in self.shadowed and child.mountpoint != item.mountpoint
+                )
+                stack.append((child, child_hidden))
+        return hidden
+
+    def __repr__(self) -> str:
+        return f'tree of {len(self.mounts)} mounts'
+
+    def __len__(self) -> int:
+        return len(self.mounts)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.walk()
+
+    def __contains__(self, mount_id: int) -> bool:
+        return mount_id in self.__by_id__
+
+    def get(self, mount_id: int) -> Optional[Any]:
+        """
+        Return mount by mount ID
+        """
+        return self.__by_id__.get(mount_id, None)
+
+    def get_parent(self, item: Any) -> Optional[Any]:
+        """
+        Return parent mount of a mount, or None for root mounts
+        """
+        parent = self.__by_id__.get(item.parent_id, None)
+        return parent if parent is not item else None
+
+    def get_children(self, item: Any) -> List[Any]:
+        """
+        Return mounts mounted under a mount
+        """
+        return list(self.__children__.get(item.mount_id, ()))
+
+    def get_ancestors(self, item: Any) -> List[Any]:
+        """
+        Return parent mounts of a mount, starting from the closest parent
+        """
+        ancestors = []
+        seen = {item.mount_id}
+        parent = self.get_parent(item)
+        while parent is not None and parent.mount_id not in seen:
+            ancestors.append(parent)
+            seen.add(parent.mount_id)
+            parent = self.get_parent(parent)
+        return ancestors
+
+    def walk(self, item: Optional[Any] = None) -> Iterator[Any]:
+        """
+        Iterate mounts depth first in mount order, starting from roots or the given mount
+        """
+        stack = list(reversed(self.roots)) if item is None else [item]
+        while stack:
+            item = stack.pop()
+            yield item
+            stack.extend(reversed(self.__children__.get(item.mount_id, ())))
+
+    def is_shadowed(self, item: Any) -> bool:
+        """
+        Check if a mount is hidden by another mount on the same mountpoint
+        """
+        return item.mount_id in self.shadowed
+
+    def is_visible(self, item: Any) -> bool:
+        """
+        Check if a mount is not shadowed or mounted under a shadowed mount
+        """
+        return item.mount_id not in self.hidden
+
+    def get_by_mountpoint(self, path: str) -> Optional[Any]:
+        """
+        Return the visible mount on a mountpoint
+        """
+        for item in reversed(self.__by_mountpoint__.get(str(path), ())):
+            if item.mount_id not in self.hidden:
+                return item
+        return None
+
+    def get_mounts_by_mountpoint(self, path: str) -> List[Any]:
+        """
+        Return all mounts on a mountpoint in mount order, including shadowed mounts
+        """
+        return list(self.__by_mountpoint__.get(str(path), ()))
+
+    def subtree(self, path: str, include_hidden: bool = False) -> List[Any]:
+        """
+        Return visible mounts on the path and under it in depth first order, with hidden
+        mounts if include_hidden is set
+
+        Only branches of the tree which can contain mounts under the path are visited
+        """
+        path = str(path).rstrip('/') or '/'
+        matches = []
+        stack = list(reversed(self.roots))
+        while stack:
+            item = stack.pop()
+            if __is_under__(item.mountpoint, path):
+                if include_hidden or item.mount_id not in self.hidden:
+                    matches.append(item)
+            elif not __is_under__(path, item.mountpoint):
+                continue
+            stack.extend(reversed(self.__children__.get(item.mount_id, ())))
+        return matches
+
+    def get_peers(self, item: Any) -> List[Any]:
+        """
+        Return other mounts in the same shared peer group as a mount
+        """
+        if item.shared is None:
+            return []
+        return [peer for peer in self.__peer_groups__.get(item.shared, ()) if peer is not item]
+
+    def get_peer_group(self, group: int) -> List[Any]:
+        """
+        Return mounts in a shared peer group
+        """
+        return list(self.__peer_groups__.get(group, ()))
+
+    def get_slaves(self, group: int) -> List[Any]:
+        """
+        Return mounts receiving propagation from a peer group
+        """
+        return list(self.__slaves__.get(group, ()))
+
+    @property
+    def peer_groups(self) -> Dict[int, List[Any]]:
+        """
+        Return mounts by shared peer group ID
+        """
+        return {group: list(items) for group, items in self.__peer_groups__.items()}
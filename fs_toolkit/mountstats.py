@@ -0,0 +1,286 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Linux NFS mount statistics from /proc/self/mountstats
+
+The mountstats file is parsed line by line as a stream. Sections of mounts which are not
+NFS mounts, or not in the requested mountpoints, are skipped by checking only the start of
+each line. Per-operation RPC counters are parsed for NFS mounts, and differences between
+refreshes are calculated for the counters.
+"""
+from pathlib import Path
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Union
+
+from .encoding import decode_path
+from .exceptions import FilesystemError
+from .mounts.snapshot import MountpointSnapshot
+
+MOUNTSTATS_PATH = Path('/proc/self/mountstats')
+NFS_FILESYSTEMS = ('nfs', 'nfs4')
+
+# Per-operation counters after operation name. Times are in milliseconds. Newer kernels
+# add an error counter, which is not used
+NFS_OPERATION_COUNTERS = (
+    'operations',
+    'transmissions',
+    'major_timeouts',
+    'bytes_sent',
+    'bytes_received',
+    'queue_time',
+    'rtt',
+    'execute_time',
+)
+
+DEVICE_PREFIX = b'device '
+NO_DEVICE_PREFIX = b'no device '
+AGE_PREFIX = b'age:'
+PER_OP_PREFIX = b'per-op statistics'
+
+
+class NFSOperationCounters:
+    """
+    RPC counters for a NFS operation
+
+    Subtracting counters returns the counter differences as NFSOperationCounters
+    """
+    __slots__ = ('name', *NFS_OPERATION_COUNTERS)
+
+    name: str
+    operations: int
+    transmissions: int
+    major_timeouts: int
+    bytes_sent: int
+    bytes_received: int
+    queue_time: int
+    rtt: int
+    execute_time: int
+
+    def __init__(self, name: str, values: Iterable[int]) -> None:
+        self.name = name
+        for attr, value in zip(NFS_OPERATION_COUNTERS, values):
+            setattr(self, attr, value)
+
+    def __repr__(self) -> str:
+        return f'{self.name} {self.operations} operations'
+
+    def __sub__(self, other: 'NFSOperationCounters') -> 'NFSOperationCounters':
+        return NFSOperationCounters(
+            self.name,
+            (getattr(self, attr) - getattr(other, attr) for attr in NFS_OPERATION_COUNTERS)
+        )
+
+    @property
+    def retransmissions(self) -> int:
+        """
+        Return number of retransmitted requests
+        """
+        return self.transmissions - self.operations
+
+    @property
+    def average_rtt(self) -> Optional[float]:
+        """
+        Return average round trip time in milliseconds, or None without operations
+        """
+        return self.rtt / self.operations if self.operations else None
+
+    @property
+    def average_execute_time(self) -> Optional[float]:
+        """
+        Return average execution time including queue time in milliseconds
+        """
+        return self.execute_time / self.operations if self.operations else None
+
+
+class NFSMountStats:
+    """
+    NFS statistics for a mountpoint
+
+    After a refresh, delta contains the counter differences from the previous refresh
+    """
+    device: str
+    mountpoint: str
+    filesystem: str
+    age: Optional[int]
+    operations: Dict[str, NFSOperationCounters]
+    delta: Optional['NFSMountStats']
+
+    def __init__(self, device: str, mountpoint: str, filesystem: str) -> None:
+        self.device = device
+        self.mountpoint = mountpoint
+        self.filesystem = filesystem
+        self.age = None
+        self.operations = {}
+        self.delta = None
+
+    def __repr__(self) -> str:
+        return f'{self.device} mounted on {self.mountpoint} with {len(self.operations)} operations'
+
+    def __sub__(self, other: 'NFSMountStats') -> 'NFSMountStats':
+        stats = NFSMountStats(self.device, self.mountpoint, self.filesystem)
+        if self.age is not None and other.age is not None:
+            stats.age = self.age - other.age
+        for name, counters in self.operations.items():
+            previous = other.operations.get(name, None)
+            if previous is not None:
+                stats.operations[name] = counters - previous
+        return stats
+
+    def __total__(self, attr: str) -> int:
+        """
+        Return total of a counter over all operations
+        """
+        return sum(getattr(counters, attr) for counters in self.operations.values())
+
+    @property
+    def retransmissions(self) -> int:
+        """
+        Return number of retransmitted requests for all operations
+        """
+        return self.__total__('transmissions') - self.__total__('operations')
+
+    @property
+    def major_timeouts(self) -> int:
+        """
+        Return number of major timeouts for all operations
+        """
+        return self.__total__('major_timeouts')
+
+    @property
+    def average_rtt(self) -> Optional[float]:
+        """
+        Return average round trip time in milliseconds for all operations
+        """
+        operations = self.__total__('operations')
+        return self.__total__('rtt') / operations if operations else None
+
+    def is_restarted(self, previous: 'NFSMountStats') -> bool:
+        """
+        Check if the mount was mounted again since previous statistics, resetting counters
+        """
+        if self.age is not None and previous.age is not None and self.age < previous.age:
+            return True
+        return any(
+            counters.operations < previous.operations[name].operations
+            for name, counters in self.operations.items()
+            if name in previous.operations
+        )
+
+
+def __parse_device_line__(line: bytes) -> Optional[NFSMountStats]:
+    """
+    Parse a device line like "device server:/export mounted on /mnt with fstype nfs statvers=1.1"
+    """
+    fields = line.split()
+    try:
+        index = fields.index(b'fstype')
+    except ValueError:
+        return None
+    if index < 6 or fields[2:4] != [b'mounted', b'on']:
+        return None
+    return NFSMountStats(
+        device=decode_path(fields[1].decode('utf-8', 'surrogateescape')),
+        mountpoint=decode_path(b' '.join(fields[4:index - 1]).decode('utf-8', 'surrogateescape')),
+        filesystem=fields[index + 1].decode('utf-8', 'surrogateescape') if index + 1 < len(fields) else '',
+    )
+
+
+def parse_mountstats(lines: Iterable[bytes],
+                     mountpoints: Optional[Collection[str]] = None) -> Iterator[NFSMountStats]:
+    """
+    Parse mountstats lines, yielding statistics for NFS mounts
+
+    If mountpoints is given, only statistics for the mountpoints are parsed
+    """
+    stats = None
+    per_op = False
+    for line in lines:
+        if line.startswith(DEVICE_PREFIX) or line.startswith(NO_DEVICE_PREFIX):
+            if stats is not None:
+                yield stats
+            stats = __parse_device_line__(line) if line.startswith(DEVICE_PREFIX) else None
+            per_op = False
+            if stats is not None and (
+                stats.filesystem not in NFS_FILESYSTEMS or
+                (mountpoints is not None and stats.mountpoint not in mountpoints)
+            ):
+                stats = None
+            continue
+        if stats is None:
+            continue
+
+        line = line.strip()
+        if per_op:
+            name, _separator, values = line.partition(b':')
+            if not values:
+                continue
+            try:
+                counters = [int(value) for value in values.split()]
+            except ValueError:
+                continue
+            if len(counters) >= len(NFS_OPERATION_COUNTERS):
+                name = name.decode('utf-8', 'surrogateescape')
+                stats.operations[name] = NFSOperationCounters(name, counters)
+        elif line.startswith(AGE_PREFIX):
+            value = line[len(AGE_PREFIX):].strip()
+            stats.age = int(value) if value.isdigit() else None
+        elif line.startswith(PER_OP_PREFIX):
+            per_op = True
+    if stats is not None:
+        yield stats
+
+
+class MountStats:
+    """
+    NFS mount statistics from /proc/self/mountstats
+
+    Each call to update() parses statistics and sets differences from the previous update
+    to the delta attribute of the statistics
+    """
+    path: Path
+    stats: Dict[str, NFSMountStats]
+
+    def __init__(self, path: Union[str, Path] = MOUNTSTATS_PATH) -> None:
+        self.path = Path(path)
+        self.stats = {}
+
+    def __repr__(self) -> str:
+        return f'NFS statistics for {len(self.stats)} mountpoints'
+
+    def update(self, mountpoints: Optional[Iterable[Union[str, Any]]] = None) -> Dict[str, NFSMountStats]:
+        """
+        Parse statistics for NFS mounts, optionally limited to mountpoint paths or objects
+        """
+        if mountpoints is not None:
+            mountpoints = {getattr(item, 'mountpoint', item) for item in mountpoints}
+        try:
+            with open(self.path, 'rb') as handle:
+                stats = {item.mountpoint: item for item in parse_mountstats(handle, mountpoints)}
+        except OSError as error:
+            raise FilesystemError(f'Error reading {self.path}: {error}') from error
+        for mountpoint, item in stats.items():
+            previous = self.stats.get(mountpoint, None)
+            if previous is not None and not item.is_restarted(previous):
+                item.delta = item - previous
+        self.stats = stats
+        return stats
+
+    def join(self, mountpoints: Iterable[Any]) -> List[Any]:
+        """
+        Set NFS statistics to the nfs attribute of mountpoints
+
+        Returns mountpoints with NFS statistics. Snapshots are immutable and are returned as
+        new snapshots with the NFS statistics
+        """
+        joined = []
+        for item in mountpoints:
+            stats = self.stats.get(item.mountpoint, None)
+            if isinstance(item, MountpointSnapshot):
+                item = item.replace(nfs=stats)
+            else:
+                item.nfs = stats
+            if stats is not None:
+                joined.append(item)
+        return joined
@@ -0,0 +1,312 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Reconciliation of fstab entries with mounted filesystems
+"""
+import os
+
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from .devices import BlockDevices, encode_udev_name
+from .encoding import decode_path
+from .fstab.platform.base import FstabEntry
+from .mounts.platform.base import Mountpoint
+
+DEV_DISK_PATH = Path('/dev/disk')
+
+# fstab fs_spec prefixes and matching /dev/disk directories
+DEVICE_SPEC_DIRECTORIES = {
+    'UUID=': 'by-uuid',
+    'LABEL=': 'by-label',
+    'PARTUUID=': 'by-partuuid',
+    'PARTLABEL=': 'by-partlabel',
+}
+
+# fstab options which are not visible in mount options
+IGNORED_FSTAB_OPTIONS = (
+    '_netdev',
+    'auto',
+    'bind',
+    'defaults',
+    'group',
+    'loop',
+    'noauto',
+    'nofail',
+    'nouser',
+    'owner',
+    'rbind',
+    'sw',
+    'user',
+    'users',
+)
+IGNORED_FSTAB_OPTION_PREFIXES = (
+    'comment=',
+    'x-',
+)
+READONLY_OPTION = 'ro'
+
+
+class DeviceResolver:
+    """
+    Resolve fstab fs_spec values and device paths to real device paths
+
+    UUID, LABEL, PARTUUID and PARTLABEL values are resolved with /dev/disk/by-* symbolic
+    links, with values escaped as in udev link names. Results are cached in the resolver.
+    """
+    dev_disk_path: Path
+    __cache__: Dict[str, Optional[str]]
+
+    def __init__(self, dev_disk_path: Path = DEV_DISK_PATH) -> None:
+        self.dev_disk_path = Path(dev_disk_path)
+        self.__cache__ = {}
+
+    def __resolve_path__(self, path: str) -> Optional[str]:
+        """
+        Resolve a device path, returning None for missing paths
+        """
+        return os.path.realpath(path) if os.path.exists(path) else None
+
+    def resolve(self, spec: str) -> Optional[str]:
+        """
+        Resolve a fs_spec value or device path to device path. Returns None if the value
+        can't be resolved
+        """
+        if spec not in self.__cache__:
+            value = None
+            for prefix, directory in DEVICE_SPEC_DIRECTORIES.items():
+                if spec[:len(prefix)].upper() == prefix:
+                    name = encode_udev_name(spec[len(prefix):])
+                    value = self.__resolve_path__(str(self.dev_disk_path.joinpath(directory, name)))
+                    break
+            else:
+                if spec.startswith('/'):
+                    value = self.__resolve_path__(spec)
+            self.__cache__[spec] = value
+        return self.__cache__[spec]
+
+    def normalize(self, device: str) -> str:
+        """
+        Normalize a device name or path for comparison
+        """
+        return (self.resolve(device) or device) if device.startswith('/') else device
+
+
+# pylint: disable=too-few-public-methods
+class Drift:
+    """
+    Difference between a fstab entry and mounted filesystems
+    """
+    kind: str = None
+    entry: Optional[FstabEntry]
+    mountpoint: Optional[Mountpoint]
+
+    def __init__(self, entry: Optional[FstabEntry], mountpoint: Optional[Mountpoint]) -> None:
+        self.entry = entry
+        self.mountpoint = mountpoint
+
+    def __repr__(self) -> str:
+        path = self.entry.mountpoint if self.entry is not None else self.mountpoint.mountpoint
+        return f'{self.kind} {path}'
+
+
+# pylint: disable=too-few-public-methods
+class NotMountedDrift(Drift):
+    """
+    Fstab entry which is not mounted
+    """
+    kind = 'not-mounted'
+
+
+# pylint: disable=too-few-public-methods
+class NotInFstabDrift(Drift):
+    """
+    Mounted filesystem without a fstab entry
+    """
+    kind = 'not-in-fstab'
+
+
+# pylint: disable=too-few-public-methods
+class MountpointDrift(Drift):
+    """
+    Fstab entry device which is mounted on a different mountpoint
+    """
+    kind = 'mountpoint'
+
+
+# pylint: disable=too-few-public-methods
+class DeviceDrift(Drift):
+    """
+    Fstab entry mountpoint with a different device mounted
+    """
+    kind = 'device'
+    expected: str
+
+    def __init__(self, entry: FstabEntry, mountpoint: Mountpoint, expected: str) -> None:
+        super().__init__(entry, mountpoint)
+        self.expected = expected
+
+
+# pylint: disable=too-few-public-methods
+class OptionsDrift(Drift):
+    """
+    Fstab entry mounted with different options
+    """
+    kind = 'options'
+    missing: List[str]
+    unexpected: List[str]
+
+    def __init__(self,
+                 entry: FstabEntry,
+                 mountpoint: Mountpoint,
+                 missing: List[str],
+                 unexpected: List[str]) -> None:
+        super().__init__(entry, mountpoint)
+        self.missing = missing
+        self.unexpected = unexpected
+
+
+class Reconciliation:
+    """
+    Reconciliation of fstab entries with mounted filesystems
+
+    Fstab entries and mountpoints are joined with hash indexes by decoded mountpoint path
+    and by resolved device path, including devices referred with UUID, LABEL, PARTUUID
+    and PARTLABEL in fstab. Devices are resolved with /dev/disk/by-* links by default,
+    or with a BlockDevices inventory given as resolver. Entries with noauto option and
+    virtual filesystem mounts without fstab entries are not reported unless requested.
+    """
+    drifts: List[Drift]
+    resolver: Union[DeviceResolver, BlockDevices]
+
+    # pylint: disable=too-many-arguments
+    def __init__(self,
+                 fstab: Iterable[FstabEntry],
+                 mountpoints: Iterable[Mountpoint],
+                 resolver: Optional[Union[DeviceResolver, BlockDevices]] = None,
+                 *,
+                 include_noauto: bool = False,
+                 include_virtual: bool = False) -> None:
+        self.resolver = resolver if resolver is not None else DeviceResolver()
+        self.include_noauto = include_noauto
+        self.include_virtual = include_virtual
+        self.drifts = []
+        self.__reconcile__(list(fstab), list(mountpoints))
+
+    def __repr__(self) -> str:
+        return f'{len(self.drifts)} differences between fstab and mounts'
+
+    def __get_entry_device__(self, entry: FstabEntry) -> Optional[str]:
+        """
+        Return expected device for fstab entry or None if the device is not known
+
+        Escaped fs_spec values are decoded before resolving the device
+        """
+        if entry.device is not None:
+            return self.resolver.normalize(str(entry.device))
+        if '=' in entry.fs_spec:
+            return self.resolver.resolve(decode_path(entry.fs_spec))
+        if ':' in entry.fs_spec:
+            return entry.fs_spec
+        return None
+
+    def __get_options_drift__(self, entry: FstabEntry, mountpoint: Mountpoint) -> Optional[OptionsDrift]:
+        """
+        Compare fstab entry options to mounted filesystem options
+        """
+        mounted = list(mountpoint.options)
+        mounted_names = {option.split('=', 1)[0] for option in mounted}
+        missing = []
+        for option in entry.options:
+            if option in IGNORED_FSTAB_OPTIONS or option.startswith(IGNORED_FSTAB_OPTION_PREFIXES):
+                continue
+            if option not in mounted and option.split('=', 1)[0] not in mounted_names:
+                missing.append(option)
+        unexpected = []
+        if READONLY_OPTION in mounted and READONLY_OPTION not in entry.options:
+            unexpected.append(READONLY_OPTION)
+        if missing or unexpected:
+            return OptionsDrift(entry, mountpoint, missing, unexpected)
+        return None
+
+    def __reconcile__(self, entries: List[FstabEntry], mountpoints: List[Mountpoint]) -> None:
+        """
+        Join fstab entries to mountpoints and collect differences
+        """
+        by_path = {}
+        by_device = {}
+        for mountpoint in mountpoints:
+            by_path[Path(mountpoint.mountpoint)] = mountpoint
+            by_device.setdefault(self.resolver.normalize(mountpoint.device), []).append(mountpoint)
+
+        matched = set()
+        for entry in entries:
+            if entry.mountpoint is None:
+                continue
+            device = self.__get_entry_device__(entry)
+            mountpoint = by_path.get(entry.mountpoint, None)
+            if mountpoint is None:
+                mounted = by_device.get(device, None) if device is not None else None
+                if mounted:
+                    matched.update(id(item) for item in mounted)
+                    self.drifts.append(MountpointDrift(entry, mounted[-1]))
+                elif self.include_noauto or 'noauto' not in entry.options:
+                    self.drifts.append(NotMountedDrift(entry, None))
+                continue
+
+            matched.add(id(mountpoint))
+            if device is not None and device != self.resolver.normalize(mountpoint.device):
+                self.drifts.append(DeviceDrift(entry, mountpoint, device))
+            options_drift = self.__get_options_drift__(entry, mountpoint)
+            if options_drift is not None:
+                self.drifts.append(options_drift)
+
+        for mountpoint in mountpoints:
+            if id(mountpoint) in matched or by_path[Path(mountpoint.mountpoint)] is not mountpoint:
+                continue
+            if self.include_virtual or not mountpoint.is_virtual:
+                self.drifts.append(NotInFstabDrift(None, mountpoint))
+
+    def __filter_drifts__(self, drift_class: type) -> List[Drift]:
+        """
+        Return drifts of specified type
+        """
+        return [drift for drift in self.drifts if isinstance(drift, drift_class)]
+
+    @property
+    def not_mounted(self) -> List[NotMountedDrift]:
+        """
+        Return fstab entries which are not mounted
+        """
+        return self.__filter_drifts__(NotMountedDrift)
+
+    @property
+    def not_in_fstab(self) -> List[NotInFstabDrift]:
+        """
+        Return mounts without fstab entries
+        """
+        return self.__filter_drifts__(NotInFstabDrift)
+
+    @property
+    def moved(self) -> List[MountpointDrift]:
+        """
+        Return fstab entries with the device mounted on a different mountpoint
+        """
+        return self.__filter_drifts__(MountpointDrift)
+
+    @property
+    def device_changed(self) -> List[DeviceDrift]:
+        """
+        Return fstab entries with a different device mounted on the mountpoint
+        """
+        return self.__filter_drifts__(DeviceDrift)
+
+    @property
+    def options_changed(self) -> List[OptionsDrift]:
+        """
+        Return fstab entries mounted with different options
+        """
+        return self.__filter_drifts__(OptionsDrift)
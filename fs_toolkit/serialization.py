@@ -0,0 +1,520 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Binary snapshot files for mountpoints and fstab
+
+Snapshot files start with a fixed header, followed by a string table and record columns.
+All values are little endian.
+
+Header: magic, format version, snapshot kind, platform and source string indexes, string
+count, record count and creation time as struct SNAPSHOT_HEADER.
+
+String table: string count + 1 uint32 offsets to the UTF-8 string data which follows the
+offsets. Devices, filesystem types, option strings and other repeated values are stored
+only once.
+
+Record columns: uint32 string index columns followed by int64 numeric columns, each with
+one value per record. Missing strings are stored as NONE_INDEX and missing numbers as -1.
+Sections are aligned to 8 bytes. Mountpoint numeric columns are flags followed by the
+snapshot usage attributes, including inode counters since format version 2.
+
+Snapshot files are loaded with mmap and record columns are read directly from the mapped
+file without copying.
+"""
+import json
+import mmap
+import struct
+import sys
+import time
+
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from .exceptions import FilesystemError
+from .fstab.loader import Fstab, FSTAB_PLATFORM_CLASSES
+from .fstab.platform.base import FstabEntry, FstabItem
+from .mounts.snapshot import MountpointSnapshot, MountpointsSnapshot, USAGE_ATTRIBUTES
+
+SNAPSHOT_MAGIC = b'FSTK'
+SNAPSHOT_VERSION = 2
+SNAPSHOT_HEADER = struct.Struct('<4sHHIIIId')
+
+SNAPSHOT_KIND_MOUNTPOINTS = 1
+SNAPSHOT_KIND_FSTAB = 2
+
+NONE_INDEX = 0xffffffff
+NONE_VALUE = -1
+
+MOUNTPOINT_STRING_COLUMNS = ('device', 'mountpoint', 'filesystem', 'options')
+MOUNTPOINT_INT_COLUMNS = ('flags', *USAGE_ATTRIBUTES)
+FSTAB_STRING_COLUMNS = ('line', 'fs_spec', 'fs_file', 'fs_vfstype', 'fs_mntops')
+FSTAB_INT_COLUMNS = ('fs_freq', 'fs_passno')
+
+FLAG_VIRTUAL = 0x1
+
+SNAPSHOT_COLUMNS = {
+    SNAPSHOT_KIND_MOUNTPOINTS: (MOUNTPOINT_STRING_COLUMNS, MOUNTPOINT_INT_COLUMNS),
+    SNAPSHOT_KIND_FSTAB: (FSTAB_STRING_COLUMNS, FSTAB_INT_COLUMNS),
+}
+
+
+def __align__(offset: int) -> int:
+    """
+    Return offset aligned to 8 bytes
+    """
+    return (offset + 7) & ~7
+
+
+def __encode_column__(typecode: str, values: Iterable[int]) -> bytes:
+    """
+    Encode a column of integers as little endian bytes
+    """
+    column = array(typecode, values)
+    if sys.byteorder != 'little':
+        column.byteswap()
+    return column.tobytes()
+
+
+class StringTable:
+    """
+    Table of interned strings for writing snapshot files
+    """
+    strings: List[str]
+    __indexes__: Dict[str, int]
+
+    def __init__(self) -> None:
+        self.strings = []
+        self.__indexes__ = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def add(self, value: Optional[Any]) -> int:
+        """
+        Add a string to the table and return the string index
+        """
+        if value is None:
+            return NONE_INDEX
+        value = str(value)
+        index = self.__indexes__.get(value, None)
+        if index is None:
+            index = self.__indexes__[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def encode(self) -> bytes:
+        """
+        Encode string table offsets and string data
+        """
+        data = [value.encode('utf-8', 'surrogateescape') for value in self.strings]
+        offsets = [0]
+        for value in data:
+            offsets.append(offsets[-1] + len(value))
+        return __encode_column__('I', offsets) + b''.join(data)
+
+
+def __encode_snapshot__(kind: int,
+                        platform: str,
+                        source: Optional[str],
+                        created: float,
+                        records: List[Tuple[Tuple[Optional[str], ...], Tuple[Optional[int], ...]]]) -> bytes:
+    """
+    Encode records with string and integer values to snapshot file data
+    """
+    strings = StringTable()
+    platform_index = strings.add(platform)
+    source_index = strings.add(source)
+    string_columns, int_columns = SNAPSHOT_COLUMNS[kind]
+    indexes = [[strings.add(values[index]) for values, _numbers in records] for index in range(len(string_columns))]
+    numbers = [
+        [NONE_VALUE if numbers[index] is None else numbers[index] for _values, numbers in records]
+        for index in range(len(int_columns))
+    ]
+
+    sections = [
+        SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, kind, platform_index, source_index,
+            len(strings), len(records), created
+        ),
+        strings.encode(),
+        b''.join(__encode_column__('I', column) for column in indexes),
+        b''.join(__encode_column__('q', column) for column in numbers),
+    ]
+    data = bytearray()
+    for section in sections:
+        data.extend(b'\0' * (__align__(len(data)) - len(data)))
+        data.extend(section)
+    return bytes(data)
+
+
+def __get_mountpoints_snapshot__(mountpoints: Any) -> MountpointsSnapshot:
+    """
+    Return snapshot for Mountpoints or mountpoint snapshots
+    """
+    if isinstance(mountpoints, MountpointsSnapshot):
+        return mountpoints
+    if isinstance(mountpoints, MountpointsSnapshotFile):
+        return mountpoints.snapshot()
+    if hasattr(mountpoints, 'snapshot'):
+        return mountpoints.snapshot()
+    raise FilesystemError(f'Unexpected object for mountpoints snapshot: {type(mountpoints)}')
+
+
+def __encode_mountpoints__(mountpoints: Any) -> bytes:
+    """
+    Encode mountpoints snapshot file data
+    """
+    snapshot = __get_mountpoints_snapshot__(mountpoints)
+    records = [
+        (
+            (item.device, item.mountpoint, item.filesystem, ','.join(item.options)),
+            (FLAG_VIRTUAL if item.is_virtual else 0, *(getattr(item, attr) for attr in USAGE_ATTRIBUTES)),
+        )
+        for item in snapshot
+    ]
+    return __encode_snapshot__(SNAPSHOT_KIND_MOUNTPOINTS, snapshot.platform, None, snapshot.created, records)
+
+
+def __encode_fstab__(fstab: Fstab) -> bytes:
+    """
+    Encode fstab snapshot file data
+    """
+    if fstab.__requires_reload__:
+        fstab.update()
+    records = []
+    for item in fstab.__lines__:
+        if isinstance(item, FstabEntry):
+            records.append((
+                (item.__line__, item.fs_spec, item.fs_file, item.fs_vfstype, item.fs_mntops),
+                (item.fs_freq, item.fs_passno),
+            ))
+        else:
+            records.append(((item.__line__, None, None, None, None), (None, None)))
+    return __encode_snapshot__(SNAPSHOT_KIND_FSTAB, fstab.__platform__, str(fstab.path), time.time(), records)
+
+
+def dumps(value: Any) -> bytes:
+    """
+    Return binary snapshot data for Mountpoints, mountpoints snapshot or Fstab
+    """
+    if isinstance(value, (Fstab, FstabSnapshotFile)):
+        return __encode_fstab__(value) if isinstance(value, Fstab) else value.data
+    return __encode_mountpoints__(value)
+
+
+def dump(value: Any, path: Union[str, Path]) -> None:
+    """
+    Write binary snapshot file for Mountpoints, mountpoints snapshot or Fstab
+    """
+    try:
+        Path(path).write_bytes(dumps(value))
+    except OSError as error:
+        raise FilesystemError(f'Error writing snapshot {path}: {error}') from error
+
+
+class SnapshotFile(Sequence):
+    """
+    Snapshot file loaded with mmap
+
+    Strings are decoded when accessed and record columns are memoryviews to the mapped
+    file. The file is unmapped with close() or when used as context manager.
+    """
+    kind: int = None
+    path: Path
+    version: int
+    platform: str
+    source: Optional[str]
+    created: float
+    __mmap__: Optional[mmap.mmap]
+    __buffer__: memoryview
+    __views__: List[memoryview]
+    __string_offsets__: Union[memoryview, array]
+    __string_data_offset__: int
+    __strings__: Dict[int, str]
+    __columns__: Dict[str, Union[memoryview, array]]
+    __record_count__: int
+
+    def __init__(self, path: Union[str, Path], handle: mmap.mmap) -> None:
+        self.path = Path(path)
+        self.__mmap__ = handle
+        self.__buffer__ = memoryview(handle)
+        self.__views__ = [self.__buffer__]
+        self.__strings__ = {}
+        self.__columns__ = {}
+        try:
+            self.__parse__()
+        except FilesystemError:
+            self.close()
+            raise
+
+    def __repr__(self) -> str:
+        return f'{self.platform} snapshot {self.path}'
+
+    def __enter__(self) -> 'SnapshotFile':
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.__record_count__
+
+    def __getitem__(self, index: int) -> Any:
+        if isinstance(index, slice):
+            return [self.__get_record__(item) for item in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError(f'Snapshot record index out of range: {index}')
+        return self.__get_record__(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        for index in range(len(self)):
+            yield self.__get_record__(index)
+
+    def __get_record__(self, index: int) -> Any:
+        """
+        Return record by index
+        """
+        raise NotImplementedError
+
+    def __get_view__(self, offset: int, count: int, typecode: str) -> Union[memoryview, array]:
+        """
+        Return a typed view of a column in the mapped file. The data is copied only on big
+        endian systems
+        """
+        size = array(typecode).itemsize
+        if offset + count * size > len(self.__buffer__):
+            raise FilesystemError(f'Truncated snapshot file {self.path}')
+        if sys.byteorder != 'little':
+            column = array(typecode, self.__buffer__[offset:offset + count * size].tobytes())
+            column.byteswap()
+            return column
+        view = self.__buffer__[offset:offset + count * size].cast('B').cast(typecode)
+        self.__views__.append(view)
+        return view
+
+    def __parse__(self) -> None:
+        """
+        Parse header, string table and column offsets
+        """
+        if len(self.__buffer__) < SNAPSHOT_HEADER.size:
+            raise FilesystemError(f'Truncated snapshot file {self.path}')
+        magic, version, kind, platform, source, string_count, record_count, created = SNAPSHOT_HEADER.unpack_from(
+            self.__buffer__, 0
+        )
+        if magic != SNAPSHOT_MAGIC:
+            raise FilesystemError(f'Not a snapshot file: {self.path}')
+        if version != SNAPSHOT_VERSION:
+            raise FilesystemError(f'Unsupported snapshot version {version} in {self.path}')
+        if kind != self.kind:
+            raise FilesystemError(f'Unexpected snapshot kind {kind} in {self.path}')
+        self.version = version
+        self.created = created
+        self.__record_count__ = record_count
+
+        offset = __align__(SNAPSHOT_HEADER.size)
+        self.__string_offsets__ = self.__get_view__(offset, string_count + 1, 'I')
+        self.__string_data_offset__ = offset + (string_count + 1) * 4
+        offset = __align__(self.__string_data_offset__ + self.__string_offsets__[string_count])
+
+        string_columns, int_columns = SNAPSHOT_COLUMNS[kind]
+        for name in string_columns:
+            self.__columns__[name] = self.__get_view__(offset, record_count, 'I')
+            offset += record_count * 4
+        offset = __align__(offset)
+        for name in int_columns:
+            self.__columns__[name] = self.__get_view__(offset, record_count, 'q')
+            offset += record_count * 8
+
+        self.platform = self.__get_string__(platform)
+        self.source = self.__get_string__(source)
+
+    def __get_string__(self, index: int) -> Optional[str]:
+        """
+        Return string from string table by index
+        """
+        if index == NONE_INDEX:
+            return None
+        value = self.__strings__.get(index, None)
+        if value is None:
+            start = self.__string_data_offset__ + self.__string_offsets__[index]
+            end = self.__string_data_offset__ + self.__string_offsets__[index + 1]
+            value = self.__strings__[index] = sys.intern(
+                str(self.__buffer__[start:end], 'utf-8', 'surrogateescape')
+            )
+        return value
+
+    def __get_value__(self, column: str, index: int) -> Optional[int]:
+        """
+        Return a numeric column value by record index
+        """
+        value = self.__columns__[column][index]
+        return None if value == NONE_VALUE else value
+
+    @property
+    def data(self) -> bytes:
+        """
+        Return snapshot file data
+        """
+        return self.__buffer__.tobytes()
+
+    def column(self, name: str) -> Union[memoryview, array]:
+        """
+        Return a record column by name. Numeric columns use -1 for missing values and
+        string columns contain string table indexes
+        """
+        try:
+            return self.__columns__[name]
+        except KeyError as error:
+            raise FilesystemError(f'Unknown snapshot column: {name}') from error
+
+    def close(self) -> None:
+        """
+        Release column views and unmap the snapshot file
+        """
+        if self.__mmap__ is None:
+            return
+        self.__columns__ = {}
+        self.__string_offsets__ = array('I')
+        for view in reversed(self.__views__):
+            view.release()
+        self.__views__ = []
+        self.__mmap__.close()
+        self.__mmap__ = None
+
+
+class MountpointsSnapshotFile(SnapshotFile):
+    """
+    Mountpoints snapshot file, returning MountpointSnapshot records
+    """
+    kind = SNAPSHOT_KIND_MOUNTPOINTS
+
+    def __get_record__(self, index: int) -> MountpointSnapshot:
+        columns = self.__columns__
+        options = self.__get_string__(columns['options'][index])
+        return MountpointSnapshot(
+            self.__get_string__(columns['device'][index]),
+            self.__get_string__(columns['mountpoint'][index]),
+            self.__get_string__(columns['filesystem'][index]),
+            options.split(',') if options else (),
+            is_virtual=bool(columns['flags'][index] & FLAG_VIRTUAL),
+            **{attr: self.__get_value__(attr, index) for attr in USAGE_ATTRIBUTES}
+        )
+
+    def snapshot(self) -> MountpointsSnapshot:
+        """
+        Return the records as MountpointsSnapshot
+        """
+        return MountpointsSnapshot(self.platform, self, created=self.created)
+
+
+class FstabSnapshotFile(SnapshotFile):
+    """
+    Fstab snapshot file, returning platform specific fstab entry and comment records
+    """
+    kind = SNAPSHOT_KIND_FSTAB
+
+    def __get_record__(self, index: int) -> FstabItem:
+        line = self.__get_string__(self.__columns__['line'][index])
+        entry_class, comment_class = FSTAB_PLATFORM_CLASSES[self.platform]
+        item = entry_class(line) if self.__columns__['fs_spec'][index] != NONE_INDEX else comment_class(line)
+        item.source = Path(self.source) if self.source is not None else None
+        return item
+
+    @property
+    def entries(self) -> List[FstabEntry]:
+        """
+        Return fstab entries without comments
+        """
+        column = self.__columns__['fs_spec']
+        return [self.__get_record__(index) for index in range(len(self)) if column[index] != NONE_INDEX]
+
+
+SNAPSHOT_FILE_CLASSES = {
+    SNAPSHOT_KIND_MOUNTPOINTS: MountpointsSnapshotFile,
+    SNAPSHOT_KIND_FSTAB: FstabSnapshotFile,
+}
+
+
+def load(path: Union[str, Path]) -> SnapshotFile:
+    """
+    Load a snapshot file with mmap
+    """
+    try:
+        with open(path, 'rb') as handle:
+            mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as error:
+        raise FilesystemError(f'Error loading snapshot {path}: {error}') from error
+    kind = SNAPSHOT_HEADER.unpack_from(mapped, 0)[2] if len(mapped) >= SNAPSHOT_HEADER.size else None
+    if kind not in SNAPSHOT_FILE_CLASSES:
+        mapped.close()
+        raise FilesystemError(f'Invalid snapshot file {path}')
+    return SNAPSHOT_FILE_CLASSES[kind](path, mapped)
+
+
+def __get_json_data__(value: Any) -> Dict[str, Any]:
+    """
+    Return snapshot data as JSON compatible dictionary
+    """
+    if isinstance(value, (Fstab, FstabSnapshotFile)):
+        if isinstance(value, Fstab):
+            if value.__requires_reload__:
+                value.update()
+            lines = value.__lines__
+            source = str(value.path)
+            platform = value.__platform__
+        else:
+            lines = list(value)
+            source = value.source
+            platform = value.platform
+        return {
+            'version': SNAPSHOT_VERSION,
+            'kind': 'fstab',
+            'platform': platform,
+            'source': source,
+            'lines': [
+                {
+                    'line': item.__line__,
+                    **({
+                        'fs_spec': item.fs_spec,
+                        'fs_file': item.fs_file,
+                        'fs_vfstype': item.fs_vfstype,
+                        'fs_mntops': item.fs_mntops,
+                        'fs_freq': item.fs_freq,
+                        'fs_passno': item.fs_passno,
+                    } if isinstance(item, FstabEntry) else {})
+                }
+                for item in lines
+            ],
+        }
+    snapshot = __get_mountpoints_snapshot__(value)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'kind': 'mountpoints',
+        'platform': snapshot.platform,
+        'created': snapshot.created,
+        'mountpoints': [
+            {
+                'device': item.device,
+                'mountpoint': item.mountpoint,
+                'filesystem': item.filesystem,
+                'options': list(item.options),
+                'is_virtual': item.is_virtual,
+                **{attr: getattr(item, attr) for attr in USAGE_ATTRIBUTES},
+            }
+            for item in snapshot
+        ],
+    }
+
+
+def export_json(value: Any, indent: Optional[int] = None) -> str:
+    """
+    Export Mountpoints, Fstab or snapshot data as JSON string
+    """
+    return json.dumps(__get_json_data__(value), indent=indent)
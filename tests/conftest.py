@@ -6,6 +6,8 @@
 """
 Unit tests configuration for fs_toolkit module
 """
+import os
+
 from pathlib import Path
 from typing import Any, Dict, Iterator, List, Union
 
@@ -13,6 +15,7 @@ import pytest
 
 from sys_toolkit.tests.mock import MockCalledMethod
 
+from fs_toolkit.devices import BlockDevices
 from fs_toolkit.fstab import Fstab
 from fs_toolkit.mounts import Mountpoints
 
@@ -50,6 +53,52 @@ MOCK_VARIANTS_OPENBSD = (
 UNEXPECTED_PLATFORM = 'windows'
 UNEXPECTED_TOOLCHAIN = 'other'
 
+# Processes in mocked procfs with mount namespace and mountinfo file
+MOCK_PROCFS_HOST_NAMESPACE = 4026531840
+MOCK_PROCFS_CONTAINER_NAMESPACE = 4026532500
+MOCK_PROCFS_PROCESSES = {
+    1: (MOCK_PROCFS_HOST_NAMESPACE, 'linux/mountinfo'),
+    200: (MOCK_PROCFS_HOST_NAMESPACE, 'linux/mountinfo'),
+    # Process exited while loading, other process in the namespace is used
+    300: (MOCK_PROCFS_CONTAINER_NAMESPACE, None),
+    301: (MOCK_PROCFS_CONTAINER_NAMESPACE, 'linux/mountinfo_container'),
+    302: (MOCK_PROCFS_CONTAINER_NAMESPACE, 'linux/mountinfo_container'),
+    # Process without access to the namespace
+    400: (None, None),
+}
+
+MOCK_SYSFS_DEVICES = {
+    'sda': {'dev': '8:0', 'size': '4194304'},
+    'sda1': {'dev': '8:1', 'size': '1048576'},
+    'sda2': {'dev': '8:2', 'size': '3145728'},
+    'dm-0': {'dev': '253:0', 'size': '2097152', 'dm/name': 'buster--vg-root'},
+    'sr0': {'dev': '11:0'},
+}
+MOCK_DEV_DISK_LINKS = {
+    'by-uuid/0EDC-E243': 'sda1',
+    'by-uuid/38D9E384-3C40-4A46-8B12-561DF4F5312A': 'dm-0',
+    'by-label/MyRootPartition': 'dm-0',
+    'by-label/My\\x20Data': 'sda2',
+    'by-partuuid/7d1c4c5a-01': 'sda1',
+    'by-partlabel/EFI\\x20System': 'sda1',
+    'by-label/missing': 'sdx',
+}
+
+# Inode counters (files, free, available) returned by mocked statvfs calls
+MOCK_STATVFS_INODES = (1000, 250, 200)
+MOCK_STATVFS_NO_INODES = ('/boot/efi',)
+MOCK_STATVFS_ERRORS = ('/work',)
+
+
+def mock_statvfs(path: Union[str, Path]) -> os.statvfs_result:
+    """
+    Mock statvfs results for mountpoints
+    """
+    if str(path) in MOCK_STATVFS_ERRORS:
+        raise OSError(f'Stale file handle: {path}')
+    files, free, available = (0, 0, 0) if str(path) in MOCK_STATVFS_NO_INODES else MOCK_STATVFS_INODES
+    return os.statvfs_result((4096, 4096, 1000, 500, 400, files, free, available, 0, 255))
+
 
 # pylint: disable=too-few-public-methods
 class LoadMockData(MockCalledMethod):
@@ -75,8 +124,9 @@ class LoadMockData(MockCalledMethod):
 
 def mock_openbsd_duidmap(monkeypatch):
     """
-    Mock reading of the OpenBSD DUID map sysctl
+    Mock reading of the OpenBSD DUID map sysctl and reset the shared DUID map
     """
+    monkeypatch.setattr('fs_toolkit.fstab.platform.openbsd.DUID_MAP', None)
     monkeypatch.setattr(
         'fs_toolkit.fstab.platform.openbsd.DuidMap.__get_sysctl_output__',
         LoadMockData('openbsd', 'openbsd7/sysctl.hw.disknames')
@@ -113,6 +163,7 @@ def mock_data_loaders(monkeypatch, platform: str, environment: str) -> None:
         'fs_toolkit.mounts.loader.Mountpoints.__get_df_lines__',
         LoadMockData(platform, f'{environment}/df')
     )
+    monkeypatch.setattr('fs_toolkit.mounts.platform.linux.os.statvfs', mock_statvfs)
 
 
 def mock_environment_fstab(monkeypatch, platform: str, environment: str) -> Fstab:
@@ -248,3 +299,45 @@ def unexpected_toolchain(monkeypatch) -> None:
         'fs_toolkit.base.detect_toolchain_family',
         MockCalledMethod(return_value=UNEXPECTED_TOOLCHAIN)
     )
+
+
+@pytest.fixture
+def block_devices(tmp_path) -> Iterator[BlockDevices]:
+    """
+    Mock block devices with fake sysfs and /dev trees
+    """
+    sys_path = tmp_path.joinpath('sys')
+    dev_path = tmp_path.joinpath('dev')
+    for name, attributes in MOCK_SYSFS_DEVICES.items():
+        for attr, value in attributes.items():
+            path = sys_path.joinpath('class/block', name, attr)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f'{value}\n', encoding='utf-8')
+    for link, name in MOCK_DEV_DISK_LINKS.items():
+        path = dev_path.joinpath('disk', link)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.symlink_to(f'../../{name}')
+    dev_path.joinpath('sda2').touch()
+    dev_path.joinpath('data').symlink_to('sda2')
+    yield BlockDevices(dev_path=dev_path, sys_path=sys_path)
+
+
+@pytest.fixture
+def mock_procfs(monkeypatch, tmp_path) -> Iterator[Path]:
+    """
+    Mock procfs with processes in mount namespaces on Linux
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    monkeypatch.setattr('fs_toolkit.mounts.platform.linux.os.statvfs', mock_statvfs)
+    proc_path = tmp_path.joinpath('proc')
+    for pid, (namespace, mountinfo) in MOCK_PROCFS_PROCESSES.items():
+        path = proc_path.joinpath(str(pid))
+        path.joinpath('ns').mkdir(parents=True)
+        path.joinpath('root').mkdir()
+        if namespace is not None:
+            path.joinpath('ns/mnt').symlink_to(f'mnt:[{namespace}]')
+        if mountinfo is not None:
+            path.joinpath('mountinfo').write_bytes(MOCK_DATA.joinpath(mountinfo).read_bytes())
+    proc_path.joinpath('self').symlink_to('1')
+    proc_path.joinpath('meminfo').touch()
+    yield proc_path
@@ -6,6 +6,8 @@
 """
 Unit tests for fs_toolkit.fstab module with Linux data
 """
+from pathlib import Path
+
 from .validators import validate_fstab
 
 # Trivial cases, the linux way with spaces and tabs in mountpoint
@@ -50,9 +52,21 @@ def test_linux_fstab_get_by_mountpoint_encoded(fstab_encoded_paths) -> None:
     tabbed = fstab_encoded_paths[1]
     for item in fstab_encoded_paths:
         print(f'{item} {item.mountpoint}')
+    assert spaced.mountpoint == Path(FSTAB_SPACED_MOUNTPOINT)
+    assert tabbed.mountpoint == Path(FSTAB_TABBED_MOUNTPOINT)
     item = fstab_encoded_paths.get_by_mountpoint(FSTAB_SPACED_MOUNTPOINT)
     assert item is not None
     assert item == spaced
     item = fstab_encoded_paths.get_by_mountpoint(FSTAB_TABBED_MOUNTPOINT)
     assert item is not None
     assert item == tabbed
+
+
+def test_linux_fstab_get_by_label_value(linux_fstab) -> None:
+    """
+    Test looking up fstab entry by LABEL= value
+    """
+    for item in linux_fstab:
+        if item.fs_spec.upper().startswith('LABEL='):
+            assert item.label == item.fs_spec[6:]
+            assert linux_fstab.get_by_label(item.label) == item
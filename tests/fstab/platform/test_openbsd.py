@@ -11,7 +11,7 @@ from typing import Tuple
 
 from sys_toolkit.tests.mock import MockRun
 
-from fs_toolkit.fstab.platform.openbsd import DuidMap
+from fs_toolkit.fstab.platform.openbsd import DuidMap, OpenBSDFstabEntry, get_duid_map
 
 from ...conftest import MOCK_DATA
 from .validators import validate_fstab
@@ -22,6 +22,7 @@ MOCK_DUID_MAP_ITEM_COUNT = 3
 INVALID_DUID = '12345567812345678'
 VALID_DUID = '149427019F845CBB'
 VALID_DUID_DEVICE = Path('/dev/sd1')
+ROOT_DUID_DEVICE = Path('/dev/sd0a')
 
 
 # pylint:disable=too-few-public-methods
@@ -87,3 +88,67 @@ def test_openbsd_fstab_properties(openbsd_fstab) -> None:
     Test properties of a OpenBSD fstab object
     """
     validate_fstab(openbsd_fstab)
+
+
+def test_duidmap_reverse_index(openbsd_fstab) -> None:
+    """
+    Test DUID map reverse index is updated when items are changed
+    """
+    obj = DuidMap()
+    assert obj.get_duid('/dev/sd1') == VALID_DUID
+    assert obj.get_duid('cd0') is None
+    assert obj.get_device(VALID_DUID.lower()) == VALID_DUID_DEVICE
+
+    obj['sd2'] = VALID_DUID
+    assert obj.get_device(VALID_DUID) == Path('/dev/sd2')
+    obj['sd2'] = INVALID_DUID
+    assert obj.get_device(VALID_DUID) is None
+    del obj['sd2']
+    assert obj.get_device(INVALID_DUID) is None
+
+
+def test_duidmap_shared(monkeypatch) -> None:
+    """
+    Test shared DUID map is loaded once unless refreshed
+    """
+    mock_method = MockRunDuiDCommands()
+    monkeypatch.setattr('fs_toolkit.fstab.platform.openbsd.run_command', mock_method)
+    monkeypatch.setattr('fs_toolkit.fstab.platform.openbsd.DUID_MAP', None)
+    duid_map = get_duid_map()
+    assert get_duid_map() is duid_map
+    assert mock_method.call_count == 1
+    assert get_duid_map(refresh=True) is duid_map
+    assert mock_method.call_count == 2
+
+
+def test_openbsd_fstab_duid_device_refresh(monkeypatch) -> None:
+    """
+    Test devices of OpenBSD fstab entries follow refreshes of the shared DUID map
+    """
+    mock_method = MockRunDuiDCommands()
+    monkeypatch.setattr('fs_toolkit.fstab.platform.openbsd.run_command', mock_method)
+    monkeypatch.setattr('fs_toolkit.fstab.platform.openbsd.DUID_MAP', None)
+    entry = OpenBSDFstabEntry(f'{VALID_DUID}.e /mnt ffs rw 1 2')
+    assert entry.device == Path(f'{VALID_DUID_DEVICE}e')
+
+    mock_method.duid_data = f'sd0:8FEC6205A1D4449C,sd3:{VALID_DUID}'.encode('utf-8')
+    get_duid_map(refresh=True)
+    assert entry.device == Path('/dev/sd3e')
+    mock_method.duid_data = b'sd0:8FEC6205A1D4449C'
+    get_duid_map(refresh=True)
+    assert entry.device is None
+
+
+def test_openbsd_fstab_duid_device(openbsd_fstab) -> None:
+    """
+    Test resolving devices for OpenBSD fstab entries with DUIDs
+    """
+    entry = openbsd_fstab.get_by_device(ROOT_DUID_DEVICE)
+    assert entry is not None
+    assert entry.mountpoint == Path('/')
+    assert entry.duid == '8FEC6205A1D4449C'
+    assert entry.device == ROOT_DUID_DEVICE
+
+    assert OpenBSDFstabEntry('/dev/sd2a /mnt ffs rw 1 2').device == Path('/dev/sd2a')
+    assert OpenBSDFstabEntry('/dev/sd2a /mnt ffs rw 1 2').duid is None
+    assert OpenBSDFstabEntry(f'{INVALID_DUID[:16]}.a /mnt ffs rw 1 2').device is None
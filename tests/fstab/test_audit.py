@@ -0,0 +1,94 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.fstab.audit module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.fstab.audit import audit_fstab_file, audit_fstab_files, audit_fstab_tree
+
+from ..conftest import MOCK_DATA, MOCK_VARIANTS_LINUX
+from .test_loader import write_fstab_file
+
+MOCK_DUPLICATE_LINES = [
+    '# Duplicate mountpoints and invalid lines',
+    'LABEL=root / ext4 errors=remount-ro 0 1',
+    'LABEL=other / xfs defaults 0 1',
+    'LABEL=data /srv/data xfs defaults,uid=1000 0 x',
+    'foo bar',
+]
+
+
+def test_audit_fstab_file_invalid_lines(tmp_path) -> None:
+    """
+    Test auditing a fstab file with duplicate mountpoints and invalid lines
+    """
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_DUPLICATE_LINES)
+    audit = audit_fstab_file(path, 'linux')
+    assert audit.error is None
+    assert audit.entries == 2
+    assert audit.comments == 1
+    assert audit.duplicate_mountpoints == ['/']
+    assert audit.invalid_lines == [(4, MOCK_DUPLICATE_LINES[3]), (5, 'foo bar')]
+    assert audit.filesystems == {'ext4': 1, 'xfs': 1}
+    assert audit.options == {'errors': 1, 'defaults': 1}
+
+
+def test_audit_fstab_file_missing(tmp_path) -> None:
+    """
+    Test auditing a missing fstab file
+    """
+    audit = audit_fstab_file(tmp_path.joinpath('fstab'), 'linux')
+    assert audit.error is not None
+    assert audit.entries == 0
+
+
+def test_audit_fstab_files_unexpected_platform() -> None:
+    """
+    Test auditing fstab files with unexpected platform
+    """
+    with pytest.raises(FilesystemError):
+        audit_fstab_files([], platform='windows')
+
+
+def test_audit_fstab_files_empty() -> None:
+    """
+    Test auditing an empty list of fstab files
+    """
+    report = audit_fstab_files([], platform='linux')
+    assert report.files == []
+    assert report.entries == 0
+
+
+def test_audit_fstab_files(tmp_path) -> None:
+    """
+    Test auditing fstab files in a process pool
+    """
+    invalid = tmp_path.joinpath('invalid')
+    write_fstab_file(invalid, MOCK_DUPLICATE_LINES)
+    paths = [MOCK_DATA.joinpath(variant, 'fstab') for variant in MOCK_VARIANTS_LINUX]
+    paths += [invalid, tmp_path.joinpath('missing')]
+
+    report = audit_fstab_files(paths, platform='linux', max_workers=2)
+    assert isinstance(repr(report), str)
+    assert [item.path for item in report.files] == paths
+    assert report.entries == sum(item.entries for item in report.files)
+    assert report.filesystems['ext4'] > 0
+    assert report.options['defaults'] > 0
+    assert report.duplicate_mountpoints == {invalid: ['/']}
+    assert list(report.invalid_lines) == [invalid]
+    assert list(report.errors) == [tmp_path.joinpath('missing')]
+
+
+def test_audit_fstab_tree() -> None:
+    """
+    Test auditing fstab files in a directory tree
+    """
+    report = audit_fstab_tree(MOCK_DATA, platform='linux', max_workers=2)
+    assert len(report.files) == len(list(MOCK_DATA.glob('*/fstab')))
+    assert report.errors == {}
@@ -0,0 +1,122 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.fstab.dependencies module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.fstab.dependencies import MountDependencyGraph, systemd_mount_unit_path
+from fs_toolkit.fstab.platform.base import FstabEntry
+
+MOCK_DEPENDENCY_ENTRIES = (
+    'LABEL=root / ext4 defaults 0 1',
+    'UUID=0EDC-E243 /boot/efi vfat umask=0077 0 2',
+    'LABEL=boot /boot ext4 defaults 0 2',
+    'LABEL=data /srv/data xfs defaults 0 2',
+    '/srv/data/images/disk.img /mnt/image ext4 loop 0 0',
+    '/srv/data/export /export none bind 0 0',
+    'nas:/backup /mnt/backup nfs x-systemd.requires=/export,x-systemd.after=srv-data.mount 0 0',
+    'UUID=99a57458-c8ba-4c62-8709-b94b9285f747 none swap sw 0 0',
+)
+MOCK_CYCLE_ENTRIES = (
+    'LABEL=root / ext4 defaults 0 1',
+    '/mnt/b/disk.img /mnt/a ext4 loop 0 0',
+    '/mnt/a/disk.img /mnt/b ext4 loop 0 0',
+)
+
+
+def get_entries(lines) -> list:
+    """
+    Return fstab entries for lines
+    """
+    return [FstabEntry(line) for line in lines]
+
+
+def get_mountpoints(entries) -> list:
+    """
+    Return mountpoints for entries as strings
+    """
+    return [str(entry.mountpoint) for entry in entries]
+
+
+@pytest.mark.parametrize('unit,path', (
+    ('-.mount', '/'),
+    ('srv-data.mount', '/srv/data'),
+    ('srv-my\\x2ddata.mount', '/srv/my-data'),
+    ('network-online.target', None),
+))
+def test_systemd_mount_unit_path(unit, path) -> None:
+    """
+    Test converting systemd mount unit names to paths
+    """
+    assert systemd_mount_unit_path(unit) == path
+
+
+def test_mount_dependency_graph() -> None:
+    """
+    Test mount dependencies and levels of fstab entries
+    """
+    entries = get_entries(MOCK_DEPENDENCY_ENTRIES)
+    graph = MountDependencyGraph(entries)
+    assert isinstance(repr(graph), str)
+    assert len(graph.entries) == 7
+    assert not graph.has_cycles
+
+    assert get_mountpoints(graph.dependencies(entries[1])) == ['/boot']
+    assert get_mountpoints(graph.dependencies(entries[4])) == ['/', '/srv/data']
+    assert get_mountpoints(graph.dependencies(entries[6])) == ['/', '/export', '/srv/data']
+    assert get_mountpoints(graph.dependents(entries[3])) == ['/mnt/image', '/export', '/mnt/backup']
+
+    assert [get_mountpoints(level) for level in graph.levels()] == [
+        ['/'],
+        ['/boot', '/srv/data'],
+        ['/boot/efi', '/mnt/image', '/export'],
+        ['/mnt/backup'],
+    ]
+    assert get_mountpoints(graph.order()) == [
+        '/', '/boot', '/srv/data', '/boot/efi', '/mnt/image', '/export', '/mnt/backup'
+    ]
+    assert [get_mountpoints(level) for level in graph.fsck_levels()] == [
+        ['/'],
+        ['/boot', '/srv/data'],
+        ['/boot/efi'],
+    ]
+
+    with pytest.raises(FilesystemError):
+        graph.dependencies(entries[7])
+
+
+def test_mount_dependency_graph_bind_subdirectory() -> None:
+    """
+    Test bind mounts of subdirectories of other mounts depend on the containing mount
+    """
+    entries = get_entries((
+        'LABEL=root / ext4 defaults 0 1',
+        'LABEL=data /srv/my\\040data xfs defaults 0 2',
+        '/srv/my\\040data/www/site /var/www none rbind 0 0',
+    ))
+    graph = MountDependencyGraph(entries)
+    assert get_mountpoints(graph.dependencies(entries[2])) == ['/', '/srv/my data']
+    assert get_mountpoints(graph.order()) == ['/', '/srv/my data', '/var/www']
+
+
+def test_mount_dependency_graph_cycle() -> None:
+    """
+    Test detecting cycles in mount dependencies
+    """
+    graph = MountDependencyGraph(get_entries(MOCK_CYCLE_ENTRIES))
+    assert graph.has_cycles
+    with pytest.raises(FilesystemError):
+        graph.levels()
+
+
+def test_mount_dependency_graph_fstab(linux_fstab) -> None:
+    """
+    Test mount dependency graph for mock fstab files
+    """
+    graph = MountDependencyGraph(linux_fstab)
+    assert len(graph.order()) == len([entry for entry in linux_fstab if entry.mountpoint is not None])
@@ -6,12 +6,16 @@
 """
 Unit tests for fs_toolkit.fstab.loader module
 """
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from fs_toolkit.exceptions import FilesystemError
 from fs_toolkit.fstab.loader import Fstab, FstabEntry
 
-from ..conftest import MOCK_DATA
+from ..conftest import MOCK_DATA, mock_platform_toolchain
 from .conftest import VALID_FSTAB_ENTRIES
 
 MOCK_FILE = MOCK_DATA.joinpath('darwin/fstab')
@@ -28,6 +32,22 @@ MOCK_VALID_FILTER_ARGS = {
     'uuid': '0FC3B1C4-F072-4A10-A1CE-8ED60A59F03C',
 }
 
+MOCK_FSTAB_LINES = [
+    '# Test fstab file',
+    'LABEL=root / ext4 errors=remount-ro 0 1',
+    'UUID=0EDC-E243 /boot/efi vfat umask=0077 0 1',
+]
+MOCK_FSTAB_ADDED_LINE = '/dev/sr0 /media/cdrom0 udf,iso9660 user,noauto 0 0'
+
+
+def write_fstab_file(path, lines, mtime_ns=None) -> None:
+    """
+    Write fstab lines to specified test file
+    """
+    path.write_text(''.join(f'{line}\n' for line in lines), encoding='utf-8')
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
 
 def test_fstab_validate_filter_arguments_no_arguments() -> None:
     """
@@ -183,3 +203,205 @@ def test_filter_multiple(darwin_fstab) -> None:
     item = [entry for entry in fstab if entry.uuid][0]
     other = [entry for entry in fstab if entry != item][0]
     assert len(fstab.filter(uuid=item.uuid, mountpoint=other.mountpoint)) == 2
+
+
+def test_fstab_auto_refresh_disabled(monkeypatch, tmp_path) -> None:
+    """
+    Test fstab file changes are not loaded without auto_refresh
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES)
+    fstab = Fstab(path)
+    assert len(fstab) == 2
+
+    write_fstab_file(path, MOCK_FSTAB_LINES + [MOCK_FSTAB_ADDED_LINE])
+    assert len(fstab) == 2
+
+
+def test_fstab_auto_refresh_reload(monkeypatch, tmp_path) -> None:
+    """
+    Test reloading changed fstab file with auto_refresh, keeping unchanged entries
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES, mtime_ns=1_000_000_000)
+    fstab = Fstab(path, auto_refresh=True)
+    entries = list(fstab)
+    assert len(entries) == 2
+    loaded = fstab.__loaded__
+
+    # Unchanged file is not loaded again
+    assert len(fstab) == 2
+    assert fstab.__loaded__ == loaded
+
+    write_fstab_file(path, MOCK_FSTAB_LINES[1:] + [MOCK_FSTAB_ADDED_LINE], mtime_ns=2_000_000_000)
+    assert len(fstab) == 3
+    assert fstab[0] is entries[0]
+    assert fstab[1] is entries[1]
+    assert fstab.get_by_mountpoint('/media/cdrom0') == MOCK_FSTAB_ADDED_LINE
+    assert len(fstab.__lines__) == 3
+
+
+def test_fstab_iterator_snapshot(monkeypatch, tmp_path) -> None:
+    """
+    Test iterators are not affected by reloading or editing fstab entries
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES, mtime_ns=1_000_000_000)
+    fstab = Fstab(path, auto_refresh=True)
+    iterator = iter(fstab)
+    first = next(iterator)
+
+    write_fstab_file(path, MOCK_FSTAB_LINES + [MOCK_FSTAB_ADDED_LINE], mtime_ns=2_000_000_000)
+    assert len(fstab) == 3
+    assert fstab.get_by_mountpoint('/media/cdrom0') is not None
+    fstab.remove_entry(first)
+    assert fstab.get_by_mountpoint('/') is None
+    assert len(fstab) == 2
+    assert len([first] + list(iterator)) == 2
+
+
+def test_fstab_next_nested_and_threads(monkeypatch, tmp_path) -> None:
+    """
+    Test nested iteration with next() and next() calls from multiple threads
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES)
+    fstab = Fstab(path)
+
+    def iterate_next(_index):
+        items = []
+        while True:
+            try:
+                items.append(next(fstab))
+            except StopIteration:
+                return items
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(iterate_next, range(8)))
+    assert all(items == list(fstab) for items in results)
+
+    pairs = [(outer, inner) for outer in fstab for inner in fstab]
+    assert len(pairs) == 4
+
+
+def test_fstab_auto_refresh_missing_file(monkeypatch, tmp_path) -> None:
+    """
+    Test auto_refresh file signature of a missing fstab file
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    fstab = Fstab(tmp_path.joinpath('fstab'), auto_refresh=True)
+    assert fstab.__get_file_signature__() is None
+
+
+def test_fstab_invalid_lines_reload(monkeypatch, tmp_path) -> None:
+    """
+    Test invalid lines are collected again when reloading fstab with reused lines
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES[:2] + ['bogus line'])
+    fstab = Fstab(path, strict=False)
+    fstab.update()
+    assert fstab.invalid_lines == [(3, 'bogus line')]
+    fstab.update()
+    assert fstab.invalid_lines == [(3, 'bogus line')]
+    assert len(fstab) == 1
+
+    fstab.strict = True
+    with pytest.raises(FilesystemError):
+        fstab.update()
+
+
+def test_fstab_edit_entries_save(monkeypatch, tmp_path) -> None:
+    """
+    Test adding, replacing and removing fstab entries and saving changes
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES)
+    path.chmod(0o640)
+    owners = []
+    monkeypatch.setattr('fs_toolkit.fstab.loader.os.chown', lambda *args: owners.append(args[1:]))
+    fstab = Fstab(path)
+    assert fstab.save() is False
+
+    entry = fstab.add_entry(MOCK_FSTAB_ADDED_LINE)
+    assert isinstance(entry, FstabEntry)
+    assert len(fstab) == 3
+    fstab.replace_entry(MOCK_FSTAB_LINES[2], 'UUID=0EDC-E243 /efi vfat umask=0077 0 1')
+    fstab.remove_entry(fstab.get_by_mountpoint('/'))
+    assert fstab.save() is True
+    assert fstab.save() is False
+
+    assert path.stat().st_mode & 0o777 == 0o640
+    assert owners == [(path.stat().st_uid, path.stat().st_gid)]
+    assert path.read_text(encoding='utf-8').splitlines() == [
+        MOCK_FSTAB_LINES[0],
+        'UUID=0EDC-E243 /efi vfat umask=0077 0 1',
+        MOCK_FSTAB_ADDED_LINE,
+    ]
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_fstab_edit_invalid_entries(monkeypatch, tmp_path) -> None:
+    """
+    Test editing fstab with invalid entries
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES)
+    fstab = Fstab(path)
+    with pytest.raises(FilesystemError):
+        fstab.add_entry(1)
+    with pytest.raises(FilesystemError):
+        fstab.remove_entry(MOCK_FSTAB_ADDED_LINE)
+    with pytest.raises(FilesystemError):
+        fstab.add_entry('foo bar')
+
+
+def test_fstab_edit_batch(monkeypatch, tmp_path) -> None:
+    """
+    Test editing fstab in a batch writes file once and rolls back on errors
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES)
+    fstab = Fstab(path, auto_refresh=True)
+    calls = []
+    monkeypatch.setattr(fstab, '__write_file__', calls.append)
+
+    with pytest.raises(FilesystemError):
+        with fstab.batch():
+            fstab.add_entry(MOCK_FSTAB_ADDED_LINE)
+            fstab.remove_entry(MOCK_FSTAB_ADDED_LINE)
+            fstab.remove_entry(MOCK_FSTAB_ADDED_LINE)
+    assert len(fstab) == 2
+    assert calls == []
+
+    with fstab.batch():
+        fstab.add_entry(MOCK_FSTAB_ADDED_LINE)
+        with fstab.batch():
+            fstab.remove_entry(MOCK_FSTAB_LINES[1])
+        assert calls == []
+    assert len(calls) == 1
+    assert calls[0].splitlines() == [MOCK_FSTAB_LINES[0], MOCK_FSTAB_LINES[2], MOCK_FSTAB_ADDED_LINE]
+
+
+def test_fstab_save_modified_file(monkeypatch, tmp_path) -> None:
+    """
+    Test saving edited fstab when the file was modified after loading
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    path = tmp_path.joinpath('fstab')
+    write_fstab_file(path, MOCK_FSTAB_LINES, mtime_ns=1_000_000_000)
+    fstab = Fstab(path, auto_refresh=True)
+    fstab.add_entry(MOCK_FSTAB_ADDED_LINE)
+    write_fstab_file(path, MOCK_FSTAB_LINES[:2], mtime_ns=2_000_000_000)
+    # Pending changes are not replaced by reloading the file
+    assert len(fstab) == 3
+    with pytest.raises(FilesystemError):
+        fstab.save()
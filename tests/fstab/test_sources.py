@@ -0,0 +1,115 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.fstab.sources module
+"""
+from pathlib import Path
+
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.fstab import FstabSources
+
+from ..conftest import mock_platform_toolchain
+from .test_loader import MOCK_FSTAB_ADDED_LINE, MOCK_FSTAB_LINES, write_fstab_file
+
+MOCK_FRAGMENT_LINES = {
+    '10-data.fstab': ['# Data disk', 'LABEL=data /srv/data xfs defaults 0 2'],
+    '20-backup.fstab': ['LABEL=backup /srv/backup xfs defaults,noauto 0 2'],
+    'ignored.conf': ['LABEL=ignored /srv/ignored xfs defaults 0 2'],
+}
+
+
+def create_fstab_root(root: Path) -> Path:
+    """
+    Create a root directory with fstab file and fstab fragments directory
+    """
+    root.joinpath('etc/fstab.d').mkdir(parents=True)
+    write_fstab_file(root.joinpath('etc/fstab'), MOCK_FSTAB_LINES, mtime_ns=1_000_000_000)
+    for name, lines in MOCK_FRAGMENT_LINES.items():
+        write_fstab_file(root.joinpath('etc/fstab.d', name), lines, mtime_ns=1_000_000_000)
+    return root
+
+
+def test_fstab_sources_root(monkeypatch, tmp_path) -> None:
+    """
+    Test loading merged fstab sources from a root directory
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    root = create_fstab_root(tmp_path)
+    fstab = FstabSources(root=root)
+    assert len(fstab) == 4
+    assert fstab.sources == [
+        root.joinpath('etc/fstab'),
+        root.joinpath('etc/fstab.d/10-data.fstab'),
+        root.joinpath('etc/fstab.d/20-backup.fstab'),
+    ]
+    assert len(fstab.__lines__) == 6
+
+    entry = fstab.get_by_mountpoint('/srv/data')
+    assert entry.label == 'data'
+    assert entry.source == root.joinpath('etc/fstab.d/10-data.fstab')
+    assert fstab.get_by_label('backup').source == root.joinpath('etc/fstab.d/20-backup.fstab')
+    assert fstab.get_by_mountpoint('/srv/ignored') is None
+
+
+def test_fstab_sources_missing_path(monkeypatch, tmp_path) -> None:
+    """
+    Test loading merged fstab sources with missing fstab file
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    fstab = FstabSources(root=tmp_path)
+    with pytest.raises(FilesystemError):
+        len(fstab)
+
+
+def test_fstab_sources_auto_refresh(monkeypatch, tmp_path) -> None:
+    """
+    Test merged fstab sources reload only changed source files
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    root = create_fstab_root(tmp_path)
+    fstab = FstabSources(
+        paths=[root.joinpath('etc/fstab')],
+        directories=[root.joinpath('etc/fstab.d')],
+        auto_refresh=True
+    )
+    entries = list(fstab)
+    assert len(entries) == 4
+    data = fstab.get_source(root.joinpath('etc/fstab.d/10-data.fstab'))
+    loaded = data.__loaded__
+
+    write_fstab_file(root.joinpath('etc/fstab'), MOCK_FSTAB_LINES + [MOCK_FSTAB_ADDED_LINE], mtime_ns=2_000_000_000)
+    assert len(fstab) == 5
+    assert fstab.get_by_mountpoint('/media/cdrom0') is not None
+    assert data.__loaded__ == loaded
+    assert list(fstab)[:2] == entries[:2]
+    assert fstab[0] is entries[0]
+
+    root.joinpath('etc/fstab.d/20-backup.fstab').unlink()
+    assert len(fstab) == 4
+    assert fstab.get_by_label('backup') is None
+
+
+def test_fstab_sources_edit(monkeypatch, tmp_path) -> None:
+    """
+    Test editing merged fstab sources is not allowed
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    root = create_fstab_root(tmp_path)
+    fstab = FstabSources(root=root)
+    with pytest.raises(FilesystemError):
+        fstab.add_entry(MOCK_FSTAB_ADDED_LINE)
+    with pytest.raises(FilesystemError):
+        fstab.save()
+    with pytest.raises(FilesystemError):
+        fstab.get_source('/etc/fstab')
+
+    source = fstab.get_source(root.joinpath('etc/fstab'))
+    source.add_entry(MOCK_FSTAB_ADDED_LINE)
+    assert source.save() is True
+    fstab.update()
+    assert fstab.get_by_mountpoint('/media/cdrom0').source == root.joinpath('etc/fstab')
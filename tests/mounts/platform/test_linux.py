@@ -6,6 +6,7 @@
 """
 Unit tests for fs_toolkit.mounts.loader with FreeBSD data
 """
+from ...conftest import MOCK_STATVFS_ERRORS, MOCK_STATVFS_INODES, MOCK_STATVFS_NO_INODES
 from .validators import (
     validate_mountpoints_properties,
     validate_mountpoints_iterator,
@@ -24,3 +25,20 @@ def test_linux_mountpoints_iterator(linux_mountpoints):
     Test initializing an iterator from mountpoints
     """
     validate_mountpoints_iterator(linux_mountpoints)
+
+
+def test_linux_mountpoints_inode_usage(linux_mountpoints):
+    """
+    Test loading Linux inode usage with statvfs
+    """
+    files, free, available = MOCK_STATVFS_INODES
+    for item in linux_mountpoints:
+        usage = item.usage
+        if usage.used is None or item.mountpoint in MOCK_STATVFS_NO_INODES + MOCK_STATVFS_ERRORS:
+            assert usage.inodes_used is None
+            assert usage.inodes_available is None
+            assert usage.inodes_percent is None
+        else:
+            assert usage.inodes_used == files - free
+            assert usage.inodes_available == available
+            assert usage.inodes_percent == 79
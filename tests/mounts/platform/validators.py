@@ -6,7 +6,7 @@
 """
 Validators for fs_toolkit.mounts.platform module
 """
-from _collections_abc import list_iterator
+from _collections_abc import tuple_iterator
 
 import pytest
 
@@ -94,7 +94,7 @@ def validate_mountpoints_iterator(mountpoints: Mountpoints):
     """
     assert mountpoints.__loaded__ is None
     iterator = iter(mountpoints)
-    assert isinstance(iterator, list_iterator)
+    assert isinstance(iterator, tuple_iterator)
 
     # Returns different instance
     other = iter(mountpoints)
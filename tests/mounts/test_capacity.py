@@ -0,0 +1,103 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.capacity module
+"""
+from fs_toolkit.mounts import Mountpoints
+from fs_toolkit.mounts.capacity import MountpointsCapacity, get_filesystem_identity, get_host_capacity
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+
+from .test_loader import MockRunCommands
+
+MOUNTPOINTS = (
+    MountpointSnapshot('/dev/sda1', '/', 'btrfs', size=1000, used=600, available=400),
+    MountpointSnapshot('/dev/sda1', '/home', 'btrfs', size=1000, used=600, available=400),
+    MountpointSnapshot('/dev/sda1', '/srv/bind', 'btrfs', size=1000, used=600, available=400),
+    MountpointSnapshot('tank/data', '/data', 'zfs', size=5100, used=100, available=5000),
+    MountpointSnapshot('tank/logs', '/logs', 'zfs', size=5300, used=300, available=5000),
+    MountpointSnapshot('server:/a', '/a', 'nfs', size=800, used=200, available=600),
+    MountpointSnapshot('server:/a/', '/b', 'nfs', size=800, used=201, available=599),
+    MountpointSnapshot('//server/share', '/c', 'cifs', size=100, used=10, available=90),
+    MountpointSnapshot('tmpfs', '/tmp', 'tmpfs', is_virtual=True, size=50, used=5, available=45),
+    MountpointSnapshot('tmpfs', '/run', 'tmpfs', is_virtual=True, size=50, used=5, available=45),
+    MountpointSnapshot('/dev/sdb1', '/empty', 'ext4'),
+)
+
+
+def test_filesystem_identity() -> None:
+    """
+    Test detecting filesystem identity of mountpoints
+    """
+    keys = [get_filesystem_identity(item) for item in MOUNTPOINTS]
+    assert keys[0] == keys[1] == keys[2] == ('device', '/dev/sda1')
+    assert keys[3] == keys[4] == ('pool', 'zfs', 'tank')
+    assert keys[5] == keys[6] == ('network', 'server', '/a')
+    assert keys[7] == ('network', 'server', '/share')
+    assert keys[8] != keys[9]
+
+    # Network exports are not grouped by identical usage
+    assert get_filesystem_identity(
+        MountpointSnapshot('server:/b', '/b', 'nfs', size=800, used=200, available=600)
+    ) != keys[5]
+
+
+def test_mountpoints_capacity_deduplicated() -> None:
+    """
+    Test capacity is counted once for each filesystem
+    """
+    capacity = MountpointsCapacity(MOUNTPOINTS)
+    assert len(capacity) == 4
+    assert repr(capacity) == 'capacity of 4 filesystems'
+    total = capacity.total
+    assert len(total) == 4
+    assert total.size == 1000 + 5400 + 800 + 100
+    assert total.used == 600 + 400 + 200 + 10
+    assert total.available == 400 + 5000 + 600 + 90
+    assert total.percent == 17
+
+    pool = capacity.filesystems[('pool', 'zfs', 'tank')]
+    assert pool.device == 'tank'
+    assert [item.mountpoint for item in pool.mountpoints] == ['/data', '/logs']
+    assert repr(pool) == 'tank zfs mounted on 2 mountpoints'
+
+    by_filesystem = capacity.by_filesystem()
+    assert sorted(by_filesystem) == ['btrfs', 'cifs', 'nfs', 'zfs']
+    assert by_filesystem['nfs'].size == 800
+    assert capacity.by_device()['/dev/sda1'].used == 600
+
+    capacity = MountpointsCapacity(MOUNTPOINTS, include_virtual=True)
+    assert len(capacity) == 6
+    assert capacity.total.size == 7400
+    assert MountpointsCapacity([]).total.percent is None
+
+
+def test_host_capacity() -> None:
+    """
+    Test capacity totals for hosts
+    """
+    totals = get_host_capacity({'first': MOUNTPOINTS, 'second': MOUNTPOINTS[:3]})
+    assert totals['first'].size == 7300
+    assert totals['second'].size == 1000
+    assert repr(totals['second']) == '1 filesystems size 1000 used 600'
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_capacity_cached(mock_platform_data, monkeypatch) -> None:
+    """
+    Test capacity of loaded mountpoints is cached until mountpoints are loaded again
+    """
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', MockRunCommands())
+    mountpoints = Mountpoints()
+    capacity = mountpoints.capacity
+    assert mountpoints.capacity is capacity
+
+    # All zroot datasets are in the same pool
+    pool = capacity.filesystems[('pool', 'zfs', 'zroot')]
+    assert len(pool.mountpoints) == len([item for item in mountpoints if item.device.startswith('zroot')])
+    assert pool.available == max(item.usage.available for item in pool.mountpoints)
+
+    mountpoints.update()
+    assert mountpoints.capacity is not capacity
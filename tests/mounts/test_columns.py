@@ -0,0 +1,92 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.columns module
+"""
+import sys
+
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts.columns import MISSING_VALUE, USAGE_COLUMNS, MountpointColumns
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+
+
+def test_mountpoint_columns_snapshots() -> None:
+    """
+    Test columns of mountpoint snapshots
+    """
+    columns = MountpointColumns([
+        MountpointSnapshot('/dev/sda1', '/', 'ext4', size=1000, used=900, available=100, percent=90),
+        MountpointSnapshot('proc', '/proc', 'proc', is_virtual=True),
+        MountpointSnapshot('/dev/sdb1', '/data', 'ext4', size=1000, used=10, available=990, percent=1),
+    ])
+    assert len(columns) == 3
+    assert repr(columns) == '3 mountpoints in columns'
+    assert list(columns.columns['percent']) == [90, MISSING_VALUE, 1]
+    assert list(columns.columns['inodes_used']) == [MISSING_VALUE] * 3
+    assert columns.categories['filesystem'] == ['ext4', 'proc']
+    assert list(columns.codes['filesystem']) == [0, 1, 0]
+    assert list(columns.virtual) == [0, 1, 0]
+    assert columns.get_code('filesystem', 'proc') == 1
+    assert columns.get_code('filesystem', 'xfs') == -1
+    with pytest.raises(FilesystemError):
+        columns.get_code('unexpected', 'xfs')
+
+
+def test_mountpoint_columns_loaded_mountpoints(bsd_mountpoints) -> None:
+    """
+    Test columns of loaded mountpoints
+    """
+    columns = MountpointColumns(bsd_mountpoints)
+    assert len(columns) == len(bsd_mountpoints)
+    for attr in USAGE_COLUMNS:
+        assert len(columns.columns[attr]) == len(bsd_mountpoints)
+    for index, item in enumerate(bsd_mountpoints):
+        expected = MISSING_VALUE if item.usage.used is None else item.usage.used
+        assert columns.columns['used'][index] == expected
+        assert columns.categories['filesystem'][columns.codes['filesystem'][index]] == item.filesystem.name
+
+
+def test_mountpoint_columns_column_access() -> None:
+    """
+    Test accessing columns by name
+    """
+    columns = MountpointColumns([
+        MountpointSnapshot('/dev/sda1', '/', 'ext4', used=900),
+        MountpointSnapshot('/dev/sda1', '/home', 'ext4', used=10),
+    ])
+    assert columns.column('used').tolist() == [900, 10]
+    assert columns.column('device').tolist() == [0, 0]
+    assert columns.column('mountpoint').tolist() == [0, 1]
+    assert columns.categories['mountpoint'] == ['/', '/home']
+    assert columns.column('virtual').tolist() == [0, 0]
+    assert sorted(columns.to_dict()) == sorted(USAGE_COLUMNS + ('device', 'filesystem', 'mountpoint', 'virtual'))
+    assert memoryview(columns.column('size')).itemsize == 8
+    with pytest.raises(FilesystemError):
+        columns.column('unexpected')
+
+
+def test_mountpoint_columns_to_numpy_missing(monkeypatch) -> None:
+    """
+    Test numpy columns when numpy is not available
+    """
+    monkeypatch.setitem(sys.modules, 'numpy', None)
+    with pytest.raises(FilesystemError):
+        MountpointColumns([]).to_numpy()
+
+
+def test_mountpoint_columns_to_numpy() -> None:
+    """
+    Test numpy columns share memory with the column arrays
+    """
+    numpy = pytest.importorskip('numpy')
+    columns = MountpointColumns([MountpointSnapshot('/dev/sda1', '/', 'ext4', used=900, percent=90)])
+    arrays = columns.to_numpy()
+    assert arrays['used'].dtype == numpy.int64
+    assert arrays['percent'].tolist() == [90]
+    columns.column('used')[0] = 1000
+    assert arrays['used'][0] == 1000
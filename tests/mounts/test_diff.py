@@ -0,0 +1,99 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.diff module
+"""
+from fs_toolkit.mounts.diff import (
+    CHANGE_ADDED,
+    CHANGE_MOVED,
+    CHANGE_REMOUNTED,
+    CHANGE_REMOVED,
+    MountpointsDiff,
+)
+from fs_toolkit.mounts.mountinfo import MountInfoEntry
+from fs_toolkit.mounts.snapshot import MountpointSnapshot, MountpointsSnapshot
+
+MOCK_OLD_MOUNTS = (
+    MountpointSnapshot('/dev/sda1', '/', 'ext4', ('rw', 'relatime')),
+    MountpointSnapshot('/dev/sda2', '/home', 'ext4', ('rw', 'relatime')),
+    MountpointSnapshot('/dev/sdb1', '/media/usb', 'vfat', ('rw',)),
+    MountpointSnapshot('tmpfs', '/run', 'tmpfs', ('rw',), is_virtual=True),
+    MountpointSnapshot('/dev/sdc1', '/srv', 'xfs', ('rw',)),
+)
+MOCK_NEW_MOUNTS = (
+    MountpointSnapshot('/dev/sda1', '/', 'ext4', ('ro', 'relatime')),
+    MountpointSnapshot('/dev/sda2', '/home', 'ext4', ('rw', 'relatime')),
+    MountpointSnapshot('/dev/sdb1', '/mnt/usb', 'vfat', ('rw',)),
+    MountpointSnapshot('tmpfs', '/tmp', 'tmpfs', ('rw',), is_virtual=True),
+    MountpointSnapshot('/dev/sdd1', '/backup', 'xfs', ('rw',)),
+)
+
+
+def test_mountpoints_diff_changes() -> None:
+    """
+    Test differences between mountpoint snapshots
+    """
+    old = MountpointsSnapshot('linux', MOCK_OLD_MOUNTS)
+    new = MountpointsSnapshot('linux', MOCK_NEW_MOUNTS)
+    diff = old.diff(new)
+    assert isinstance(diff, MountpointsDiff)
+    assert diff
+    assert diff.remounted == [(MOCK_OLD_MOUNTS[0], MOCK_NEW_MOUNTS[0])]
+    assert diff.moved == [(MOCK_OLD_MOUNTS[2], MOCK_NEW_MOUNTS[2])]
+    assert diff.removed == [MOCK_OLD_MOUNTS[3], MOCK_OLD_MOUNTS[4]]
+    assert diff.added == [MOCK_NEW_MOUNTS[3], MOCK_NEW_MOUNTS[4]]
+    assert repr(diff) == '2 added, 2 removed, 1 remounted, 1 moved'
+
+    changes = list(diff.changes())
+    assert [change.kind for change in changes] == [
+        CHANGE_REMOVED, CHANGE_REMOVED, CHANGE_MOVED, CHANGE_REMOUNTED, CHANGE_ADDED, CHANGE_ADDED,
+    ]
+    assert repr(changes[2]) == 'moved /dev/sdb1 /media/usb -> /mnt/usb'
+    assert repr(changes[0]) == 'removed tmpfs /run'
+    assert changes[-1].old is None
+    assert changes[0].new is None
+
+
+def test_mountpoints_diff_duplicate_mounts() -> None:
+    """
+    Test differences with same device mounted multiple times on the same mountpoint
+    """
+    item = MOCK_OLD_MOUNTS[0]
+    diff = MountpointsDiff([item], [item, item])
+    assert diff.added == [item]
+    assert not diff.removed and not diff.moved and not diff.remounted
+    assert not MountpointsDiff([item, item], [item, item])
+
+
+def test_mountpoints_diff_mount_ids() -> None:
+    """
+    Test differences of mounts matched by mount ID
+    """
+    old = MountInfoEntry('30 22 8:2 / /mnt/old rw - ext4 /dev/sda2 rw')
+    moved = MountInfoEntry('30 22 8:2 / /mnt/new ro - ext4 /dev/sda2 rw')
+    diff = MountpointsDiff([old], [moved])
+    assert diff.moved == [(old, moved)]
+    assert diff.remounted == [(old, moved)]
+    assert not diff.added and not diff.removed
+    assert repr(list(diff)[0]) == 'moved /dev/sda2 /mnt/old -> /mnt/new'
+
+    reused = MountInfoEntry('30 22 8:3 / /mnt/old rw - xfs /dev/sda3 rw')
+    diff = MountpointsDiff([old], [reused])
+    assert diff.removed == [old]
+    assert diff.added == [reused]
+    assert not diff.moved and not diff.remounted
+    assert not MountpointsDiff([old], [MountInfoEntry('30 22 8:2 / /mnt/old rw - ext4 /dev/sda2 rw')])
+
+
+def test_mountpoints_diff_loaded_mountpoints(linux_mountpoints) -> None:
+    """
+    Test differences between loaded mountpoints and snapshots
+    """
+    snapshot = linux_mountpoints.snapshot()
+    assert not linux_mountpoints.diff(snapshot)
+    assert list(linux_mountpoints.diff(snapshot[1:])) != []
+    diff = MountpointsDiff(snapshot[1:], snapshot)
+    assert diff.added == [snapshot[0]]
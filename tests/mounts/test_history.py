@@ -0,0 +1,127 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.history module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts.history import LinearRegression, UsageHistory, UsageRingBuffer
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+
+START_TIME = 1_700_000_000.0
+
+
+def test_linear_regression_add_remove() -> None:
+    """
+    Test adding and removing regression samples
+    """
+    regression = LinearRegression(START_TIME)
+    assert regression.slope is None
+    regression.add(START_TIME, 10)
+    regression.add(START_TIME, 20)
+    assert regression.slope is None
+    regression.add(START_TIME + 10, 30)
+    regression.remove(START_TIME, 20)
+    assert regression.slope == pytest.approx(2.0)
+
+
+def test_usage_ring_buffer_bounded() -> None:
+    """
+    Test ring buffer replaces oldest samples and keeps regression up to date
+    """
+    buffer = UsageRingBuffer(capacity=4)
+    assert buffer.latest is None
+    assert buffer.growth_rate is None
+    assert buffer.time_to_full() is None
+
+    # Usage grows 100 bytes per second for 8 samples, then 10 bytes per second
+    for index in range(8):
+        buffer.append(START_TIME + index * 60, index * 6000, 1_000_000 - index * 6000, index)
+    assert len(buffer) == 4
+    assert len(buffer.timestamps) == 4
+    assert [sample[0] for sample in buffer] == [START_TIME + index * 60 for index in range(4, 8)]
+    assert buffer.growth_rate == pytest.approx(100.0)
+    assert buffer.inodes_growth_rate == pytest.approx(1 / 60)
+    assert buffer.time_to_full() == pytest.approx((1_000_000 - 42_000) / 100)
+
+    for index in range(8, 12):
+        buffer.append(START_TIME + index * 60, 42_000 + (index - 7) * 600, 1000, None)
+    assert buffer.growth_rate == pytest.approx(10.0)
+    assert buffer.inodes_growth_rate is None
+    assert buffer.latest == (START_TIME + 11 * 60, 44_400, 1000, None)
+    assert repr(buffer) == 'usage history with 4 of 4 samples'
+
+    with pytest.raises(FilesystemError):
+        buffer.append(START_TIME, 0, 0)
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.growth_rate is None
+
+
+def test_usage_ring_buffer_shrinking_usage() -> None:
+    """
+    Test time to full is not estimated for shrinking usage
+    """
+    buffer = UsageRingBuffer(capacity=10)
+    for index in range(5):
+        buffer.append(START_TIME + index, 1000 - index, index)
+    assert buffer.growth_rate == pytest.approx(-1.0)
+    assert buffer.time_to_full() is None
+    with pytest.raises(FilesystemError):
+        UsageRingBuffer(capacity=1)
+
+
+def test_usage_history_mountpoints() -> None:
+    """
+    Test usage history of mountpoint snapshots
+    """
+    history = UsageHistory(capacity=8)
+    for index in range(10):
+        history.update([
+            MountpointSnapshot('/dev/sda1', '/', 'ext4', used=1000 + index * 50, available=5000 - index * 50),
+            MountpointSnapshot('proc', '/proc', 'proc'),
+        ], timestamp=START_TIME + index)
+    assert len(history) == 1
+    assert '/' in history
+    assert '/proc' not in history
+    assert len(history['/']) == 8
+    assert history.growth_rate('/') == pytest.approx(50.0)
+    assert history.time_to_full('/') == pytest.approx(4550 / 50)
+    with pytest.raises(FilesystemError):
+        history.growth_rate('/proc')
+
+    history.update([], timestamp=START_TIME + 10)
+    assert len(history) == 0
+    assert repr(history) == 'usage history of 0 mountpoints'
+
+
+def test_usage_history_missing_usage() -> None:
+    """
+    Test history is kept when a sample without usage data is between two good samples
+    """
+    history = UsageHistory(capacity=8)
+    history.update([MountpointSnapshot('/dev/sda1', '/', 'ext4', used=1000, available=5000)], timestamp=START_TIME)
+    history.update([MountpointSnapshot('/dev/sda1', '/', 'ext4')], timestamp=START_TIME + 1)
+    assert '/' in history
+    assert len(history['/']) == 1
+    history.update([MountpointSnapshot('/dev/sda1', '/', 'ext4', used=1100, available=4900)], timestamp=START_TIME + 2)
+    assert len(history['/']) == 2
+    assert history.growth_rate('/') == pytest.approx(50.0)
+
+
+def test_usage_history_loaded_mountpoints(bsd_mountpoints) -> None:
+    """
+    Test usage history with loaded mountpoints with inode usage
+    """
+    history = UsageHistory()
+    history.update(bsd_mountpoints, timestamp=START_TIME)
+    history.update(bsd_mountpoints, timestamp=START_TIME + 60)
+    for item in bsd_mountpoints:
+        if item.mountpoint in history:
+            assert history.growth_rate(item.mountpoint) == 0
+            assert history[item.mountpoint].latest[3] == item.usage.inodes_used
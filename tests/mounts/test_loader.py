@@ -6,6 +6,11 @@
 """
 Unit tests for fs_toolkit.mounts.loader class
 """
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from sys_toolkit.tests.mock import MockRun
@@ -42,6 +47,42 @@ class MockRunCommands(MockRun):
         raise ValueError(f'Unexpected command arguments: {args}')
 
 
+class BlockingMockRunCommands(MockRunCommands):
+    """
+    Mock calls to collect data, blocking the mount command until released
+    """
+    def __init__(self, error: bool = False) -> None:
+        super().__init__()
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, *args, **kwargs):
+        if args[0] == 'mount':
+            self.started.set()
+            self.release.wait(timeout=10)
+            if self.error:
+                raise FilesystemError('mount command failed')
+        return super().__call__(*args, **kwargs)
+
+
+def run_concurrent_updates(mountpoints, mock_method, count):
+    """
+    Run update() in count threads while another update is in progress, returning
+    futures for the leader and follower updates
+    """
+    executor = ThreadPoolExecutor(max_workers=count + 1)
+    leader = executor.submit(mountpoints.update)
+    assert mock_method.started.wait(timeout=10)
+    followers = [executor.submit(mountpoints.update) for _index in range(count)]
+    deadline = time.monotonic() + 10
+    while mountpoints.__coalesced_updates__ < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    mock_method.release.set()
+    executor.shutdown(wait=True)
+    return leader, followers
+
+
 # pylint: disable=unused-argument
 def test_mountpoints_loader_unexpected_platform(unexpected_platform):
     """
@@ -77,3 +118,113 @@ def test_mountpoints_loader_get_mount_lines(mock_platform_data, monkeypatch):
     # Does not reload the files
     list(mountpoints)
     assert mock_method.call_count == 2
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_loader_update_snapshot(mock_platform_data, monkeypatch):
+    """
+    Test iterators over mountpoints are not affected by update
+    """
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', MockRunCommands())
+
+    mountpoints = Mountpoints()
+    iterator = iter(mountpoints)
+    items = mountpoints.__items__
+    assert isinstance(items, tuple)
+
+    mountpoints.update()
+    assert mountpoints.__items__ is not items
+    assert list(iterator) == list(items)
+    assert len(mountpoints) == len(items)
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_loader_to_columns(mock_platform_data, monkeypatch):
+    """
+    Test exporting usage of mountpoints as columns
+    """
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', MockRunCommands())
+
+    mountpoints = Mountpoints()
+    columns = mountpoints.to_columns()
+    assert len(columns) == len(mountpoints)
+    for index, item in enumerate(mountpoints):
+        assert columns.categories['device'][columns.column('device')[index]] == item.device
+        assert columns.categories['mountpoint'][columns.column('mountpoint')[index]] == item.mountpoint
+        assert columns.column('size')[index] == (-1 if item.usage.size is None else item.usage.size)
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_loader_update_single_flight(mock_platform_data, monkeypatch):
+    """
+    Test concurrent update() calls wait for the update in progress
+    """
+    mock_method = BlockingMockRunCommands()
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', mock_method)
+
+    mountpoints = Mountpoints()
+    leader, followers = run_concurrent_updates(mountpoints, mock_method, 4)
+    assert leader.result() is None
+    assert [future.result() for future in followers] == [None] * 4
+    assert mountpoints.__coalesced_updates__ == 4
+    assert mock_method.call_count == 2
+    assert len(mountpoints) > 0
+
+    # Readers waiting for the first update are not counted as coalesced updates
+    mock_method = BlockingMockRunCommands()
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', mock_method)
+    mountpoints = Mountpoints()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(mountpoints.update)
+        assert mock_method.started.wait(timeout=10)
+        reader = executor.submit(list, mountpoints)
+        time.sleep(0.05)
+        mock_method.release.set()
+        assert leader.result() is None
+        assert reader.result() == list(mountpoints)
+    assert mountpoints.__coalesced_updates__ == 0
+    assert mock_method.call_count == 2
+
+    # Updates after the update in progress load the data again
+    mountpoints.update()
+    assert mock_method.call_count == 4
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_loader_update_single_flight_error(mock_platform_data, monkeypatch):
+    """
+    Test concurrent update() calls get the error from the update in progress
+    """
+    mock_method = BlockingMockRunCommands(error=True)
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', mock_method)
+
+    mountpoints = Mountpoints()
+    leader, followers = run_concurrent_updates(mountpoints, mock_method, 2)
+    for future in [leader] + followers:
+        with pytest.raises(FilesystemError):
+            future.result()
+    assert mountpoints.__coalesced_updates__ == 2
+    assert mountpoints.__loaded__ is None
+
+
+# pylint: disable=unused-argument
+def test_mountpoints_loader_update_error_keeps_snapshot(mock_platform_data, monkeypatch):
+    """
+    Test failed update keeps the previously loaded snapshot
+    """
+    mock_method = BlockingMockRunCommands()
+    mock_method.release.set()
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', mock_method)
+
+    mountpoints = Mountpoints()
+    mountpoints.update()
+    items = mountpoints.__items__
+    loaded = mountpoints.__loaded__
+    assert items
+
+    mock_method.error = True
+    with pytest.raises(FilesystemError):
+        mountpoints.update()
+    assert mountpoints.__items__ is items
+    assert mountpoints.__loaded__ == loaded
+    assert list(mountpoints) == list(items)
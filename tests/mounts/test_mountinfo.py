@@ -0,0 +1,92 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.mountinfo module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts.diff import MountpointsDiff
+from fs_toolkit.mounts.mountinfo import MountInfo, MountInfoEntry, parse_mountinfo
+
+from ..conftest import MOCK_DATA
+
+MOCK_MOUNTINFO = MOCK_DATA.joinpath('linux/mountinfo')
+
+
+def test_mountinfo_entry() -> None:
+    """
+    Test parsing mountinfo lines
+    """
+    entry = MountInfoEntry(
+        '60 22 0:70 / /mnt/with\\040space rw,relatime master:1 propagate_from:2 unbindable '
+        '- nfs4 server:/export rw,vers=4.2'
+    )
+    assert repr(entry) == '60 server:/export mounted on /mnt/with space'
+    assert entry.mount_id == 60
+    assert entry.parent_id == 22
+    assert entry.devno == '0:70'
+    assert entry.root == '/'
+    assert entry.options == ['rw', 'relatime']
+    assert entry.shared is None
+    assert entry.master == 1
+    assert entry.propagate_from == 2
+    assert entry.unbindable
+    assert entry.filesystem == 'nfs4'
+    assert entry.super_options == ['rw', 'vers=4.2']
+    assert not entry.is_virtual
+
+    entry = MountInfoEntry('41 40 0:50 / /var/lib/kubelet/token rw shared:41 - tmpfs tmpfs rw')
+    assert entry.shared == 41
+    assert not entry.unbindable
+    assert entry.is_virtual
+
+
+@pytest.mark.parametrize('line', (
+    '',
+    '22 1 253:0 / / rw,relatime shared:1 ext4 /dev/sda1 rw',
+    'x 1 253:0 / / rw - ext4 /dev/sda1 rw',
+    '22 1 253 / / rw - ext4 /dev/sda1 rw',
+    '22 1 253:0 / / rw -',
+))
+def test_mountinfo_entry_invalid(line) -> None:
+    """
+    Test parsing invalid mountinfo lines
+    """
+    with pytest.raises(FilesystemError):
+        MountInfoEntry(line)
+
+
+def test_mountinfo_loader(tmp_path) -> None:
+    """
+    Test loading mountinfo file and mount tree
+    """
+    mountinfo = MountInfo(MOCK_MOUNTINFO)
+    assert repr(mountinfo) == f'mountinfo {MOCK_MOUNTINFO}'
+    assert len(mountinfo) == 21
+    assert mountinfo[1].mountpoint == '/'
+    assert mountinfo[-1].mountpoint == '/mnt/with space'
+
+    tree = mountinfo.tree
+    assert mountinfo.tree is tree
+    assert len(tree) == len(mountinfo)
+    mountinfo.update()
+    assert mountinfo.tree is not tree
+
+    with pytest.raises(FilesystemError):
+        MountInfo(tmp_path.joinpath('missing')).update()
+
+
+def test_mountinfo_diff() -> None:
+    """
+    Test comparing mountinfo entries by mount ID
+    """
+    with MOCK_MOUNTINFO.open('r', encoding='utf-8') as handle:
+        entries = parse_mountinfo(handle)
+    remounted = MountInfoEntry('30 22 8:2 / /boot ro,relatime shared:30 - ext2 /dev/sda2 ro')
+    diff = MountpointsDiff(entries, [remounted if item.mount_id == 30 else item for item in entries[:-1]])
+    assert [item.mountpoint for item in diff.removed] == ['/mnt/with space']
+    assert [new.options for _old, new in diff.remounted] == [['ro', 'relatime']]
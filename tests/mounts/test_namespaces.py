@@ -0,0 +1,110 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.namespaces module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts import Mountpoints
+from fs_toolkit.mounts.namespaces import MountNamespaces
+
+from ..conftest import (
+    MOCK_DATA,
+    MOCK_PROCFS_CONTAINER_NAMESPACE,
+    MOCK_PROCFS_HOST_NAMESPACE,
+    mock_platform_toolchain,
+    mock_statvfs,
+)
+
+
+def test_mountpoints_process(mock_procfs) -> None:
+    """
+    Test loading mountpoints for the mount namespace of a process
+    """
+    mountpoints = Mountpoints(pid=301, proc_path=mock_procfs)
+    assert [item.mountpoint for item in mountpoints] == ['/', '/proc', '/dev', '/data', '/var/log files']
+    data = mountpoints[3]
+    assert data.device == '/dev/mapper/buster--vg-var'
+    assert data.filesystem.name == 'ext4'
+    assert list(data.options) == ['rw', 'relatime']
+    assert data.usage.size == 4000
+    assert data.usage.used == 2000
+    assert data.usage.available == 1600
+    assert data.usage.percent == 56
+    assert data.usage.inodes_used == 750
+    assert mountpoints[0].is_virtual
+    assert mountpoints[0].usage.size is None
+
+    with pytest.raises(FilesystemError):
+        Mountpoints(pid=300, proc_path=mock_procfs).update()
+
+
+def test_mountpoints_process_escaped_paths(monkeypatch, mock_procfs) -> None:
+    """
+    Test mountpoints of a process with escaped backslashes in mountinfo are decoded once
+    """
+    paths = []
+
+    def record_statvfs(path):
+        paths.append(str(path))
+        return mock_statvfs(path)
+
+    monkeypatch.setattr('fs_toolkit.mounts.platform.linux.os.statvfs', record_statvfs)
+    mock_procfs.joinpath('302/mountinfo').write_bytes(MOCK_DATA.joinpath('linux/mountinfo_escaped').read_bytes())
+    mountpoints = Mountpoints(pid=302, proc_path=mock_procfs)
+    assert [item.mountpoint for item in mountpoints] == ['/mnt/a\\040b', '/srv/vis\\sname']
+    assert mountpoints[0].device == '/dev/disk\\x'
+    assert paths == [
+        str(mock_procfs.joinpath('302/root/mnt/a\\040b')),
+        str(mock_procfs.joinpath('302/root/srv/vis\\sname')),
+    ]
+
+
+def test_mountpoints_process_unsupported_platform(monkeypatch) -> None:
+    """
+    Test loading mountpoints for a process on other platforms than Linux
+    """
+    mock_platform_toolchain(monkeypatch, 'freebsd')
+    with pytest.raises(FilesystemError):
+        Mountpoints(pid=1)
+
+
+def test_mount_namespaces_group(mock_procfs) -> None:
+    """
+    Test grouping processes by mount namespace
+    """
+    namespaces = MountNamespaces(mock_procfs)
+    assert repr(namespaces) == f'mount namespaces in {mock_procfs}'
+    assert namespaces.get_pids() == [1, 200, 300, 301, 302, 400]
+    assert namespaces.group() == {
+        MOCK_PROCFS_HOST_NAMESPACE: [1, 200],
+        MOCK_PROCFS_CONTAINER_NAMESPACE: [300, 301, 302],
+    }
+    assert namespaces.get_namespace(999) is None
+
+    # Namespace links in other formats are identified by inode
+    path = mock_procfs.joinpath('400/ns/mnt')
+    path.symlink_to('../root')
+    assert namespaces.get_namespace(400) == path.stat().st_ino
+
+    with pytest.raises(FilesystemError):
+        MountNamespaces(mock_procfs.joinpath('missing')).get_pids()
+
+
+def test_mount_namespaces_collect(mock_procfs) -> None:
+    """
+    Test collecting mountpoint snapshots for mount namespaces
+    """
+    snapshots = MountNamespaces(mock_procfs, max_workers=2).collect()
+    assert sorted(snapshots) == [MOCK_PROCFS_HOST_NAMESPACE, MOCK_PROCFS_CONTAINER_NAMESPACE]
+    assert len(snapshots[MOCK_PROCFS_HOST_NAMESPACE]) == 21
+    container = snapshots[MOCK_PROCFS_CONTAINER_NAMESPACE]
+    assert container.platform == 'linux'
+    assert container.get_by_mountpoint('/data').used == 2000
+
+    assert MountNamespaces(mock_procfs).collect([300, 400]) == {}
+    assert list(MountNamespaces(mock_procfs).collect([302])) == [MOCK_PROCFS_CONTAINER_NAMESPACE]
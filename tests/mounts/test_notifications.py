@@ -0,0 +1,143 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.notifications module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts.notifications import (
+    REASON_AVAILABLE,
+    REASON_BAND,
+    REASON_INITIAL,
+    REASON_PERCENT,
+    REASON_RELATIVE,
+    UsageNotifier,
+    UsageThreshold,
+)
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+
+GIGABYTE = 1024 ** 3
+
+
+def mock_mountpoint(path: str, percent: int, available: int = 100 * GIGABYTE) -> MountpointSnapshot:
+    """
+    Return mountpoint snapshot with usage
+    """
+    return MountpointSnapshot('/dev/sda1', path, 'ext4', ('rw',), percent=percent, available=available)
+
+
+def test_usage_threshold_bands_hysteresis() -> None:
+    """
+    Test usage bands with hysteresis
+    """
+    threshold = UsageThreshold((90, 80), hysteresis=5)
+    assert threshold.bands == (80, 90)
+    assert threshold.get_band(None, 1) == 1
+    assert threshold.get_band(79) == 0
+    assert threshold.get_band(80) == 1
+    assert threshold.get_band(95) == 2
+    assert threshold.get_band(86, 2) == 2
+    assert threshold.get_band(84, 2) == 1
+    assert threshold.get_band(70, 2) == 0
+    with pytest.raises(FilesystemError):
+        UsageThreshold(hysteresis=-1)
+
+
+def test_usage_notifier_bands() -> None:
+    """
+    Test notifications are sent only when usage crosses a band
+    """
+    notifier = UsageNotifier(UsageThreshold((80, 90), hysteresis=5))
+    notifications = notifier.update([mock_mountpoint('/', 50), mock_mountpoint('/var', 85)])
+    assert [item.reason for item in notifications] == [REASON_INITIAL, REASON_INITIAL]
+    assert [item.band for item in notifications] == [0, 1]
+
+    assert notifier.update([mock_mountpoint('/', 55), mock_mountpoint('/var', 89)]) == []
+
+    notifications = notifier.update([mock_mountpoint('/', 55), mock_mountpoint('/var', 91)])
+    assert len(notifications) == 1
+    assert notifications[0].reason == REASON_BAND
+    assert notifications[0].previous_band == 1
+    assert notifications[0].band == 2
+    assert notifications[0].previous_percent == 85
+    assert notifications[0].percent == 91
+    assert repr(notifications[0]) == '/var band'
+
+    # Fluctuating around the band level does not send notifications
+    assert notifier.update([mock_mountpoint('/', 55), mock_mountpoint('/var', 88)]) == []
+    assert notifier.update([mock_mountpoint('/', 55), mock_mountpoint('/var', 90)]) == []
+    notifications = notifier.update([mock_mountpoint('/', 55), mock_mountpoint('/var', 84)])
+    assert [item.band for item in notifications] == [1]
+
+
+def test_usage_notifier_thresholds() -> None:
+    """
+    Test notifications with absolute and relative change thresholds
+    """
+    notifier = UsageNotifier(
+        UsageThreshold(percent=5),
+        {
+            '/srv': UsageThreshold(available=10 * GIGABYTE),
+            '/home': UsageThreshold(relative=0.2),
+        },
+        notify_initial=False,
+    )
+    assert notifier.get_threshold('/srv').available == 10 * GIGABYTE
+    assert notifier.update([
+        mock_mountpoint('/', 50),
+        mock_mountpoint('/srv', 50),
+        mock_mountpoint('/home', 50),
+        MountpointSnapshot('proc', '/proc', 'proc'),
+    ]) == []
+
+    notifications = notifier.update([
+        mock_mountpoint('/', 54),
+        mock_mountpoint('/srv', 50, 95 * GIGABYTE),
+        mock_mountpoint('/home', 50, 85 * GIGABYTE),
+    ])
+    assert notifications == []
+
+    notifications = notifier.update([
+        mock_mountpoint('/', 55),
+        mock_mountpoint('/srv', 50, 90 * GIGABYTE),
+        mock_mountpoint('/home', 50, 80 * GIGABYTE),
+    ])
+    assert [item.reason for item in notifications] == [REASON_PERCENT, REASON_AVAILABLE, REASON_RELATIVE]
+    assert notifications[1].available == 90 * GIGABYTE
+    assert notifications[1].previous_available == 100 * GIGABYTE
+
+
+def test_usage_notifier_removed_mountpoints(linux_mountpoints) -> None:
+    """
+    Test state of unmounted mountpoints is removed and loaded mountpoints can be used
+    """
+    notifier = UsageNotifier()
+    notifications = notifier.update(linux_mountpoints)
+    assert notifications
+    assert notifier.update(linux_mountpoints) == []
+    assert repr(notifier) == f'usage notifications for {len(notifications)} mountpoints'
+
+    assert notifier.update([]) == []
+    assert repr(notifier) == 'usage notifications for 0 mountpoints'
+    assert len(notifier.update(linux_mountpoints)) == len(notifications)
+    notifier.reset()
+    assert len(notifier.update(linux_mountpoints)) == len(notifications)
+
+
+def test_usage_notifier_missing_usage() -> None:
+    """
+    Test state of mountpoints is kept when a sample without usage data is skipped
+    """
+    notifier = UsageNotifier(UsageThreshold((80, 90), hysteresis=5))
+    assert [item.reason for item in notifier.update([mock_mountpoint('/var', 85)])] == [REASON_INITIAL]
+    assert notifier.update([MountpointSnapshot('/dev/sda1', '/var', 'ext4', ('rw',))]) == []
+    assert repr(notifier) == 'usage notifications for 1 mountpoints'
+    assert notifier.update([mock_mountpoint('/var', 86)]) == []
+
+    notifications = notifier.update([mock_mountpoint('/var', 91)])
+    assert [item.reason for item in notifications] == [REASON_BAND]
+    assert notifications[0].previous_percent == 85
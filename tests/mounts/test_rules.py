@@ -0,0 +1,110 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.rules module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts.columns import MountpointColumns
+from fs_toolkit.mounts.rules import Rule, RuleEvaluation, RuleSet
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+
+MOUNTPOINTS = (
+    MountpointSnapshot('/dev/sda1', '/', 'ext4', size=1000, used=950, available=50, percent=95),
+    MountpointSnapshot('proc', '/proc', 'proc', is_virtual=True),
+    MountpointSnapshot('/dev/sdb1', '/data', 'xfs', size=1000, used=850, available=150, percent=85),
+    MountpointSnapshot('/dev/sdc1', '/backup', 'zfs', size=1000, used=10, available=990, percent=1),
+    MountpointSnapshot('tmpfs', '/tmp', 'tmpfs', is_virtual=True, size=100, used=99, available=1, percent=99),
+)
+
+
+def get_mountpoints(matches):
+    """
+    Return mountpoint paths for matching mountpoints
+    """
+    return [item.mountpoint for item in matches]
+
+
+def test_rule_set_evaluate() -> None:
+    """
+    Test evaluating rules for mountpoints
+    """
+    rules = RuleSet({
+        'critical': 'percent >= 95 and not virtual',
+        'warning': '80 < percent < 95 and fs in (xfs, ext4)',
+        'virtual': 'virtual',
+        'not_xfs': 'fs != xfs',
+        'not_local': "filesystem not in ('ext4', 'xfs') or available < 10",
+        'unknown': 'fs == btrfs',
+        'missing': 'inodes_used >= 0 or percent != 1 and percent != 85',
+        'root': "mountpoint == '/' or device == tmpfs",
+    })
+    assert len(rules) == 8
+    assert repr(rules) == '8 mountpoint rules'
+    matches = {name: get_mountpoints(values) for name, values in rules.evaluate(MOUNTPOINTS).items()}
+    assert matches == {
+        'critical': ['/'],
+        'warning': ['/data'],
+        'virtual': ['/proc', '/tmp'],
+        'not_xfs': ['/', '/proc', '/backup', '/tmp'],
+        'not_local': ['/proc', '/backup', '/tmp'],
+        'unknown': [],
+        'missing': ['/', '/tmp'],
+        'root': ['/', '/tmp'],
+    }
+    masks = rules.masks(MountpointColumns(MOUNTPOINTS))
+    assert masks['critical'] == 0b00001
+    assert masks['virtual'] == 0b10010
+
+
+def test_rule_evaluation_caches_comparisons() -> None:
+    """
+    Test comparisons shared by rules are evaluated once
+    """
+    evaluation = RuleEvaluation(MountpointColumns(MOUNTPOINTS))
+    first = Rule('first', 'percent > 90 and virtual == False')
+    second = Rule('second', 'not (90 < percent) or virtual')
+    assert first.leaves == [('virtual', first.leaves[0][1], False), ('percent', first.leaves[1][1], 90)]
+    assert evaluation.evaluate(first) == 0b00001
+    assert evaluation.evaluate(second) == 0b11110
+    # pylint: disable=protected-access
+    assert len(evaluation.__leaves__) == 3
+    assert repr(first) == 'first: percent > 90 and virtual == False'
+
+
+def test_rule_set_loaded_mountpoints(bsd_mountpoints) -> None:
+    """
+    Test evaluating rules for loaded mountpoints
+    """
+    rules = RuleSet({'all': 'percent >= 0 or not virtual or virtual', 'full': 'percent >= 100'})
+    matches = rules.evaluate(bsd_mountpoints)
+    assert len(matches['all']) == len(bsd_mountpoints)
+    assert matches['full'] == [item for item in bsd_mountpoints if (item.usage.percent or 0) >= 100]
+
+
+@pytest.mark.parametrize('expression', (
+    'percent >',
+    'percent',
+    'percent > used',
+    'unknown > 10',
+    'percent > xfs',
+    "percent == 'ext4'",
+    'fs > ext4',
+    'fs in xfs',
+    'percent in (1, 2)',
+    'virtual == 1',
+    'virtual < True',
+    'percent is None',
+    'percent + 1 > 10',
+    '10 > 20',
+))
+def test_rule_invalid_expressions(expression) -> None:
+    """
+    Test invalid rule expressions
+    """
+    with pytest.raises(FilesystemError):
+        Rule('invalid', expression)
@@ -0,0 +1,127 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.snapshot module
+"""
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from fs_toolkit.mounts.snapshot import MountpointSnapshot, MountpointsSnapshot
+
+
+def count_mounted_bytes(snapshot: MountpointsSnapshot) -> int:
+    """
+    Count used bytes in a snapshot in a worker process
+    """
+    return sum(item.used for item in snapshot if item.used is not None)
+
+
+def test_mountpoint_snapshot_immutable() -> None:
+    """
+    Test mountpoint snapshot attributes can't be changed
+    """
+    snapshot = MountpointSnapshot('/dev/sda1', '/boot', 'ext4', ['rw', 'relatime'], size=100, used=10)
+    assert snapshot.options == ('rw', 'relatime')
+    assert snapshot.name == 'boot'
+    assert snapshot.available is None
+    with pytest.raises(AttributeError):
+        snapshot.device = '/dev/sda2'
+    with pytest.raises(AttributeError):
+        del snapshot.size
+    with pytest.raises(AttributeError):
+        snapshot.unexpected = True
+    with pytest.raises(AttributeError):
+        snapshot.io = True
+
+
+def test_mountpoint_snapshot_replace() -> None:
+    """
+    Test copying mountpoint snapshots with replaced values
+    """
+    snapshot = MountpointSnapshot('/dev/sda1', '/boot', 'ext4', ['rw'], is_virtual=False, size=100, used=10)
+    copy = snapshot.replace(io='rates', used=20)
+    assert copy is not snapshot
+    assert copy.io == 'rates' and snapshot.io is None
+    assert copy.used == 20 and snapshot.used == 10
+    assert copy.options == ('rw',) and copy.size == 100
+    assert snapshot.replace(nfs='stats') == snapshot
+    loaded = pickle.loads(pickle.dumps(copy))
+    assert loaded == copy and loaded.io == 'rates'
+    loaded = pickle.loads(pickle.dumps(MountpointsSnapshot('linux', [copy])))
+    assert loaded[0].io == 'rates'
+
+
+def test_mountpoints_snapshot(linux_mountpoints) -> None:
+    """
+    Test creating snapshots of linux mountpoints
+    """
+    snapshot = linux_mountpoints.snapshot()
+    assert isinstance(snapshot, MountpointsSnapshot)
+    assert snapshot.platform == 'linux'
+    assert len(snapshot) == len(linux_mountpoints)
+    for item, mountpoint in zip(snapshot, linux_mountpoints):
+        assert isinstance(item, MountpointSnapshot)
+        assert item.device == mountpoint.device
+        assert item.mountpoint == mountpoint.mountpoint
+        assert item.filesystem == mountpoint.filesystem.name
+        assert item.options == tuple(mountpoint.options)
+        assert item.is_virtual == mountpoint.is_virtual
+        assert item.size == mountpoint.usage.size
+        assert snapshot.get_by_mountpoint(item.mountpoint).mountpoint == item.mountpoint
+        assert not hasattr(item, '__dict__')
+    assert snapshot.get_by_mountpoint('/unexpected/path') is None
+    assert snapshot[0] is snapshot.__mountpoints__[0]
+
+
+def test_mountpoints_snapshot_pickle(linux_mountpoints) -> None:
+    """
+    Test pickling snapshots as values without the mountpoints loader
+    """
+    snapshot = linux_mountpoints.snapshot()
+    data = pickle.dumps(snapshot)
+    assert b'Mountpoints\n' not in data and b'LinuxMountPoint' not in data
+
+    loaded = pickle.loads(data)
+    assert loaded == snapshot
+    assert hash(loaded) == hash(snapshot)
+    assert loaded.created == snapshot.created
+    assert pickle.loads(pickle.dumps(snapshot[0])) == snapshot[0]
+    assert len(pickle.dumps(snapshot[0])) < len(pickle.dumps(snapshot[0].__values__())) + 100
+
+
+def test_mountpoint_snapshot_pickle_inodes(linux_mountpoints) -> None:
+    """
+    Test pickling snapshots of mountpoints with inode usage keeps the inode values
+    """
+    mountpoint = [item for item in linux_mountpoints if item.usage.inodes_used is not None][0]
+    item = mountpoint.snapshot()
+    assert item.inodes_used == mountpoint.usage.inodes_used
+    assert item.inodes_available == mountpoint.usage.inodes_available
+    assert item.inodes_percent == mountpoint.usage.inodes_percent
+
+    loaded = pickle.loads(pickle.dumps(item))
+    assert loaded == item
+    assert loaded.inodes_used == item.inodes_used
+    assert loaded.inodes_available == item.inodes_available
+    assert loaded.inodes_percent == item.inodes_percent
+    assert item != item.replace(inodes_used=item.inodes_used + 1)
+
+    snapshot = pickle.loads(pickle.dumps(linux_mountpoints.snapshot()))
+    loaded = snapshot.get_by_mountpoint(mountpoint.mountpoint)
+    assert loaded.inodes_used == mountpoint.usage.inodes_used
+    assert loaded.inodes_percent == mountpoint.usage.inodes_percent
+
+
+def test_mountpoints_snapshot_process_pool(linux_mountpoints) -> None:
+    """
+    Test sending snapshots to a process pool worker
+    """
+    snapshot = linux_mountpoints.snapshot()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(count_mounted_bytes, snapshot).result() == count_mounted_bytes(snapshot)
@@ -0,0 +1,217 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.store module
+"""
+import time
+
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mounts import Mountpoints
+from fs_toolkit.mounts.snapshot import MountpointSnapshot
+from fs_toolkit.mounts.store import RECORD_SIZE, STORE_HEADER, UsageStore
+
+from .test_loader import MockRunCommands
+
+START_TIME = 1_700_000_000.0
+LONG_MOUNTPOINT = '/srv/' + 'very-long-directory-name/' * 4 + 'data'
+
+
+def mock_samples(index: int):
+    """
+    Return mountpoint snapshots with usage for sample index
+    """
+    return [
+        MountpointSnapshot('/dev/sda1', '/', 'ext4', used=1000 + index, available=9000 - index, size=10000),
+        MountpointSnapshot('/dev/sdb1', LONG_MOUNTPOINT, 'xfs', used=index * 10, available=None),
+        MountpointSnapshot('proc', '/proc', 'proc'),
+    ]
+
+
+def test_usage_store_append_scan(tmp_path) -> None:
+    """
+    Test appending and scanning usage samples
+    """
+    store = UsageStore.for_host(tmp_path, 'test-host')
+    assert store.path == tmp_path.joinpath('test-host.usage')
+    for index in range(10):
+        assert store.append(mock_samples(index), timestamp=START_TIME + index * 60) == 2
+    assert store.append([], timestamp=START_TIME + 600) == 0
+    assert store.mountpoints == ['/', LONG_MOUNTPOINT]
+
+    # Header, 2 key records, 3 continuation records and 20 samples
+    assert store.path.stat().st_size == STORE_HEADER.size + 25 * RECORD_SIZE
+
+    samples = list(store.scan())
+    assert len(samples) == 20
+    assert samples[1].mountpoint == LONG_MOUNTPOINT
+    assert samples[1].available is None
+    assert samples[0].size == 10000
+
+    samples = list(store.scan(START_TIME + 120, START_TIME + 300, mountpoint='/'))
+    assert [sample.timestamp for sample in samples] == [START_TIME + index * 60 for index in (2, 3, 4)]
+    assert [sample.used for sample in samples] == [1002, 1003, 1004]
+    assert not list(store.scan(mountpoint='/unexpected'))
+    assert not list(store.scan(START_TIME + 6000))
+
+    with pytest.raises(FilesystemError):
+        store.append(mock_samples(0), timestamp=START_TIME)
+
+    # Keys are loaded when the file is opened again
+    store = UsageStore(store.path)
+    assert store.mountpoints == ['/', LONG_MOUNTPOINT]
+    assert len(list(store.scan(mountpoint=LONG_MOUNTPOINT))) == 10
+
+
+def test_usage_store_aggregate(tmp_path) -> None:
+    """
+    Test aggregating usage samples
+    """
+    store = UsageStore(tmp_path.joinpath('usage'))
+    for index in range(10):
+        store.append(mock_samples(index), timestamp=START_TIME + index * 60)
+    aggregates = store.aggregate(START_TIME, START_TIME + 300)
+    aggregate = aggregates['/']
+    assert aggregate.count == 5
+    assert aggregate.first == START_TIME
+    assert aggregate.last == START_TIME + 240
+    assert aggregate.minimum['used'] == 1000
+    assert aggregate.maximum['used'] == 1004
+    assert aggregate.mean('used') == 1002
+    assert aggregates[LONG_MOUNTPOINT].mean('available') is None
+    assert list(store.aggregate(mountpoint=LONG_MOUNTPOINT)) == [LONG_MOUNTPOINT]
+
+
+def test_usage_store_compact(tmp_path) -> None:
+    """
+    Test compacting old samples
+    """
+    store = UsageStore(tmp_path.joinpath('usage'))
+    for index in range(10):
+        store.append(mock_samples(index), timestamp=START_TIME + index * 60)
+    store.compact(START_TIME + 300, interval=180)
+    samples = list(store.scan(mountpoint='/'))
+    assert [sample.timestamp for sample in samples[:3]] == [
+        START_TIME - START_TIME % 180, START_TIME - START_TIME % 180 + 180, START_TIME + 300
+    ]
+    assert len(samples) == 7
+    assert store.aggregate()['/'].maximum['used'] == 1009
+
+    store.compact(START_TIME + 540)
+    assert [sample.used for sample in store.scan(mountpoint='/')] == [1009]
+    store.append(mock_samples(10), timestamp=START_TIME + 600)
+    assert len(list(store.scan())) == 4
+
+    # Keys are kept when all samples are removed
+    store.compact(START_TIME + 6000)
+    assert not list(store.scan())
+    assert UsageStore(store.path).mountpoints == ['/', LONG_MOUNTPOINT]
+
+
+def test_usage_store_compact_file_mode(monkeypatch, tmp_path) -> None:
+    """
+    Test compacting keeps mode, owner and group of the store file
+    """
+    store = UsageStore(tmp_path.joinpath('usage'))
+    store.append(mock_samples(0), timestamp=START_TIME)
+    store.path.chmod(0o644)
+    store.compact(START_TIME + 60)
+    assert store.path.stat().st_mode & 0o777 == 0o644
+
+    store.path.chmod(0o640)
+    owners = []
+    monkeypatch.setattr('fs_toolkit.mounts.store.os.chown', lambda *args: owners.append(args[1:]))
+    store.compact(START_TIME + 60)
+    assert store.path.stat().st_mode & 0o777 == 0o640
+    assert owners == [(store.path.stat().st_uid, store.path.stat().st_gid)]
+
+
+def test_usage_store_concurrent_instances(tmp_path) -> None:
+    """
+    Test readers and writers see keys added and samples compacted by other instances
+    """
+    path = tmp_path.joinpath('usage')
+    writer = UsageStore(path)
+    writer.append(mock_samples(0)[:1], timestamp=START_TIME)
+    reader = UsageStore(path, readonly=True)
+    other = UsageStore(path)
+    assert reader.mountpoints == ['/']
+
+    writer.append(mock_samples(1), timestamp=START_TIME + 60)
+    assert [sample.mountpoint for sample in reader.scan()] == ['/', '/', LONG_MOUNTPOINT]
+    assert len(list(reader.scan(mountpoint=LONG_MOUNTPOINT))) == 1
+    assert list(reader.aggregate()) == ['/', LONG_MOUNTPOINT]
+
+    # Compacting keeps key IDs valid for other instances
+    writer.compact(START_TIME + 60)
+    assert [sample.mountpoint for sample in reader.scan()] == ['/', LONG_MOUNTPOINT]
+    other.append([MountpointSnapshot('/dev/sdc1', '/srv', 'xfs', used=1, available=2)], timestamp=START_TIME + 120)
+    with pytest.raises(FilesystemError):
+        other.append(mock_samples(2), timestamp=START_TIME + 60)
+    assert [sample.mountpoint for sample in writer.scan()] == ['/', LONG_MOUNTPOINT, '/srv']
+    assert [sample.mountpoint for sample in reader.scan(start=START_TIME + 120)] == ['/srv']
+    assert UsageStore(path, readonly=True).mountpoints == ['/', LONG_MOUNTPOINT, '/srv']
+
+
+def test_usage_store_partial_record(tmp_path) -> None:
+    """
+    Test partially written records are removed and invalid files are detected
+    """
+    path = tmp_path.joinpath('usage')
+    store = UsageStore(path)
+    store.append(mock_samples(0), timestamp=START_TIME)
+    with path.open('ab') as handle:
+        handle.write(b'\1' * 10)
+    size = path.stat().st_size
+
+    # Read only instances don't remove the partial record
+    store = UsageStore(path, readonly=True)
+    assert len(list(store.scan())) == 2
+    assert path.stat().st_size == size
+    with pytest.raises(FilesystemError):
+        store.append(mock_samples(1), timestamp=START_TIME + 60)
+    with pytest.raises(FilesystemError):
+        store.compact(START_TIME)
+
+    store = UsageStore(path)
+    assert len(list(store.scan())) == 2
+    assert path.stat().st_size == size - 10
+
+    path = tmp_path.joinpath('missing')
+    with pytest.raises(FilesystemError):
+        UsageStore(path, readonly=True)
+    assert not path.exists()
+
+    path = tmp_path.joinpath('invalid')
+    path.write_bytes(b'X' * 100)
+    with pytest.raises(FilesystemError):
+        UsageStore(path)
+
+
+# pylint: disable=unused-argument
+def test_usage_store_mountpoints(mock_platform_data, monkeypatch, tmp_path) -> None:
+    """
+    Test mountpoints loader writing usage samples to usage store
+    """
+    monkeypatch.setattr('fs_toolkit.mounts.loader.run_command', MockRunCommands())
+    store = UsageStore(tmp_path.joinpath('usage'))
+    mountpoints = Mountpoints(usage_store=store)
+    mountpoints.update()
+    with_usage = [item for item in mountpoints if item.usage.used is not None]
+    assert len(list(store.scan())) == len(with_usage)
+    assert list(store.scan())[0].inodes_used == with_usage[0].usage.inodes_used
+
+    assert mountpoints.usage_store_error is None
+
+    # Store errors from samples older than the latest sample don't fail loading mountpoints
+    store.append(mountpoints, timestamp=time.time() + 3600)
+    items = mountpoints.__items__
+    mountpoints.update()
+    assert isinstance(mountpoints.usage_store_error, FilesystemError)
+    assert mountpoints.__items__ is not items
+    assert len(mountpoints) == len(items)
+    assert len(list(store.scan())) == 2 * len(with_usage)
@@ -0,0 +1,115 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mounts.tree module
+"""
+from fs_toolkit.mounts.mountinfo import MountInfoEntry, parse_mountinfo
+from fs_toolkit.mounts.tree import MountTree
+
+from ..conftest import MOCK_DATA
+
+
+def load_mount_tree() -> MountTree:
+    """
+    Return mount tree for mock mountinfo data
+    """
+    with MOCK_DATA.joinpath('linux/mountinfo').open('r', encoding='utf-8') as handle:
+        return MountTree(parse_mountinfo(handle))
+
+
+def get_mount_ids(items):
+    """
+    Return mount IDs for mounts
+    """
+    return [item.mount_id for item in items]
+
+
+def test_mount_tree_structure() -> None:
+    """
+    Test parent and child links of the mount tree
+    """
+    tree = load_mount_tree()
+    assert repr(tree) == 'tree of 21 mounts'
+    assert get_mount_ids(tree.roots) == [1]
+    assert 40 in tree
+    assert 99 not in tree
+    assert tree.get(99) is None
+
+    kubelet = tree.get(40)
+    assert tree.get_parent(kubelet).mount_id == 32
+    assert tree.get_parent(tree.get(1)) is None
+    assert get_mount_ids(tree.get_children(kubelet)) == [41, 42, 43]
+    assert get_mount_ids(tree.get_ancestors(kubelet)) == [32, 22, 1]
+
+    walked = get_mount_ids(tree)
+    assert len(walked) == len(tree)
+    assert walked[:4] == [1, 22, 23, 24]
+    assert get_mount_ids(tree.walk(tree.get(30))) == [30, 31]
+
+
+def test_mount_tree_shadowed() -> None:
+    """
+    Test detecting overmounted mounts
+    """
+    tree = load_mount_tree()
+    assert tree.shadowed == {1, 50, 53}
+    assert tree.hidden == {1, 50, 51, 53}
+    assert tree.is_shadowed(tree.get(50))
+    assert not tree.is_shadowed(tree.get(51))
+    assert not tree.is_visible(tree.get(51))
+    assert tree.is_visible(tree.get(52))
+
+    assert tree.get_by_mountpoint('/').mount_id == 22
+    assert tree.get_by_mountpoint('/mnt/data').mount_id == 52
+    assert tree.get_by_mountpoint('/mnt/stack').device == 'second'
+    assert tree.get_by_mountpoint('/mnt/data/inner') is None
+    assert tree.get_by_mountpoint('/missing') is None
+    assert get_mount_ids(tree.get_mounts_by_mountpoint('/mnt/stack')) == [53, 54]
+
+
+def test_mount_tree_subtree() -> None:
+    """
+    Test querying mounts under a path
+    """
+    tree = load_mount_tree()
+    assert get_mount_ids(tree.subtree('/var/lib/kubelet')) == [40, 41, 42, 43]
+    assert get_mount_ids(tree.subtree('/var/lib/kubelet/pods/b/')) == [42, 43]
+    assert get_mount_ids(tree.subtree('/var/lib')) == [40, 41, 42, 43, 44]
+    assert get_mount_ids(tree.subtree('/mnt/data')) == [52]
+    assert get_mount_ids(tree.subtree('/mnt/data', include_hidden=True)) == [50, 51, 52]
+    assert not tree.subtree('/srv')
+    assert len(tree.subtree('/')) == len(tree) - len(tree.hidden)
+
+
+def test_mount_tree_peer_groups() -> None:
+    """
+    Test propagation peer group indexes
+    """
+    tree = load_mount_tree()
+    assert get_mount_ids(tree.get_peers(tree.get(40))) == [43]
+    assert not tree.get_peers(tree.get(44))
+    assert not tree.get_peers(tree.get(41))
+    assert get_mount_ids(tree.get_peer_group(40)) == [40, 43]
+    assert get_mount_ids(tree.get_slaves(50)) == [54]
+    assert get_mount_ids(tree.get_slaves(1)) == [60]
+    assert not tree.get_slaves(99)
+    assert get_mount_ids(tree.peer_groups[40]) == [40, 43]
+
+
+def test_mount_tree_missing_parents() -> None:
+    """
+    Test mounts with parents outside the mounts are roots
+    """
+    tree = MountTree([
+        MountInfoEntry('100 10 0:1 / /a rw - tmpfs tmpfs rw'),
+        MountInfoEntry('101 100 0:2 / /a/b rw - tmpfs tmpfs rw'),
+        MountInfoEntry('102 11 0:3 / /c rw - tmpfs tmpfs rw'),
+        MountInfoEntry('103 101 0:4 / /a/b rw - tmpfs tmpfs rw'),
+        MountInfoEntry('104 103 0:5 / /a/b/c rw - tmpfs tmpfs rw'),
+    ])
+    assert get_mount_ids(tree.roots) == [100, 102]
+    assert tree.hidden == {101}
+    assert get_mount_ids(tree.subtree('/a')) == [100, 103, 104]
@@ -0,0 +1,101 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.devices module
+"""
+from pathlib import Path
+
+from fs_toolkit.devices import BlockDevices, decode_udev_name, encode_udev_name
+from fs_toolkit.reconcile import Reconciliation
+
+from .conftest import mock_environment_fstab, mock_environment_mountpoints
+
+
+def test_decode_udev_name() -> None:
+    """
+    Test decoding udev escaped link names
+    """
+    assert decode_udev_name('plain') == 'plain'
+    assert decode_udev_name('My\\x20Data') == 'My Data'
+    assert decode_udev_name('\\xc3\\xa4') == 'ä'
+
+
+def test_encode_udev_name() -> None:
+    """
+    Test encoding link names with udev escapes
+    """
+    assert encode_udev_name('plain-name_1.0') == 'plain-name_1.0'
+    assert encode_udev_name('My Data') == 'My\\x20Data'
+    assert encode_udev_name('a/b\\c') == 'a\\x2fb\\x5cc'
+    assert encode_udev_name('ä') == 'ä'
+    assert decode_udev_name(encode_udev_name('EFI System')) == 'EFI System'
+
+
+def test_block_devices_missing_paths(tmp_path) -> None:
+    """
+    Test loading block devices from missing sysfs and /dev directories
+    """
+    devices = BlockDevices(dev_path=tmp_path, sys_path=tmp_path)
+    assert len(devices) == 0
+    assert devices.get_by_uuid('0EDC-E243') is None
+
+
+def test_block_devices_index(block_devices) -> None:
+    """
+    Test block device lookups by identifiers, device numbers and paths
+    """
+    assert list(block_devices) == ['dm-0', 'sda', 'sda1', 'sda2', 'sr0']
+
+    device = block_devices.get_by_uuid('0EDC-E243')
+    assert repr(device) == '/dev/sda1'
+    assert device.devno == '8:1'
+    assert device.size == 1048576 * 512
+    assert device.partition_uuid == '7d1c4c5a-01'
+    assert device.partition_label == 'EFI System'
+    assert block_devices.get_by_partition_uuid('7d1c4c5a-01') is device
+    assert block_devices.get_by_partition_label('EFI System') is device
+    assert block_devices.get_by_devno((8, 1)) is device
+    assert block_devices.get_by_devno('8:1') is device
+    assert block_devices.get_by_path('/dev/sda1') is device
+
+    assert block_devices.get_by_label('My Data').name == 'sda2'
+    assert block_devices.get_by_path('/dev/data').name == 'sda2'
+    assert block_devices.get_by_path('/dev/mapper/buster--vg-root').name == 'dm-0'
+    assert block_devices.get_by_path('/other/sda1') is None
+    assert block_devices['sr0'].size is None
+    assert block_devices['sr0'].devno == '11:0'
+    assert block_devices['sda'].devno == '8:0'
+
+
+def test_block_devices_resolve(block_devices) -> None:
+    """
+    Test resolving fstab fs_spec values with block devices
+    """
+    assert block_devices.resolve('UUID=0EDC-E243') == '/dev/sda1'
+    assert block_devices.resolve('LABEL=MyRootPartition') == '/dev/dm-0'
+    assert block_devices.resolve('PARTLABEL=EFI System') == '/dev/sda1'
+    assert block_devices.resolve('LABEL=missing') is None
+    assert block_devices.resolve('tmpfs') is None
+    assert block_devices.normalize('/dev/mapper/buster--vg-root') == '/dev/dm-0'
+    assert block_devices.normalize('/dev/unknown') == '/dev/unknown'
+    assert block_devices.normalize('tmpfs') == 'tmpfs'
+
+
+def test_block_devices_reconcile(monkeypatch, block_devices) -> None:
+    """
+    Test reconciling fstab with mounts using block devices as resolver
+    """
+    fstab = mock_environment_fstab(monkeypatch, 'linux', 'linux')
+    mountpoints = mock_environment_mountpoints(monkeypatch, 'linux', 'linux')
+    result = Reconciliation(fstab, mountpoints, block_devices)
+    assert result.device_changed == []
+    assert [drift.entry.mountpoint for drift in result.options_changed] == [Path('/boot/efi')]
+
+    # Escaped labels are resolved with the decoded label
+    fstab.add_entry('LABEL=My\\040Data /srv/data ext4 defaults 0 2')
+    result = Reconciliation(fstab, mountpoints, block_devices)
+    assert [drift.mountpoint.mountpoint for drift in result.moved] == ['/boot']
+    assert not result.not_mounted
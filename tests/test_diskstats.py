@@ -0,0 +1,119 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.diskstats module
+"""
+import pytest
+
+from fs_toolkit.diskstats import DiskStats, parse_diskstats
+from fs_toolkit.exceptions import FilesystemError
+
+from .conftest import MOCK_DATA, mock_environment_mountpoints
+
+
+# pylint: disable=too-few-public-methods
+class MockDiskStatsFiles:
+    """
+    Mock monotonic clock switching diskstats to the next recorded sample on each call
+    """
+    def __init__(self, tmp_path, *filenames: str) -> None:
+        self.path = tmp_path.joinpath('diskstats')
+        self.filenames = list(filenames)
+        self.timestamp = 100.0
+
+    def __call__(self) -> float:
+        self.path.write_bytes(MOCK_DATA.joinpath('linux', self.filenames.pop(0)).read_bytes())
+        self.timestamp += 10.0
+        return self.timestamp
+
+
+def test_parse_diskstats() -> None:
+    """
+    Test parsing diskstats lines in old and new kernel formats
+    """
+    counters = parse_diskstats(MOCK_DATA.joinpath('linux/diskstats').read_bytes() + b'invalid line\n')
+    assert list(counters) == ['7:0', '8:0', '8:1', '8:2', '11:0', '253:0', '253:1']
+    item = counters['253:0']
+    assert repr(item) == '253:0 dm-0'
+    assert item.reads == 9000
+    assert item.sectors_written == 600000
+    assert item.weighted_io_time == 14000
+    assert counters['11:0'].io_time == 8
+    assert not parse_diskstats(b'   8 0 sda x 0 0 0 0 0 0 0 0 0 0 0\n')
+
+
+def test_diskstats_rates(tmp_path) -> None:
+    """
+    Test calculating I/O rates between samples
+    """
+    clock = MockDiskStatsFiles(tmp_path, 'diskstats', 'diskstats_next')
+    diskstats = DiskStats(clock.path, clock=clock)
+    assert diskstats.update() == {}
+    rates = diskstats.update()
+
+    # Removed loop device and dm-1 with counters going backwards are skipped
+    assert sorted(rates) == ['11:0', '253:0', '8:0', '8:1', '8:2']
+    assert repr(diskstats) == 'I/O rates for 5 devices'
+    item = diskstats.get_rates((253, 0))
+    assert item.interval == 10.0
+    assert item.read_iops == 50.0
+    assert item.write_iops == 100.0
+    assert item.read_bytes == 1048576.0
+    assert item.write_bytes == 2097152.0
+    assert item.utilization == 25.0
+    assert repr(item) == 'dm-0 read 50.0 IOPS write 100.0 IOPS'
+    assert diskstats.get_rates('8:1').read_iops == 0
+    assert diskstats.get_rates('9:9') is None
+
+
+def test_diskstats_read_error(tmp_path) -> None:
+    """
+    Test reading missing diskstats file
+    """
+    with pytest.raises(FilesystemError):
+        DiskStats(tmp_path.joinpath('missing')).update()
+
+
+def test_diskstats_join_mountpoints(monkeypatch, tmp_path, block_devices) -> None:
+    """
+    Test joining I/O rates to mountpoints by device number
+    """
+    clock = MockDiskStatsFiles(tmp_path, 'diskstats', 'diskstats_next')
+    diskstats = DiskStats(clock.path, clock=clock)
+    diskstats.update()
+    diskstats.update()
+
+    mountpoints = mock_environment_mountpoints(monkeypatch, 'linux', 'linux')
+    snapshot = mountpoints.snapshot()
+    joined = diskstats.join(mountpoints, block_devices)
+    assert {item.mountpoint: item.io.name for item in joined} == {
+        '/': 'dm-0',
+        '/boot': 'sda2',
+        '/boot/efi': 'sda1',
+    }
+    boot = [item for item in joined if item.mountpoint == '/boot'][0]
+    assert boot.io.read_bytes == 40960.0
+    assert boot.io.write_iops == 1.0
+    assert boot.io.utilization == 1.0
+    assert all(item.io is None for item in mountpoints if item not in joined)
+
+    assert mountpoints.snapshot().get_by_mountpoint('/boot').io is boot.io
+
+    # Snapshots are not modified and new snapshots are returned
+    joined = diskstats.join(snapshot, block_devices)
+    assert [item.mountpoint for item in joined] == ['/', '/boot', '/boot/efi']
+    assert joined[1].io.read_bytes == 40960.0
+    assert joined[1] == snapshot.get_by_mountpoint('/boot')
+    assert all(item.io is None for item in snapshot)
+
+
+def test_diskstats_device_number(tmp_path) -> None:
+    """
+    Test detecting device numbers without block device inventory
+    """
+    assert DiskStats.get_device_number('tmpfs') is None
+    assert DiskStats.get_device_number(str(tmp_path.joinpath('missing'))) is None
+    assert DiskStats.get_device_number(str(tmp_path)) is None
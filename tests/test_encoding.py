@@ -0,0 +1,72 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.encoding module
+"""
+import pytest
+
+from fs_toolkit.encoding import decode_path, encode_path
+from fs_toolkit.mounts import Mountpoints
+from fs_toolkit.mounts.platform.linux import LinuxMountPoint
+
+from .conftest import mock_platform_toolchain
+
+DECODED_PATHS = {
+    '/mnt/plain': '/mnt/plain',
+    '/dir\\040with\\040spaces': '/dir with spaces',
+    '/dir\\011with\\011tabs': '/dir\twith\ttabs',
+    '/back\\134slash': '/back\\slash',
+    '/back\\\\slash': '/back\\slash',
+    '/vis\\sspace\\ttab\\nnewline': '/vis space\ttab\nnewline',
+    '/utf8/\\303\\244': '/utf8/ä',
+    '/meta\\M-a': '/meta\udce1',
+    '/control\\^A\\^?': '/control\x01\x7f',
+    '/meta-control\\M^A': '/meta-control\udc81',
+    '/hidden\\$': '/hidden',
+    '/nul\\0': '/nul\x00',
+    '/unknown\\q': '/unknown\\q',
+    '/trailing\\': '/trailing\\',
+}
+ENCODED_PATHS = {
+    '/mnt/plain': '/mnt/plain',
+    '/dir with spaces': '/dir\\040with\\040spaces',
+    '/dir\twith\ttabs': '/dir\\011with\\011tabs',
+    '/new\nline': '/new\\012line',
+    '/back\\slash': '/back\\134slash',
+    '/utf8/ä': '/utf8/ä',
+}
+
+
+@pytest.mark.parametrize('value,expected', DECODED_PATHS.items())
+def test_decode_path(value, expected) -> None:
+    """
+    Test decoding escaped paths
+    """
+    assert decode_path(value) == expected
+
+
+@pytest.mark.parametrize('value,expected', ENCODED_PATHS.items())
+def test_encode_path(value, expected) -> None:
+    """
+    Test encoding paths with octal escapes and decoding encoded value
+    """
+    assert encode_path(value) == expected
+    assert decode_path(encode_path(value)) == value
+
+
+def test_mountpoint_decoded_paths(monkeypatch) -> None:
+    """
+    Test mountpoint device and path are decoded when mount command output is parsed and
+    stored as given when mountpoint is created
+    """
+    mock_platform_toolchain(monkeypatch, 'linux')
+    match = Mountpoints().__get_mountpoint_data__(['/dev/disk\\040a on /mnt/with\\040space type ext4 (rw)'])[0]
+    assert match['device'] == '/dev/disk a'
+    assert match['mountpoint'] == '/mnt/with space'
+
+    mountpoint = LinuxMountPoint(None, '/dev/disk\\040a', '/mnt/a\\134b', 'ext4', 'rw')
+    assert mountpoint.device == '/dev/disk\\040a'
+    assert mountpoint.mountpoint == '/mnt/a\\134b'
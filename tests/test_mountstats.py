@@ -0,0 +1,108 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.mountstats module
+"""
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.mountstats import MountStats, parse_mountstats
+
+from .conftest import MOCK_DATA, mock_environment_mountpoints
+
+MOCK_MOUNTSTATS = MOCK_DATA.joinpath('linux/mountstats')
+MOCK_MOUNTSTATS_NEXT = MOCK_DATA.joinpath('linux/mountstats_next')
+
+
+def test_parse_mountstats() -> None:
+    """
+    Test parsing NFS statistics from mountstats
+    """
+    with MOCK_MOUNTSTATS.open('rb') as handle:
+        stats = list(parse_mountstats(handle))
+    assert [item.mountpoint for item in stats] == ['/code', '/work', '/mnt/with space']
+    item = stats[0]
+    assert repr(item) == '192.168.192.1:/Volumes/Code mounted on /code with 4 operations'
+    assert item.filesystem == 'nfs'
+    assert item.age == 86400
+    assert 'ACCESS' not in item.operations
+
+    getattr_counters = item.operations['GETATTR']
+    assert repr(getattr_counters) == 'GETATTR 1000 operations'
+    assert getattr_counters.retransmissions == 2
+    assert getattr_counters.average_rtt == 3.0
+    assert getattr_counters.average_execute_time == 4.0
+    assert item.operations['NULL'].average_rtt is None
+    assert item.retransmissions == 3
+    assert item.major_timeouts == 1
+    assert item.average_rtt == pytest.approx(6500 / 1300)
+    assert stats[2].filesystem == 'nfs4'
+
+
+def test_parse_mountstats_selected_mountpoints() -> None:
+    """
+    Test skipping mountpoints which are not requested
+    """
+    with MOCK_MOUNTSTATS.open('rb') as handle:
+        stats = list(parse_mountstats(handle, {'/work', '/boot'}))
+    assert [item.mountpoint for item in stats] == ['/work']
+    assert stats[0].operations['GETATTR'].operations == 50
+    assert not list(parse_mountstats([b'device invalid line\n', b'\tage:\t10\n']))
+
+
+def test_mountstats_update_delta(tmp_path) -> None:
+    """
+    Test counter differences between refreshes
+    """
+    path = tmp_path.joinpath('mountstats')
+    path.write_bytes(MOCK_MOUNTSTATS.read_bytes())
+    mountstats = MountStats(path)
+    stats = mountstats.update()
+    assert repr(mountstats) == 'NFS statistics for 3 mountpoints'
+    assert stats['/code'].delta is None
+
+    path.write_bytes(MOCK_MOUNTSTATS_NEXT.read_bytes())
+    stats = mountstats.update()
+    delta = stats['/code'].delta
+    assert delta.age == 60
+    assert sorted(delta.operations) == ['GETATTR', 'NULL', 'READ', 'WRITE']
+    assert delta.operations['GETATTR'].operations == 100
+    assert delta.operations['GETATTR'].retransmissions == 10
+    assert delta.operations['READ'].average_rtt == 20.0
+    assert delta.operations['WRITE'].average_rtt is None
+    assert delta.average_rtt == pytest.approx(2400 / 200)
+    assert delta.major_timeouts == 2
+
+    # Remounted filesystem resets counters
+    assert stats['/work'].delta is None
+    assert stats['/mnt/with space'].delta.operations['READ'].average_rtt == 10.0
+
+    with pytest.raises(FilesystemError):
+        MountStats(tmp_path.joinpath('missing')).update()
+
+
+def test_mountstats_join_mountpoints(monkeypatch, tmp_path) -> None:
+    """
+    Test joining NFS statistics to mountpoints
+    """
+    mountpoints = mock_environment_mountpoints(monkeypatch, 'linux', 'linux')
+    snapshot = mountpoints.snapshot()
+    path = tmp_path.joinpath('mountstats')
+    path.write_bytes(MOCK_MOUNTSTATS.read_bytes())
+    mountstats = MountStats(path)
+
+    stats = mountstats.update([item for item in mountpoints if item.filesystem.name == 'nfs'])
+    assert list(stats) == ['/code']
+    joined = mountstats.join(mountpoints)
+    assert [item.mountpoint for item in joined] == ['/code']
+    assert joined[0].nfs.operations['READ'].bytes_received == 8200000
+    assert all(item.nfs is None for item in mountpoints if item not in joined)
+
+    # Snapshots are not modified and new snapshots are returned
+    joined = mountstats.join(snapshot)
+    assert joined[0].nfs.operations['READ'].bytes_received == 8200000
+    assert joined[0] is not snapshot.get_by_mountpoint('/code')
+    assert snapshot.get_by_mountpoint('/code').nfs is None
@@ -0,0 +1,107 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.reconcile module
+"""
+from pathlib import Path
+from typing import Dict, Optional
+
+from fs_toolkit.reconcile import (
+    DeviceResolver,
+    DeviceDrift,
+    MountpointDrift,
+    NotInFstabDrift,
+    NotMountedDrift,
+    OptionsDrift,
+    Reconciliation,
+)
+
+from .conftest import mock_environment_fstab, mock_environment_mountpoints
+
+MOCK_SPEC_DEVICES = {
+    'LABEL=MyRootPartition': '/dev/mapper/buster--vg-root',
+    'UUID=0EDC-E243': '/dev/sda1',
+}
+
+
+class MockDeviceResolver(DeviceResolver):
+    """
+    Device resolver with static fs_spec to device mapping
+    """
+    def __init__(self, devices: Dict[str, str]) -> None:
+        super().__init__()
+        self.devices = devices
+
+    def resolve(self, spec: str) -> Optional[str]:
+        return self.devices.get(spec, None)
+
+
+def test_device_resolver(tmp_path) -> None:
+    """
+    Test resolving fs_spec values with /dev/disk symbolic links
+    """
+    tmp_path.joinpath('sda1').touch()
+    tmp_path.joinpath('by-uuid').mkdir()
+    tmp_path.joinpath('by-uuid', '0EDC-E243').symlink_to('../sda1')
+    resolver = DeviceResolver(tmp_path)
+    assert resolver.resolve('UUID=0EDC-E243') == str(tmp_path.joinpath('sda1'))
+    assert resolver.resolve('LABEL=missing') is None
+    assert resolver.resolve('tmpfs') is None
+    assert resolver.resolve(str(tmp_path.joinpath('by-uuid', '0EDC-E243'))) == str(tmp_path.joinpath('sda1'))
+    assert resolver.normalize('/dev/missing-device') == '/dev/missing-device'
+    assert resolver.normalize('tmpfs') == 'tmpfs'
+
+    tmp_path.joinpath('by-label').mkdir()
+    tmp_path.joinpath('by-label', 'My\\x20Data').symlink_to('../sda1')
+    assert resolver.resolve('LABEL=My Data') == str(tmp_path.joinpath('sda1'))
+
+
+def test_reconcile_linux(monkeypatch) -> None:
+    """
+    Test reconciling mock Linux fstab with mock mounts
+    """
+    fstab = mock_environment_fstab(monkeypatch, 'linux', 'linux')
+    mountpoints = mock_environment_mountpoints(monkeypatch, 'linux', 'linux')
+    result = Reconciliation(fstab, mountpoints, MockDeviceResolver(MOCK_SPEC_DEVICES))
+    assert isinstance(repr(result), str)
+
+    assert result.not_mounted == []
+    assert result.device_changed == []
+    assert [str(drift.mountpoint.mountpoint) for drift in result.not_in_fstab] == [
+        '/boot', '/opt/gitlab', '/home', '/tmp', '/var', '/var/lib/docker', '/code'
+    ]
+    assert len(result.options_changed) == 1
+    drift = result.options_changed[0]
+    assert drift.entry.mountpoint == Path('/boot/efi')
+    assert drift.missing == ['umask=0077']
+    assert drift.unexpected == []
+
+    result = Reconciliation(fstab, mountpoints, MockDeviceResolver({}), include_noauto=True)
+    assert [str(drift.entry.mountpoint) for drift in result.not_mounted] == ['/media/cdrom0']
+
+
+def test_reconcile_drifts(monkeypatch) -> None:
+    """
+    Test reconciling fstab entries with moved, changed and missing mounts
+    """
+    fstab = mock_environment_fstab(monkeypatch, 'linux', 'linux')
+    mountpoints = mock_environment_mountpoints(monkeypatch, 'linux', 'linux')
+    fstab.add_entry('/dev/mapper/data-gitlab /srv/gitlab xfs defaults 0 2')
+    fstab.add_entry('/dev/sdb1 /home ext4 defaults 0 2')
+    fstab.add_entry('/dev/sdc1 /srv/data ext4 defaults 0 2')
+    fstab.add_entry('192.168.192.1:/Volumes/Code /code nfs ro,hard 0 0')
+    result = Reconciliation(fstab, mountpoints, MockDeviceResolver(MOCK_SPEC_DEVICES))
+
+    assert [type(drift) for drift in result.drifts[1:]] == [
+        MountpointDrift, DeviceDrift, NotMountedDrift, OptionsDrift,
+        NotInFstabDrift, NotInFstabDrift, NotInFstabDrift, NotInFstabDrift,
+    ]
+    assert result.moved[0].mountpoint.mountpoint == '/opt/gitlab'
+    assert result.device_changed[0].expected == '/dev/sdb1'
+    assert result.device_changed[0].mountpoint.device == '/dev/mapper/buster--vg-home'
+    assert str(result.not_mounted[0].entry.mountpoint) == '/srv/data'
+    assert result.options_changed[1].missing == ['ro']
+    assert '/opt/gitlab' not in [drift.mountpoint.mountpoint for drift in result.not_in_fstab]
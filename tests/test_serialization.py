@@ -0,0 +1,144 @@
+#
+# Copyright (C) 2020-2023 by Ilkka Tuohela <hile@iki.fi>
+#
+# SPDX-License-Identifier: BSD-3-Clause
+#
+"""
+Unit tests for fs_toolkit.serialization module
+"""
+import json
+
+import pytest
+
+from fs_toolkit.exceptions import FilesystemError
+from fs_toolkit.fstab.platform.base import FstabComment, FstabEntry
+from fs_toolkit.serialization import (
+    FstabSnapshotFile,
+    MountpointsSnapshotFile,
+    NONE_VALUE,
+    SNAPSHOT_HEADER,
+    SNAPSHOT_VERSION,
+    dump,
+    dumps,
+    export_json,
+    load,
+)
+
+
+def test_serialization_mountpoints_dump_load(linux_mountpoints, tmp_path) -> None:
+    """
+    Test writing and loading binary mountpoints snapshots
+    """
+    path = tmp_path.joinpath('mounts.snapshot')
+    snapshot = linux_mountpoints.snapshot()
+    dump(snapshot, path)
+
+    with load(path) as loaded:
+        assert isinstance(loaded, MountpointsSnapshotFile)
+        assert loaded.platform == 'linux'
+        assert loaded.source is None
+        assert len(loaded) == len(snapshot)
+        assert loaded.snapshot() == snapshot
+        assert loaded[-1] == snapshot[-1]
+        assert loaded[:2] == list(snapshot[:2])
+        assert loaded.created == snapshot.created
+        assert isinstance(loaded.column('size'), memoryview)
+        assert list(loaded.column('size')) == [
+            NONE_VALUE if item.size is None else item.size for item in snapshot
+        ]
+        assert any(item.inodes_used is not None for item in snapshot)
+        for attr in ('inodes_used', 'inodes_available', 'inodes_percent'):
+            assert list(loaded.column(attr)) == [
+                NONE_VALUE if getattr(item, attr) is None else getattr(item, attr) for item in snapshot
+            ]
+            assert [getattr(item, attr) for item in loaded] == [getattr(item, attr) for item in snapshot]
+        with pytest.raises(FilesystemError):
+            loaded.column('unexpected')
+        with pytest.raises(IndexError):
+            assert loaded[len(snapshot)] is None
+        assert dumps(loaded) == dumps(snapshot)
+    loaded.close()
+
+
+def test_serialization_mountpoints_string_table(linux_mountpoints) -> None:
+    """
+    Test repeated strings are stored once in the string table
+    """
+    snapshot = linux_mountpoints.snapshot()
+    data = dumps(snapshot)
+    string_count = SNAPSHOT_HEADER.unpack_from(data, 0)[5]
+    values = set()
+    for item in snapshot:
+        values.update((item.device, item.mountpoint, item.filesystem, ','.join(item.options)))
+    assert string_count == len(values) + 1
+
+
+def test_serialization_fstab_dump_load(linux_fstab, tmp_path) -> None:
+    """
+    Test writing and loading binary fstab snapshots
+    """
+    path = tmp_path.joinpath('fstab.snapshot')
+    dump(linux_fstab, path)
+
+    with load(path) as loaded:
+        assert isinstance(loaded, FstabSnapshotFile)
+        assert loaded.source == str(linux_fstab.path)
+        assert [str(item) for item in loaded] == [str(item) for item in linux_fstab.__lines__]
+        for item, line in zip(loaded, linux_fstab.__lines__):
+            assert isinstance(item, FstabEntry if isinstance(line, FstabEntry) else FstabComment)
+        assert loaded.entries == list(linux_fstab)
+        assert [entry.fs_passno for entry in loaded.entries] == [entry.fs_passno for entry in linux_fstab]
+
+
+def test_serialization_load_errors(tmp_path) -> None:
+    """
+    Test loading invalid snapshot files
+    """
+    with pytest.raises(FilesystemError):
+        load(tmp_path.joinpath('missing'))
+
+    path = tmp_path.joinpath('invalid')
+    path.write_bytes(b'FSTK')
+    with pytest.raises(FilesystemError):
+        load(path)
+
+    path.write_bytes(b'X' * SNAPSHOT_HEADER.size)
+    with pytest.raises(FilesystemError):
+        load(path)
+
+    path.write_bytes(SNAPSHOT_HEADER.pack(b'FSTK', SNAPSHOT_VERSION - 1, 1, 0, 0, 0, 0, 0.0))
+    with pytest.raises(FilesystemError):
+        load(path)
+
+    with pytest.raises(FilesystemError):
+        dumps(object())
+
+
+def test_serialization_truncated_file(linux_mountpoints, tmp_path) -> None:
+    """
+    Test loading a truncated snapshot file
+    """
+    data = dumps(linux_mountpoints)
+    path = tmp_path.joinpath('truncated')
+    path.write_bytes(data[:-8])
+    with pytest.raises(FilesystemError):
+        load(path)
+
+
+def test_serialization_export_json(linux_mountpoints, linux_fstab) -> None:
+    """
+    Test exporting mountpoints and fstab as JSON
+    """
+    data = json.loads(export_json(linux_mountpoints))
+    assert data['kind'] == 'mountpoints'
+    assert len(data['mountpoints']) == len(linux_mountpoints)
+    assert data['mountpoints'][0]['device'] == linux_mountpoints[0].device
+    for item, mountpoint in zip(data['mountpoints'], linux_mountpoints):
+        assert item['inodes_used'] == mountpoint.usage.inodes_used
+        assert item['inodes_available'] == mountpoint.usage.inodes_available
+        assert item['inodes_percent'] == mountpoint.usage.inodes_percent
+
+    data = json.loads(export_json(linux_fstab, indent=2))
+    assert data['kind'] == 'fstab'
+    assert len(data['lines']) == len(linux_fstab.__lines__)
+    assert len([line for line in data['lines'] if 'fs_spec' in line]) == len(linux_fstab)